@@ -0,0 +1,106 @@
+"""
+Latency of the /userinfo autocomplete lookup (UserRegistry.search) on a
+large roster, next to the old per-call mention-list scan over a guild.
+Discord drops autocomplete responses after 3 seconds.
+
+    python benchmarks/bench_autocomplete.py [--players 100000] [--members 20000] [--queries 5000]
+"""
+import argparse
+import logging
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import fake_player
+from utils.api import player_record
+from utils.registry import UserRegistry
+
+
+class MemoryStore:
+    def __init__(self, users: dict):
+        self.users = users
+
+    def load_users(self):
+        return self.users
+
+    def save_user(self, discord_id, record):
+        self.users[discord_id] = record
+
+    def delete_user(self, discord_id):
+        self.users.pop(discord_id, None)
+
+
+class FakeMember:
+    def __init__(self, member_id: int):
+        self.id = member_id
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+
+def random_nickname(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(rng.randint(4, 12)))
+
+
+def percentiles(samples):
+    samples = sorted(s * 1e6 for s in samples)
+    p = lambda pct: samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+    return f"p50 {p(50):8.1f} µs, p99 {p(99):8.1f} µs, max {samples[-1]:8.1f} µs"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=100000)
+    parser.add_argument("--members", type=int, default=20000, help="guild size for the old mention scan")
+    parser.add_argument("--queries", type=int, default=5000)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    users = {}
+    for i in range(args.players):
+        record = player_record(fake_player(str(400000000 + i)))
+        record["nickname"] = random_nickname(rng)
+        users[str(10**17 + i)] = record
+
+    registry = UserRegistry(MemoryStore(users))
+    start = time.perf_counter()
+    registry.load()
+    print(f"index build : {(time.perf_counter() - start) * 1000:.0f} ms for {args.players} players")
+
+    records = list(users.values())
+    queries = []
+    for _ in range(args.queries):
+        record = rng.choice(records)
+        key = record["nickname"] if rng.random() < 0.7 else record["game_id"]
+        queries.append(key[:rng.randint(0, 4)])
+
+    timings, results = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        results += len(registry.search(query))
+        timings.append(time.perf_counter() - start)
+    print(f"search      : {percentiles(timings)} ({results / len(queries):.1f} results avg)")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        registry.upsert(str(3 * 10**17 + i), player_record(fake_player(str(600000000 + i))))
+    print(f"upsert      : {(time.perf_counter() - start) / 1000 * 1e6:.1f} µs each with index maintenance")
+
+    members = [FakeMember(10**17 + i) for i in range(args.members)]
+    timings = []
+    for _ in range(50):
+        target = rng.choice(members).mention
+        start = time.perf_counter()
+        _ = target in [m.mention for m in members]
+        timings.append(time.perf_counter() - start)
+    print(f"old scan    : {percentiles(timings)} (mention list over {args.members} members)")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.CRITICAL)
+    main()
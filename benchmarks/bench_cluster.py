@@ -0,0 +1,120 @@
+"""
+Local multi-process cluster check, no Discord needed. Starts N processes
+that share one cluster database, queues leader-only jobs, SIGKILLs the
+leader halfway through and reports the failover time and whether every job
+was handled (at-least-once; duplicates are counted). Also prints how a set
+of guild IDs spreads over the shards.
+
+    python benchmarks/bench_cluster.py [--processes 3] [--jobs 200] [--ttl 3] [--shards 4]
+"""
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.cluster import Cluster, ClusterConfig, ClusterDB, LEASE_NAME, shard_for_guild
+
+
+async def worker(name: str, path: str, ttl: float, tick: float):
+    cluster = Cluster(ClusterConfig(enabled=True, cluster_id=name, path=path), lease_ttl=ttl, tick_seconds=tick)
+
+    def emit(event, **data):
+        print(json.dumps({"event": event, "worker": name, "t": time.time(), **data}), flush=True)
+
+    async def on_leadership(leader):
+        emit("leader" if leader else "follower")
+
+    cluster.add_leadership_listener(on_leadership)
+    cluster.handle("job", lambda n: emit("job", n=n), leader_only=True)
+    await cluster.start()
+    await asyncio.Event().wait()
+
+
+def wait_for_leader(db: ClusterDB, exclude=None, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        holder = db.lease_holder(LEASE_NAME)
+        if holder and holder != exclude:
+            return holder
+        time.sleep(0.05)
+    raise TimeoutError("no leader elected")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--ttl", type=float, default=3.0)
+    parser.add_argument("--tick", type=float, default=0.5)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(worker(args.worker, args.path, args.ttl, args.tick))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cluster.db")
+        db = ClusterDB(path)
+        procs = {
+            f"w{i}": subprocess.Popen(
+                [sys.executable, __file__, "--worker", f"w{i}", "--path", path,
+                 "--ttl", str(args.ttl), "--tick", str(args.tick)],
+                stdout=subprocess.PIPE, text=True,
+            )
+            for i in range(args.processes)
+        }
+        try:
+            leader = wait_for_leader(db)
+            half = args.jobs // 2
+            for n in range(half):
+                db.publish("bench", "job", n)
+            time.sleep(args.tick * 2)
+
+            killed_at = time.time()
+            procs[leader].send_signal(signal.SIGKILL)
+            new_leader = wait_for_leader(db, exclude=leader, timeout=args.ttl * 5)
+            failover = time.time() - killed_at
+
+            for n in range(half, args.jobs):
+                db.publish("bench", "job", n)
+            deadline = time.time() + args.tick * 10
+            while db.get_cursor("leader") < db.max_seq() and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            for proc in procs.values():
+                proc.send_signal(signal.SIGTERM)
+            outputs = {name: proc.communicate(timeout=10)[0] for name, proc in procs.items()}
+            db.close()
+
+    events = [json.loads(line) for out in outputs.values() for line in out.splitlines() if line.startswith("{")]
+    handled = collections.Counter(e["n"] for e in events if e["event"] == "job")
+    by_worker = collections.Counter(e["worker"] for e in events if e["event"] == "job")
+    missing = set(range(args.jobs)) - set(handled)
+    duplicates = sum(count - 1 for count in handled.values() if count > 1)
+
+    print(f"processes : {args.processes}, lease TTL {args.ttl:.1f}s, tick {args.tick:.1f}s")
+    print(f"leader    : {leader} killed -> {new_leader} after {failover:.2f} s")
+    print(f"jobs      : {len(handled)}/{args.jobs} handled, {len(missing)} missing, {duplicates} duplicates")
+    print(f"by worker : {dict(by_worker)}")
+
+    guilds = [random.getrandbits(63) for _ in range(10000)]
+    spread = collections.Counter(shard_for_guild(g, args.shards) for g in guilds)
+    print(f"shards    : {dict(sorted(spread.items()))} for {len(guilds)} guilds over {args.shards} shards")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.CRITICAL)
+    main()
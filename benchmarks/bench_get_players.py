@@ -0,0 +1,72 @@
+"""
+Roster refresh throughput: sequential get_player_info vs get_players().
+
+    python benchmarks/bench_get_players.py [--fids 2000] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import StubServer, player_api_app
+from utils import api
+from utils.http_client import client as http_client
+
+
+async def run_sequential(fids):
+    start = time.perf_counter()
+    errors = 0
+    for fid in fids:
+        data = await api.get_player_info(fid, force_refresh=True)
+        errors += "error" in data
+    return time.perf_counter() - start, errors
+
+
+async def run_batch(fids, concurrency):
+    start = time.perf_counter()
+    errors = seen = 0
+    async for fid, data in api.get_players(fids, concurrency=concurrency, force_refresh=True):
+        seen += 1
+        errors += "error" in data
+    assert seen == len(fids), (seen, len(fids))
+    return time.perf_counter() - start, errors
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fids", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--sequential-sample", type=int, default=100,
+                        help="FIDs used for the (slow) sequential baseline")
+    args = parser.parse_args()
+
+    server = await StubServer(player_api_app(latency=args.latency, error_rate=args.error_rate)).start()
+    api.PLAYER_API_URL = f"{server.url}/api/player"
+    http_client.configure(limit_per_host=max(args.concurrency))
+    # measure the batch itself, not the production rate limit
+    api.configure_player_api(rate=10**6, burst=10**6, max_concurrency=max(args.concurrency), max_wait=None)
+    await http_client.start()
+
+    fids = [str(400000000 + i) for i in range(args.fids)]
+    try:
+        sample = fids[:args.sequential_sample]
+        elapsed, errors = await run_sequential(sample)
+        print(f"sequential      : {len(sample) / elapsed:8.1f} FIDs/sec ({len(sample)} fids, {errors} errors)")
+        for concurrency in args.concurrency:
+            elapsed, errors = await run_batch(fids, concurrency)
+            print(f"get_players c={concurrency:<3}: {len(fids) / elapsed:8.1f} FIDs/sec ({len(fids)} fids, {errors} errors)")
+        print(f"http pool       : {http_client.stats()}")
+    finally:
+        await http_client.close()
+        await server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Cost of the instrumentation in utils/metrics.py: a bare histogram observe,
+a labelled observe, the @timed wrapper around an async function and the
+@instrumented_loop wrapper, each next to the uninstrumented baseline.
+Also times one render of the Prometheus text with every series populated.
+
+    python benchmarks/bench_metrics.py [--calls 200000]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import MetricsRegistry, instrumented_loop, timed
+
+
+def per_call_ns(fn, calls: int) -> float:
+    started = time.perf_counter()
+    fn(calls)
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+async def async_per_call_ns(func, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        await func()
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    plain = registry.histogram("bench_plain_seconds", "bench")
+    labelled = registry.histogram("bench_labelled_seconds", "bench", ["outcome"])
+    ok = labelled.labels("ok")
+
+    def observe_plain(n):
+        for i in range(n):
+            plain.observe(0.003)
+
+    def observe_cached_child(n):
+        for i in range(n):
+            ok.observe(0.003)
+
+    def observe_lookup(n):
+        for i in range(n):
+            labelled.labels("ok").observe(0.003)
+
+    def empty(n):
+        for i in range(n):
+            pass
+
+    loop_base = per_call_ns(empty, args.calls)
+    print(f"calls              : {args.calls}")
+    print(f"observe()          : {per_call_ns(observe_plain, args.calls) - loop_base:7.0f} ns")
+    print(f"child.observe()    : {per_call_ns(observe_cached_child, args.calls) - loop_base:7.0f} ns")
+    print(f"labels().observe() : {per_call_ns(observe_lookup, args.calls) - loop_base:7.0f} ns")
+
+    async def work():
+        return None
+
+    timed_work = timed(plain)(work)
+    loop_work = instrumented_loop("bench", interval=1.0)(work)
+
+    async def run():
+        base = await async_per_call_ns(work, args.calls)
+        with_timer = await async_per_call_ns(timed_work, args.calls)
+        with_loop = await async_per_call_ns(loop_work, args.calls)
+        return base, with_timer, with_loop
+
+    base, with_timer, with_loop = asyncio.run(run())
+    print(f"async call         : {base:7.0f} ns baseline")
+    print(f"@timed             : {with_timer - base:7.0f} ns added")
+    print(f"@instrumented_loop : {with_loop - base:7.0f} ns added")
+
+    started = time.perf_counter()
+    text = registry.render()
+    print(f"render             : {(time.perf_counter() - started) * 1000:7.2f} ms for {len(text.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.CRITICAL)
+    main()
@@ -0,0 +1,68 @@
+"""
+Push a burst of alerts through the outbox to many fake channels and report
+messages actually sent, merge ratio, delivery latency and whether any channel
+exceeded its rate limit (which Discord would have answered with a 429).
+
+    python benchmarks/bench_outbox.py [--channels 200] [--alerts 10] [--send-latency 0.05]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.outbox import Outbox, MAX_CONTENT
+
+DISCORD_CHANNEL_LIMIT = (5, 5.0)  # messages per seconds
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, latency: float):
+        self.id = channel_id
+        self.latency = latency
+        self.sent = []          # (monotonic time, content, embeds)
+
+    async def send(self, content=None, embeds=None):
+        assert content is None or len(content) <= MAX_CONTENT
+        await asyncio.sleep(self.latency)
+        self.sent.append((time.monotonic(), content, embeds))
+
+    def rate_violations(self, limit: int, per: float) -> int:
+        times = [t for t, _, _ in self.sent]
+        return sum(1 for i in range(limit, len(times)) if times[i] - times[i - limit] < per * 0.95)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, default=200)
+    parser.add_argument("--alerts", type=int, default=10, help="alerts per channel in the burst")
+    parser.add_argument("--send-latency", type=float, default=0.05)
+    parser.add_argument("--window", type=float, default=0.5)
+    args = parser.parse_args()
+
+    outbox = Outbox(coalesce_window=args.window)
+    channels = [FakeChannel(i, args.send_latency) for i in range(args.channels)]
+
+    start = time.perf_counter()
+    futures = [
+        outbox.send(channel, f"🎉 @everyone New WOS Gift Code: `CODE{n:04d}`" + " " * (n % 3) * 400)
+        for n in range(args.alerts) for channel in channels
+    ]
+    await asyncio.gather(*futures)
+    elapsed = time.perf_counter() - start
+
+    stats = outbox.stats()
+    violations = sum(c.rate_violations(*DISCORD_CHANNEL_LIMIT) for c in channels)
+    print(f"alerts     : {len(futures)} to {args.channels} channels in {elapsed:.2f} s")
+    print(f"sent       : {stats['sent_messages']} messages ({stats['merged']} alerts merged away), "
+          f"{stats['failed']} failed")
+    print(f"delivery   : {stats['latency']}")
+    print(f"rate limit : {violations} per-channel violations, {stats['global_waits']} global-bucket waits")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+Gift-code page parse time and peak memory per strategy, using debug.html.
+
+    python benchmarks/bench_parse_codes.py [--iterations 200]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup, SoupStrainer
+from utils.scraper import parse_codes, parse_codes_fast, parse_codes_soup
+
+
+def parse_codes_strained(html: str) -> list:
+    """bs4 with a SoupStrainer: only <table> subtrees are built."""
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("table"))
+    tbody = soup.find("tbody")
+    if not tbody:
+        return []
+    codes = []
+    for row in tbody.find_all("tr"):
+        cell = row.find("td")
+        if cell and cell.get_text(strip=True):
+            codes.append(cell.get_text(strip=True))
+    return codes
+
+
+STRATEGIES = {
+    "soup (html.parser)": parse_codes_soup,
+    "soup + SoupStrainer": parse_codes_strained,
+    "fast slice parser": parse_codes_fast,
+    "parse_codes (default)": parse_codes,
+}
+
+
+def measure(func, html, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(html)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--fixture", default=os.path.join(ROOT, "debug.html"))
+    args = parser.parse_args()
+
+    with open(args.fixture, encoding="utf-8") as f:
+        html = f.read()
+    expected = parse_codes_soup(html)
+    print(f"fixture: {args.fixture} ({len(html)} chars, codes={expected})")
+
+    for name, func in STRATEGIES.items():
+        result = func(html)
+        assert result == expected, f"{name} returned {result}"
+        timings, peak = measure(func, html, args.iterations)
+        print(
+            f"{name:<24} median {statistics.median(timings) * 1000:7.3f} ms  "
+            f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:7.3f} ms  "
+            f"peak mem {peak / 1024:8.1f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.CRITICAL)
+    main()
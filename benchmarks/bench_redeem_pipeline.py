@@ -0,0 +1,82 @@
+"""
+Auto-redeem pipeline against a local redeem stub: throughput, retries,
+per-code summary, and a simulated crash + restart to check the ledger
+never re-runs a finished (fid, code) pair. Only jobs that were in flight
+at the crash may hit the endpoint again (answered "already claimed").
+
+    python benchmarks/bench_redeem_pipeline.py [--users 2000] [--workers 8]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import StubServer, redeem_api_app, stub_redeem
+from utils.http_client import client as http_client
+from utils.redeem_pipeline import RedeemPipeline
+from utils.storage import writer
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    server = await StubServer(redeem_api_app(latency=args.latency, error_rate=args.error_rate)).start()
+    redeem = stub_redeem(f"{server.url}/redeem")
+    players = [(str(10**17 + i), str(400000000 + i)) for i in range(args.users)]
+    summaries = []
+
+    async def on_summary(code, counts):
+        summaries.append((code, counts))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs_file = os.path.join(tmp, "redeem_jobs.json")
+        start = time.perf_counter()
+
+        # run 1: crash half-way through
+        first = RedeemPipeline(redeem, on_summary, workers=args.workers, jobs_file=jobs_file, backoff_base=0.05)
+        first.load()
+        first.start()
+        first.enqueue("BENCH2025", players)
+        while first.pending() > args.users // 2:
+            await asyncio.sleep(0.01)
+        await first.stop()
+        await writer.flush()
+
+        # run 2: restart from the ledger, re-announce the same code (must not duplicate)
+        second = RedeemPipeline(redeem, on_summary, workers=args.workers, jobs_file=jobs_file, backoff_base=0.05)
+        second.load()
+        second.start()
+        duplicates = second.enqueue("BENCH2025", players)
+        await second.join()
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0)
+        await second.stop()
+        await writer.flush()
+
+    stats = server.app["stats"]
+    total = sum(summaries[0][1].values()) if summaries else 0
+    print(f"jobs            : {args.users} ({args.workers} workers, {args.error_rate:.0%} transient errors)")
+    print(f"throughput      : {args.users / elapsed:.1f} jobs/sec ({elapsed:.2f}s incl. restart)")
+    print(f"requests        : {stats['requests']} ({stats['errors']} errors, retries {first.retries + second.retries})")
+    print(f"re-enqueued     : {duplicates} (expected 0)")
+    print(f"repeat requests : {stats['repeats']} (in flight at the crash, at most {args.workers})")
+    print(f"summaries       : {summaries}")
+    await http_client.close()
+    await server.stop()
+    assert duplicates == 0 and stats["repeats"] <= args.workers
+    assert len(summaries) == 1 and total == args.users
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(main())
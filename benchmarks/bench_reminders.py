@@ -0,0 +1,67 @@
+"""
+Fire N reminders through ReminderScheduler and report scheduling jitter
+(actual fire time minus scheduled time).
+
+    python benchmarks/bench_reminders.py [--reminders 50000] [--window 10]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.scheduler import ReminderScheduler
+from utils.storage import JsonStore, writer
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reminders", type=int, default=50000)
+    parser.add_argument("--window", type=float, default=10.0, help="seconds the fire times are spread over")
+    parser.add_argument("--channels", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jitter = []
+        done = asyncio.Event()
+
+        async def on_fire(reminder):
+            jitter.append(time.time() - reminder["fire_at"])
+            if len(jitter) == args.reminders:
+                done.set()
+
+        scheduler = ReminderScheduler(on_fire, store=JsonStore(reminders_file=os.path.join(tmp, "reminders.json")))
+        scheduler.start()
+
+        base = time.time() + 1.0
+        start = time.perf_counter()
+        for i in range(args.reminders):
+            scheduler.add({
+                "channel_id": random.randrange(args.channels),
+                "message": f"reminder {i}",
+                "fire_at": base + random.uniform(0, args.window),
+                "once": True,
+            })
+        insert_elapsed = time.perf_counter() - start
+
+        await asyncio.wait_for(done.wait(), timeout=args.window + 60)
+        await scheduler.stop()
+        await writer.flush()
+
+    jitter_ms = sorted(j * 1000 for j in jitter)
+    p = lambda pct: jitter_ms[min(len(jitter_ms) - 1, int(len(jitter_ms) * pct / 100))]
+    print(f"reminders : {args.reminders} over {args.window:.0f}s")
+    print(f"insert    : {insert_elapsed * 1000:.1f} ms total, {insert_elapsed / args.reminders * 1e6:.2f} µs each")
+    print(f"jitter    : mean {statistics.mean(jitter_ms):.2f} ms, p50 {p(50):.2f} ms, "
+          f"p95 {p(95):.2f} ms, p99 {p(99):.2f} ms, max {jitter_ms[-1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""
+Register throughput of the JSON vs SQLite storage backends on a
+pre-populated roster.
+
+    python benchmarks/bench_storage.py [--sizes 10000 100000] [--registers 200]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import fake_player
+from utils.api import player_record
+from utils.db import SqliteStore
+from utils.storage import JsonStore
+
+
+def roster(size: int) -> dict:
+    return {str(10**17 + i): player_record(fake_player(str(400000000 + i))) for i in range(size)}
+
+
+def bench(store, size: int, registers: int):
+    store.save_users(roster(size))
+    store.load_users()
+    start = time.perf_counter()
+    for i in range(registers):
+        store.save_user(str(2 * 10**17 + i), player_record(fake_player(str(500000000 + i))))
+    elapsed = time.perf_counter() - start
+    return registers / elapsed, elapsed / registers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--registers", type=int, default=200,
+                        help="registers timed per run (JSON is capped lower at large sizes)")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            # a whole-file rewrite per register gets slow; keep the JSON run bounded
+            json_registers = max(5, min(args.registers, 2_000_000 // size))
+            rate, per = bench(JsonStore(users_file=os.path.join(tmp, "users.json")), size, json_registers)
+            print(f"json   {size:>7} users: {rate:9.1f} registers/sec ({per * 1000:8.2f} ms each, n={json_registers})")
+
+            store = SqliteStore(os.path.join(tmp, "bot.db"))
+            rate, per = bench(store, size, args.registers)
+            store.close()
+            print(f"sqlite {size:>7} users: {rate:9.1f} registers/sec ({per * 1000:8.2f} ms each, n={args.registers})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.CRITICAL)
+    main()
@@ -0,0 +1,292 @@
+"""
+Offline stand-ins for the Discord side of the bot, for load tests.
+
+FakeBot is a real commands.Bot that loads the real cogs but never connects:
+gateway events are delivered with bot.dispatch() (the path the gateway
+uses) and every REST call a cog makes on a fake guild, member, channel or
+interaction goes through FakeREST, which adds configurable latency and
+counts calls per route and channel sends that would have hit Discord's
+per-channel limit.
+"""
+import asyncio
+import collections
+import itertools
+import random
+import time
+
+import discord
+from discord.ext import commands
+
+DISCORD_CHANNEL_LIMIT = (5, 5.0)    # messages per seconds, per channel
+
+_ids = itertools.count(10**17)
+
+
+def snowflake() -> int:
+    return next(_ids)
+
+
+class FakeREST:
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = collections.Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def call(self, route: str):
+        self.calls[route] += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {"calls": dict(self.calls), "peak_in_flight": self.peak_in_flight}
+
+
+class FakeRole:
+    def __init__(self, name: str, position: int = 1):
+        self.id = snowflake()
+        self.name = name
+        self.position = position
+
+    def __lt__(self, other):
+        return self.position < other.position
+
+    def __gt__(self, other):
+        return self.position > other.position
+
+
+class FakeChannel:
+    def __init__(self, rest: FakeREST, guild=None, name: str = "general"):
+        self.id = snowflake()
+        self.rest = rest
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        self.sent = []          # (perf_counter time, content, embeds, view)
+        self.deleted = False
+
+    async def send(self, content=None, embed=None, embeds=None, view=None, **kwargs):
+        await self.rest.call("channel.send")
+        self.sent.append((time.perf_counter(), content, embeds or ([embed] if embed else []), view))
+
+    async def delete(self, **kwargs):
+        await self.rest.call("channel.delete")
+        self.deleted = True
+        if self.guild:
+            self.guild.channels.pop(self.id, None)
+
+    def rate_violations(self, limit: int = DISCORD_CHANNEL_LIMIT[0], per: float = DISCORD_CHANNEL_LIMIT[1]) -> int:
+        times = [t for t, *_ in self.sent]
+        return sum(1 for i in range(limit, len(times)) if times[i] - times[i - limit] < per * 0.95)
+
+
+class FakeAvatar:
+    url = "https://cdn.discordapp.com/embed/avatars/0.png"
+
+
+class FakeMember:
+    def __init__(self, guild, name: str):
+        self.id = snowflake()
+        self.guild = guild
+        self.name = name
+        self.mention = f"<@{self.id}>"
+        self.nick = None
+        self.roles = []
+        self.top_role = guild.default_role
+        self.display_avatar = FakeAvatar()
+
+    def __str__(self):
+        return self.name
+
+    async def add_roles(self, *roles, **kwargs):
+        await self.guild.rest.call("member.add_roles")
+        self.roles.extend(role for role in roles if role not in self.roles)
+
+    async def remove_roles(self, *roles, **kwargs):
+        await self.guild.rest.call("member.remove_roles")
+        self.roles = [role for role in self.roles if role not in roles]
+
+    async def edit(self, **kwargs):
+        await self.guild.rest.call("member.edit")
+        if "nick" in kwargs:
+            self.nick = kwargs["nick"]
+        if "roles" in kwargs:
+            self.roles = list(kwargs["roles"])
+
+
+class FakeGuild:
+    def __init__(self, rest: FakeREST, name: str = "bench"):
+        self.id = snowflake()
+        self.rest = rest
+        self.name = name
+        self.default_role = FakeRole("@everyone", position=0)
+        self.roles = [self.default_role, FakeRole("Unverified", 1), FakeRole("Verified", 2)]
+        self.channels = {}
+        self.members = {}
+        self.owner_id = snowflake()
+        self.me = FakeMember(self, "wos-bot")
+        self.me.top_role = FakeRole("Bot", position=10)
+
+    def get_member(self, member_id: int):
+        return self.members.get(member_id)
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    def add_member(self, name: str) -> FakeMember:
+        member = FakeMember(self, name)
+        self.members[member.id] = member
+        return member
+
+    def add_channel(self, name: str = "general") -> FakeChannel:
+        channel = FakeChannel(self.rest, self, name)
+        self.channels[channel.id] = channel
+        return channel
+
+    async def create_text_channel(self, name: str, overwrites=None, reason=None, **kwargs) -> FakeChannel:
+        await self.rest.call("guild.create_channel")
+        return self.add_channel(name)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    def _finish(self, kind, payload):
+        self._done = True
+        self.interaction.replies.append((kind, payload))
+        self.interaction.responded_at = time.perf_counter()
+        if kind != "defer":
+            self.interaction._complete()
+        self.interaction.responded.set()
+
+    async def send_message(self, content=None, embed=None, **kwargs):
+        await self.interaction.rest.call("interaction.respond")
+        self._finish("message", content if embed is None else embed)
+
+    async def send_modal(self, modal):
+        await self.interaction.rest.call("interaction.respond")
+        if self.interaction.client is not None:
+            # like discord.py: the modal waits in the client's view store for its submit
+            self.interaction.client._connection.store_view(modal)
+        self._finish("modal", modal)
+
+    async def defer(self, **kwargs):
+        await self.interaction.rest.call("interaction.respond")
+        self._finish("defer", None)
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self.interaction.rest.call("interaction.followup")
+        self.interaction.replies.append(("followup", content if kwargs.get("embed") is None else kwargs["embed"]))
+        self.interaction._complete()
+
+
+class FakeInteraction:
+    """
+    What a command callback sees; `responded` is set on the first response,
+    `completed` on the final answer. Pass `client` for modals to go through
+    its view store (see submit_modal).
+    """
+
+    def __init__(self, rest: FakeREST, user: FakeMember, channel: FakeChannel = None, client=None):
+        self.id = snowflake()
+        self.rest = rest
+        self.client = client
+        self.user = user
+        self.guild = user.guild
+        self.guild_id = user.guild.id
+        self.channel = channel
+        self.created_at = time.perf_counter()
+        self.responded_at = None
+        self.completed_at = None        # final answer: the response, or the followup after a defer
+        self.responded = asyncio.Event()
+        self.completed = asyncio.Event()
+        self.replies = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    @property
+    def latency(self):
+        return None if self.responded_at is None else self.responded_at - self.created_at
+
+    @property
+    def completion(self):
+        return None if self.completed_at is None else self.completed_at - self.created_at
+
+    @property
+    def _state(self):
+        return self.client._connection if self.client is not None else None
+
+    def _complete(self):
+        self.completed_at = time.perf_counter()
+        self.completed.set()
+
+
+def submit_modal(client, interaction: FakeInteraction, modal, *values) -> bool:
+    """
+    Submit `modal` the way the gateway does: by custom_id through the client's
+    view store, so modals open at the same time can collide. `values` fill
+    its text inputs in order. False if no open modal has that custom_id.
+    """
+    store = client._connection._view_store
+    if modal.custom_id not in store._modals:
+        return False
+    components = [
+        {"type": 1, "components": [{"type": 4, "custom_id": item.custom_id, "value": value}]}
+        for item, value in zip(modal.children, values)
+    ]
+    store.dispatch_modal(modal.custom_id, interaction, components, {})
+    return True
+
+
+class FakeBot(commands.Bot):
+    """Loads the real extensions with no gateway or HTTP session behind them."""
+
+    def __init__(self, rest: FakeREST):
+        super().__init__(command_prefix="!", intents=discord.Intents.default(), help_command=None)
+        self.rest = rest
+        self.fake_guilds = {}
+        self.owner_id = snowflake()
+
+    async def start_offline(self):
+        await self._async_setup_hook()
+        self._ready.set()
+
+    @property
+    def guilds(self):
+        return list(self.fake_guilds.values())
+
+    def add_guild(self, name: str = "bench") -> FakeGuild:
+        guild = FakeGuild(self.rest, name)
+        self.fake_guilds[guild.id] = guild
+        return guild
+
+    def get_guild(self, guild_id: int):
+        return self.fake_guilds.get(guild_id)
+
+    def get_channel(self, channel_id: int):
+        for guild in self.fake_guilds.values():
+            channel = guild.get_channel(channel_id)
+            if channel:
+                return channel
+        return None
+
+    def resolve_channel(self, channel_id: int):
+        return self.get_channel(channel_id)
+
+    def channels(self):
+        return [channel for guild in self.fake_guilds.values() for channel in guild.channels.values()]
@@ -0,0 +1,414 @@
+"""
+Offline load test of the real Users, Verify, Codes, AutoRedeem and Reminder
+cogs against local stand-ins: fake Discord (benchmarks/fake_discord.py), the
+stub player and redeem APIs, and a stub code site serving debug.html.
+
+Scenarios, each run in its own process so peak RSS is per scenario:
+  join_storm      1,000 members join at once and all verify through the panel and modal
+  register_burst  10,000 /register calls at once
+  code_fanout     a new code reaches 5,000 registered players (alerts + auto-redeem)
+  reminders       50,000 reminders firing within a 10 s window
+
+Prints one JSON document: per scenario ops, elapsed, throughput, p50/p95/p99
+latency (ms), peak RSS (MB) and scenario details. With --baseline (an older
+--output file) it also lists regressions beyond --tolerance and exits 1.
+
+    python benchmarks/loadtest.py [--scenario all] [--scale 1.0] [--output results.json]
+                                  [--baseline old.json] [--tolerance 0.25]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import discord
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_discord import FakeBot, FakeInteraction, FakeREST, submit_modal
+from benchmarks.stubs import StubServer, code_site_app, fake_player, player_api_app, redeem_api_app, stub_redeem
+
+SCENARIOS = ["join_storm", "register_burst", "code_fanout", "reminders"]
+EXTENSIONS = ["cogs.users", "cogs.verify", "cogs.codes", "cogs.auto_redeem", "cogs.reminders"]
+DEBUG_HTML = os.path.join(ROOT, "debug.html")
+
+
+def percentiles(seconds: list) -> dict:
+    values = sorted(s * 1000 for s in seconds if s is not None)
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    pick = lambda q: round(values[min(len(values) - 1, int(len(values) * q))], 2)
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def result(scenario: str, ops: int, elapsed: float, latencies: list, **details) -> dict:
+    return {
+        "scenario": scenario,
+        "ops": ops,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(ops / elapsed, 1) if elapsed else None,
+        **percentiles(latencies),
+        "peak_rss_mb": peak_rss_mb(),
+        "details": details,
+    }
+
+
+async def wait_until(predicate, timeout: float, interval: float = 0.02):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("scenario did not finish in time")
+        await asyncio.sleep(interval)
+
+
+class Harness:
+    """Fake Discord, stub services and the real cogs, all in this process."""
+
+    def __init__(self, args):
+        self.args = args
+        self.rest = FakeREST(latency=args.rest_latency)
+        self.bot = FakeBot(self.rest)
+        self.player_api = None
+
+    async def start(self, extensions=EXTENSIONS):
+        from utils import api, storage
+        storage.ensure_data_dir()
+        self.player_api = await StubServer(player_api_app(
+            latency=self.args.api_latency, error_rate=self.args.api_error_rate)).start()
+        api.PLAYER_API_URL = f"{self.player_api.url}/api/player"
+        await self.bot.start_offline()
+        for extension in extensions:
+            await self.bot.load_extension(extension)
+        await asyncio.sleep(0)  # let leadership listeners start the pipeline/scheduler
+        return self
+
+    async def close(self):
+        from utils.http_client import client as http_client
+        from utils.storage import writer
+        await writer.flush()
+        await http_client.close()
+        await self.player_api.stop()
+
+    def cog(self, name: str):
+        return self.bot.get_cog(name)
+
+
+# --- Scenarios ---
+
+async def join_storm(harness: Harness, scale: float) -> dict:
+    from utils.guild_settings import guild_settings
+    count = max(1, int(1000 * scale))
+    guild = harness.bot.add_guild()
+    panel_channel = guild.add_channel("verify")
+    await guild_settings.update(guild.id, verify_channel_id=panel_channel.id)
+    members = [guild.add_member(f"newbie{i}") for i in range(count)]
+    cog = harness.cog("Verify")
+    panel = cog.VerifyPanel(cog)
+    verified_role = discord.utils.get(guild.roles, name="Verified")
+    unverified_role = discord.utils.get(guild.roles, name="Unverified")
+    retries = 0
+    lost = 0
+
+    started = time.perf_counter()
+    for member in members:
+        harness.bot.dispatch("member_join", member)
+
+    async def open_modal(member):
+        click = FakeInteraction(harness.rest, member, panel_channel, client=harness.bot)
+        await panel.children[0].callback(click)
+        return click.replies[0][1]
+
+    async def verify(i, member, modal):
+        # like users, members try again until it works
+        nonlocal retries, lost
+        while True:
+            submit = FakeInteraction(harness.rest, member, panel_channel, client=harness.bot)
+            if submit_modal(harness.bot, submit, modal, str(400000000 + i)):
+                try:
+                    await asyncio.wait_for(submit.completed.wait(), timeout=60)
+                except asyncio.TimeoutError:
+                    pass
+            if submit.completed_at is None:
+                lost += 1       # the view store had no modal for it, or it never answered
+            elif str(submit.replies[-1][1]).startswith("✅"):
+                return submit
+            retries += 1
+            await asyncio.sleep(random.uniform(1.0, 3.0))
+            modal = await open_modal(member)
+
+    # every member presses Verify on the panel before anyone submits, so all modals are open at once
+    modals = await asyncio.gather(*(open_modal(m) for m in members))
+    submits = await asyncio.gather(*(verify(i, m, modal) for i, (m, modal) in enumerate(zip(members, modals))))
+    answered = time.perf_counter()
+    # joins still queued behind the verifications are dropped on admission, roles settle in batches
+    await wait_until(
+        lambda: cog.sessions.stats()["join_queue"] == 0 and cog.sessions.stats()["role_queue"] == 0 and all(
+            verified_role in m.roles and unverified_role not in m.roles for m in members),
+        timeout=300,
+    )
+    elapsed = time.perf_counter() - started
+    return result(
+        "join_storm", count, elapsed, [s.latency for s in submits],
+        answered_after_s=round(answered - started, 3),
+        answer_latency=percentiles([s.completion for s in submits]),
+        verified=sum(1 for m in members if verified_role in m.roles),
+        retries=retries,
+        lost_submits=lost,
+        welcome_messages=len(panel_channel.sent),
+        rate_violations=panel_channel.rate_violations(),
+        sessions=cog.sessions.stats(),
+        rest=harness.rest.stats(),
+        player_api=dict(harness.player_api.app["stats"]),
+    )
+
+
+async def register_burst(harness: Harness, scale: float) -> dict:
+    from utils import api
+    from utils.registry import registry
+    count = max(1, int(10000 * scale))
+    guild = harness.bot.add_guild()
+    members = [guild.add_member(f"player{i}") for i in range(count)]
+    users = harness.cog("Users")
+
+    started = time.perf_counter()
+    interactions = [FakeInteraction(harness.rest, member) for member in members]
+    await asyncio.gather(*(
+        users.register.callback(users, interaction, str(400000000 + i))
+        for i, interaction in enumerate(interactions)
+    ))
+    elapsed = time.perf_counter() - started
+    # replies[0] is the defer; the answer is the followup
+    failed = sum(1 for i in interactions if str(i.replies[-1][1]).startswith("⚠️"))
+    # turned away by the player API limiter/circuit breaker instead of waiting out a timeout
+    rejected = sum(1 for i in interactions if str(i.replies[-1][1]).startswith("⏳"))
+    return result(
+        "register_burst", count, elapsed, [i.latency for i in interactions],
+        registered=len(registry),
+        failed=failed,
+        rejected=rejected,
+        answer_latency=percentiles([i.completion for i in interactions]),
+        player_api_limiter=api.player_api_stats(),
+        rest=harness.rest.stats(),
+        player_api=dict(harness.player_api.app["stats"]),
+    )
+
+
+async def code_fanout(harness: Harness, scale: float, site: StubServer, redeem_api: StubServer) -> dict:
+    from utils.api import player_record
+    from utils.code_feed import feed
+    from utils.guild_settings import guild_settings
+    from utils.outbox import outbox
+    from utils.registry import registry
+    users = max(1, int(5000 * scale))
+    guild_count = max(1, int(100 * scale))
+
+    registry.upsert_many({
+        str(10**17 + i): player_record(fake_player(str(400000000 + i))) for i in range(users)
+    })
+    alert_channels, notify_channels = [], []
+    for g in range(guild_count):
+        guild = harness.bot.add_guild(f"guild{g}")
+        alert, notify = guild.add_channel("gift-codes"), guild.add_channel("bot")
+        alert_channels.append(alert)
+        notify_channels.append(notify)
+        await guild_settings.update(guild.id, alert_channel_id=alert.id, channel_id=notify.id)
+    pipeline = harness.cog("AutoRedeem").pipeline
+    pipeline.redeem = stub_redeem(f"{redeem_api.url}/redeem")
+
+    code = "LOADTEST2025"
+    site.app["new_codes"].append(code)
+    started = time.perf_counter()
+    started_wall = time.time()
+    await feed.refresh()
+    await wait_until(lambda: pipeline.stats()["jobs"] >= users, timeout=30)
+    await pipeline.join()
+    await wait_until(lambda: all(ch.sent for ch in notify_channels + alert_channels), timeout=60)
+    elapsed = time.perf_counter() - started
+    await outbox.flush()
+
+    jobs = [job for job in pipeline.jobs.values() if job["code"] == code]
+    alert_times = [next(t for t, content, *_ in ch.sent if content and code in content) for ch in alert_channels]
+    return result(
+        "code_fanout", users, elapsed, [job["finished_at"] - job["created_at"] for job in jobs],
+        guilds=guild_count,
+        alert_latency=percentiles([t - started for t in alert_times]),
+        outcomes=pipeline.counts(code),
+        queued_after_s=round(min(job["created_at"] for job in jobs) - started_wall, 3),
+        redeem_api=dict(redeem_api.app["stats"]),
+        retries=pipeline.retries,
+        rate_violations=sum(ch.rate_violations() for ch in harness.bot.channels()),
+    )
+
+
+async def reminders(harness: Harness, scale: float, window: float) -> dict:
+    from utils.scheduler import FIRE_LAG_SECONDS
+    count = max(1, int(50000 * scale))
+    channel_count = max(1, int(500 * scale))
+    guild = harness.bot.add_guild()
+    channels = [guild.add_channel(f"events{i}") for i in range(channel_count)]
+    scheduler = harness.cog("Reminder").scheduler
+    await wait_until(lambda: scheduler._task is not None, timeout=5)
+
+    base = time.time() + 1.0
+    fire_at = {}
+    inserted = time.perf_counter()
+    for i in range(count):
+        fire_at[f"r{i}"] = base + random.uniform(0, window)
+        scheduler.add({
+            "channel_id": random.choice(channels).id, "message": f"r{i}",
+            "fire_at": fire_at[f"r{i}"], "once": True,
+        })
+    insert_seconds = time.perf_counter() - inserted
+
+    # perf_counter send times -> unix time
+    offset = time.time() - time.perf_counter()
+    delivered = {}
+    seen = {channel.id: 0 for channel in channels}
+
+    def all_delivered():
+        for channel in channels:
+            for sent_at, content, *_ in channel.sent[seen[channel.id]:]:
+                for line in (content or "").splitlines():
+                    delivered[line.rsplit(" ", 1)[-1]] = sent_at + offset
+            seen[channel.id] = len(channel.sent)
+        return len(delivered) >= count
+
+    await wait_until(all_delivered, timeout=window + 300, interval=0.1)
+    elapsed = max(delivered.values()) - base
+    fire_lag = FIRE_LAG_SECONDS.labels()
+    return result(
+        "reminders", count, elapsed, [delivered[rid] - fire_at[rid] for rid in delivered],
+        window_s=window,
+        channels=channel_count,
+        insert_us_each=round(insert_seconds / count * 1e6, 2),
+        fire_lag_p95_ms=round((fire_lag.quantile(0.95) or 0) * 1000, 2),
+        messages_sent=sum(len(ch.sent) for ch in channels),
+        rate_violations=sum(ch.rate_violations() for ch in channels),
+    )
+
+
+async def run_scenario(args) -> dict:
+    from utils import scraper
+    from utils.code_feed import feed
+    harness = Harness(args)
+    if args.worker == "code_fanout":
+        site = await StubServer(code_site_app(DEBUG_HTML)).start()
+        redeem_api = await StubServer(redeem_api_app(latency=args.api_latency, error_rate=args.api_error_rate)).start()
+        scraper.CODES_URL = f"{site.url}/"
+        await feed.poll()   # baseline: the page's current codes are already known
+        await harness.start()
+        try:
+            return await code_fanout(harness, args.scale, site, redeem_api)
+        finally:
+            await harness.close()
+            await site.stop()
+            await redeem_api.stop()
+    await harness.start()
+    try:
+        if args.worker == "join_storm":
+            return await join_storm(harness, args.scale)
+        if args.worker == "register_burst":
+            return await register_burst(harness, args.scale)
+        return await reminders(harness, args.scale, args.window)
+    finally:
+        await harness.close()
+
+
+def worker(args):
+    """One scenario in a scratch directory (the bot's data/ files live there)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        print(json.dumps(asyncio.run(run_scenario(args))), flush=True)
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    old = {r["scenario"]: r for r in baseline.get("results", []) if "error" not in r}
+    regressions = []
+    for new in results:
+        before = old.get(new["scenario"])
+        if before is None or "error" in new:
+            continue
+        checks = [("throughput_per_s", -1), ("p95_ms", 1), ("peak_rss_mb", 1)]
+        for key, direction in checks:
+            a, b = before.get(key), new.get(key)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            if change * direction > tolerance:
+                regressions.append(f"{new['scenario']}.{key}: {a} -> {b} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", default="all", choices=["all"] + SCENARIOS)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies every scenario's size")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="stub player/redeem API latency, seconds")
+    parser.add_argument("--api-error-rate", type=float, default=0.02)
+    parser.add_argument("--rest-latency", type=float, default=0.05, help="fake Discord REST latency, seconds")
+    parser.add_argument("--window", type=float, default=10.0, help="seconds the reminders are spread over")
+    parser.add_argument("--output", help="also write the JSON results here")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        logging.basicConfig(level=logging.CRITICAL)
+        worker(args)
+        return
+
+    passthrough = [
+        "--scale", str(args.scale), "--api-latency", str(args.api_latency),
+        "--api-error-rate", str(args.api_error_rate), "--rest-latency", str(args.rest_latency),
+        "--window", str(args.window),
+    ]
+    results = []
+    for scenario in SCENARIOS if args.scenario == "all" else [args.scenario]:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", scenario, *passthrough],
+            capture_output=True, text=True, env={**os.environ, "WOS_STORAGE": "json", "WOS_CLUSTER": "0"},
+        )
+        lines = proc.stdout.strip().splitlines()
+        if proc.returncode or not lines:
+            results.append({"scenario": scenario, "error": (proc.stderr or "no output").strip()[-2000:]})
+        else:
+            results.append(json.loads(lines[-1]))
+        print(f"{scenario}: done", file=sys.stderr)
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "scale": args.scale,
+        "results": results,
+    }
+    exit_code = 1 if any("error" in r for r in results) else 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(results, json.load(f), args.tolerance)
+        exit_code = exit_code or (1 if report["regressions"] else 0)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Local stand-ins for the remote services the bot talks to, so benchmarks
+never touch CenturyGame or wosgiftcodes.com.
+"""
+import asyncio
+import hashlib
+import random
+from urllib.parse import parse_qs
+
+from aiohttp import web
+
+from utils.http_client import client as http_client
+
+
+def fake_player(fid: str) -> dict:
+    n = int(fid) if fid.isdigit() else sum(map(ord, fid))
+    return {
+        "fid": int(fid) if fid.isdigit() else fid,
+        "nickname": f"Player{n % 100000}",
+        "kid": 1000 + n % 2000,
+        "stove_lv": 1 + n % 60,
+        "stove_lv_content": f"https://gof-formal-avatar.akamaized.net/img/icon/stove_lv_{n % 10}.png",
+        "avatar_image": f"https://gof-formal-avatar.akamaized.net/avatar/2025/08/04/{n:08d}.png",
+        "total_recharge_amount": 0,
+    }
+
+
+class StubServer:
+    """aiohttp app on 127.0.0.1 with an ephemeral port."""
+
+    def __init__(self, app: web.Application):
+        self.app = app
+        self.runner = None
+        self.url = None
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+def player_api_app(latency: float = 0.02, jitter: float = 0.01, error_rate: float = 0.0,
+                   invalid_prefix: str = "0") -> web.Application:
+    """
+    Mimics POST /api/player. Game IDs starting with invalid_prefix answer
+    like an unknown role; error_rate of requests fail with HTTP 503.
+    """
+    stats = {"requests": 0, "errors": 0}
+
+    async def player(request):
+        stats["requests"] += 1
+        form = parse_qs(await request.text())
+        fid = form.get("fid", [""])[0]
+        await asyncio.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+        if error_rate and random.random() < error_rate:
+            stats["errors"] += 1
+            return web.Response(status=503, text="Service Unavailable")
+        if not fid or fid.startswith(invalid_prefix):
+            return web.json_response({"code": 1, "data": [], "msg": "role not exist.", "err_code": 40004})
+        return web.json_response({"code": 0, "data": fake_player(fid), "msg": "success", "err_code": ""})
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_post("/api/player", player)
+    return app
+
+
+def redeem_api_app(latency: float = 0.02, error_rate: float = 0.1, claimed_rate: float = 0.05) -> web.Application:
+    """
+    Mimics a gift-code redeem endpoint: POST fid & cdk. error_rate of calls
+    fail with 503 / 429; claimed_rate of players already claimed the code.
+    app["redeemed"] is the set of redeemed (fid, code) pairs; stats["repeats"]
+    counts requests for a pair that was already redeemed.
+    """
+    redeemed = set()
+    stats = {"requests": 0, "errors": 0, "repeats": 0}
+
+    async def redeem(request):
+        stats["requests"] += 1
+        form = parse_qs(await request.text())
+        fid, code = form.get("fid", [""])[0], form.get("cdk", [""])[0]
+        await asyncio.sleep(latency)
+        roll = random.random()
+        if roll < error_rate:
+            stats["errors"] += 1
+            return web.Response(status=random.choice([429, 503]), text="busy")
+        if (fid, code) in redeemed:
+            stats["repeats"] += 1
+            return web.json_response({"code": 1, "msg": "RECEIVED.", "err_code": 40008})
+        if roll < error_rate + claimed_rate:
+            return web.json_response({"code": 1, "msg": "RECEIVED.", "err_code": 40008})
+        redeemed.add((fid, code))
+        return web.json_response({"code": 0, "msg": "SUCCESS", "err_code": 20000})
+
+    app = web.Application()
+    app["stats"] = stats
+    app["redeemed"] = redeemed
+    app.router.add_post("/redeem", redeem)
+    return app
+
+
+def stub_redeem(url: str):
+    """redeem_code() stand-in that talks to redeem_api_app at url."""
+    async def redeem(fid, code):
+        session = await http_client.session()
+        async with session.post(url, data={"fid": fid, "cdk": code}) as resp:
+            if resp.status != 200:
+                return {"status": "error", "http_status": resp.status, "message": f"HTTP {resp.status}"}
+            data = await resp.json()
+            if data.get("err_code") == 20000:
+                return {"status": "ok", "message": data.get("msg")}
+            if data.get("err_code") == 40008:
+                return {"status": "already_claimed", "message": data.get("msg")}
+            return {"status": "invalid", "message": data.get("msg")}
+    return redeem
+
+
+def code_site_app(html_path: str) -> web.Application:
+    """
+    Serves a saved copy of the gift-code page (debug.html) with ETag support.
+    Codes appended to app["new_codes"] appear as extra rows of the active table.
+    """
+    with open(html_path, encoding="utf-8") as f:
+        template = f.read()
+    new_codes = []
+    stats = {"requests": 0, "not_modified": 0}
+
+    async def page(request):
+        stats["requests"] += 1
+        rows = "".join(f"<tr><td>{code}</td><td></td></tr>" for code in new_codes)
+        body = template.replace("<tbody>", "<tbody>" + rows, 1)
+        etag = '"' + hashlib.sha1(body.encode()).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            stats["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="text/html", headers={"ETag": etag})
+
+    app = web.Application()
+    app["stats"] = stats
+    app["new_codes"] = new_codes
+    app.router.add_get("/", page)
+    return app
@@ -1,8 +1,20 @@
+from utils.startup import startup, load_extensions_concurrently  # first: starts the startup clock
 import discord
 from discord.ext import commands
 import asyncio
 import logging
 import os
+from utils.http_client import client as http_client
+from utils.code_feed import feed as code_feed
+from utils.storage import writer as json_writer, get_store
+from utils.registry import registry
+from utils.outbox import outbox
+from utils.cluster import cluster
+from utils.guild_settings import guild_settings
+from utils.metrics import server as metrics_server
+from utils.loop_monitor import lag_monitor
+from utils.command_sync import command_sync
+from utils.api import configure_player_api
 
 # === Logging Setup ===
 logging.basicConfig(
@@ -19,10 +31,65 @@ intents.guilds = True
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(
+class WosBot(commands.AutoShardedBot):
+    """
+    Bot that opens shared services at startup and closes them on shutdown.
+    Auto-sharded; in cluster mode (see utils/cluster.py) each process runs
+    the shards given in WOS_SHARD_IDS and only the elected leader runs the
+    background loops.
+    """
+
+    async def setup_hook(self):
+        startup.mark("setup_hook")
+        lag_monitor.start()
+        await http_client.start()
+        if cluster.enabled:
+            # keep every process's registry in step with registrations made elsewhere
+            registry.add_listener(self.broadcast_registry_change)
+            cluster.handle("registry.changed", registry.reload)
+            if registry.store.name != "sqlite":
+                logger.warning("Cluster mode without WOS_STORAGE=sqlite: processes will overwrite each other's JSON files")
+        await startup.timed("cluster", cluster.start())
+        await startup.timed("code feed", code_feed.start())
+        port = os.getenv("WOS_METRICS_PORT")
+        if port:
+            try:
+                await metrics_server.start(int(port))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Metrics endpoint not started on port {port}: {e}")
+
+    async def on_interaction(self, interaction: discord.Interaction):
+        # the app command tree handles the interaction; this only times the first one
+        if not startup.reported:
+            startup.mark("first interaction")
+            startup.log()
+
+    def broadcast_registry_change(self, discord_id, before, after):
+        if not registry.reloading:
+            asyncio.create_task(cluster.post("registry.changed", discord_id))
+
+    def resolve_channel(self, channel_id: int):
+        """Cached channel, or a REST-only handle if it belongs to a shard in another process."""
+        return self.get_channel(channel_id) or self.get_partial_messageable(channel_id)
+
+    async def close(self):
+        try:
+            await cluster.close()
+            await code_feed.close()
+            await outbox.flush()
+            await super().close()
+        finally:
+            await metrics_server.stop()
+            await lag_monitor.stop()
+            await http_client.close()
+            await json_writer.flush()
+
+bot = WosBot(
     command_prefix="!",
     intents=intents,
-    help_command=None  # We use slash commands instead
+    help_command=None,  # We use slash commands instead
+    shard_count=cluster.config.shard_count,
+    shard_ids=cluster.config.shard_ids
 )
 
 # === Load Extensions ===
@@ -36,35 +103,37 @@ async def load_extensions():
         "cogs.settings",
         "cogs.auto_redeem",
         "cogs.verify",
-        "cogs.admin"
+        "cogs.admin",
+        "cogs.refresher",
+        "cogs.nickname_sync"
     ]
-    for ext in extensions:
-        try:
-            await bot.load_extension(ext)
-            logger.info(f"✅ Loaded extension: {ext}")
-        except Exception as e:
-            logger.error(f"❌ Failed to load extension {ext}: {e}")
+    # cogs only share state through utils/, which is loaded before this
+    await startup.timed("extensions", load_extensions_concurrently(bot, extensions, startup))
 
 # === Sync slash commands with Discord ===
 @bot.event
 async def on_ready():
+    # fires again after every gateway reconnect; syncs only when the command tree changed
     logger.info(f"🤖 Bot is online as {bot.user} (ID: {bot.user.id})")
+    startup.mark("ready")
+    # settings from before per-guild channels: hand them to the guild that owns the channel
+    await guild_settings.migrate_legacy(bot.get_channel)
     # Register slash commands globally (can take up to 1 hour) or per guild for instant update
     # For development/testing, use guild-specific IDs to speed up
     GUILD_IDS = []  # Optional: add guild IDs to sync immediately
     if GUILD_IDS:
         for guild_id in GUILD_IDS:
-            guild = discord.Object(id=guild_id)
-            await bot.tree.sync(guild=guild)
-            logger.info(f"🔄 Synced slash commands to guild {guild_id}")
-    else:
-        await bot.tree.sync()
-        logger.info("🔄 Synced global slash commands")
+            if await command_sync.sync(bot, guild=discord.Object(id=guild_id)) is not None:
+                logger.info(f"🔄 Synced slash commands to guild {guild_id}")
+    elif cluster.is_leader:  # one process syncs for the whole cluster
+        if await command_sync.sync(bot) is not None:
+            logger.info("🔄 Synced global slash commands")
 
     await bot.change_presence(activity=discord.Game(name="Use /help"))
 
 # === Main Entrypoint ===
 async def main():
+    startup.mark("imports")
     # Ensure data folder exists
     if not os.path.exists("data"):
         os.makedirs("data")
@@ -81,8 +150,18 @@ async def main():
             f.write(TOKEN)
         logger.info("🔑 Token saved to token.txt")
 
-    await load_extensions()
-    await bot.start(TOKEN)
+    # `async with` guarantees bot.close() (and the final data flush) on exit
+    async with bot:
+        # shared by every cog; loaded once, off the event loop and side by side
+        get_store()
+        await startup.timed("state", asyncio.gather(
+            asyncio.to_thread(registry.load),
+            asyncio.to_thread(guild_settings.load),
+        ))
+        configure_player_api(**guild_settings.global_value("player_api", {}))
+        await load_extensions()
+        startup.mark("login")
+        await bot.start(TOKEN)
 
 if __name__ == "__main__":
     try:
@@ -2,16 +2,15 @@ import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 import logging
-from utils.storage import load_json, save_json
+from utils.guild_settings import guild_settings
+from utils.metrics import instrumented_loop
+from utils.command_sync import command_sync
 
 logger = logging.getLogger("discord-bot.admin")
 
-SETTINGS_FILE = "data/settings.json"
-
 class Admin(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.admins = set(load_json(SETTINGS_FILE, {}).get("admins", []))
         self.owner_id = None
         self._retry_task = None
 
@@ -24,6 +23,7 @@ class Admin(commands.Cog):
             self._retry_task.cancel()
 
     @tasks.loop(seconds=10)
+    @instrumented_loop("retry_fetch_owner", 10)
     async def retry_fetch_owner(self):
         """Keep retrying until we fetch the bot owner successfully."""
         try:
@@ -48,18 +48,17 @@ class Admin(commands.Cog):
                 self.retry_fetch_owner.start()
 
     def is_admin_or_owner(self, user: discord.User) -> bool:
-        return user.id in self.admins or (self.owner_id and user.id == self.owner_id)
+        """Owner, bot-wide admin, or admin of the guild `user` (a Member) belongs to. No disk access."""
+        guild = getattr(user, "guild", None)
+        return guild_settings.is_admin(guild.id if guild else None, user.id) or bool(self.owner_id and user.id == self.owner_id)
 
-    @app_commands.command(name="addadmin", description="Add a user as bot admin (owner only)")
+    @app_commands.command(name="addadmin", description="Add a user as admin of this server (owner only)")
     async def add_admin(self, interaction: discord.Interaction, member: discord.Member):
         if not self.owner_id or interaction.user.id != self.owner_id:
             await interaction.response.send_message("🚫 Only the bot owner can add admins.", ephemeral=True)
             return
 
-        self.admins.add(member.id)
-        settings = load_json(SETTINGS_FILE, {})
-        settings["admins"] = list(self.admins)
-        save_json(SETTINGS_FILE, settings)
+        await guild_settings.add_admin(interaction.guild_id, member.id)
 
         await interaction.response.send_message(f"✅ {member.mention} has been added as an admin.", ephemeral=True)
         logger.info(f"Added admin: {member} ({member.id})")
@@ -70,12 +69,7 @@ class Admin(commands.Cog):
             await interaction.response.send_message("🚫 Only the bot owner can remove admins.", ephemeral=True)
             return
 
-        if member.id in self.admins:
-            self.admins.remove(member.id)
-            settings = load_json(SETTINGS_FILE, {})
-            settings["admins"] = list(self.admins)
-            save_json(SETTINGS_FILE, settings)
-
+        if await guild_settings.remove_admin(interaction.guild_id, member.id):
             await interaction.response.send_message(f"🗑️ {member.mention} has been removed as an admin.", ephemeral=True)
             logger.info(f"Removed admin: {member} ({member.id})")
         else:
@@ -87,12 +81,33 @@ class Admin(commands.Cog):
             await interaction.response.send_message("🚫 Only the bot owner can list admins.", ephemeral=True)
             return
 
-        if not self.admins:
+        admins = guild_settings.admins(interaction.guild_id)
+        if not admins:
             await interaction.response.send_message("ℹ️ No admins set.", ephemeral=True)
             return
 
-        members = [f"<@{aid}>" for aid in self.admins]
+        members = [f"<@{aid}>" for aid in sorted(admins)]
         await interaction.response.send_message("👑 Current admins:\n" + "\n".join(members), ephemeral=True)
 
+    @app_commands.command(name="synccommands", description="Force a slash-command sync with Discord (admins only)")
+    @app_commands.describe(this_server="Sync this server's commands instead of the global ones")
+    async def sync_commands(self, interaction: discord.Interaction, this_server: bool = False):
+        if not self.is_admin_or_owner(interaction.user):
+            await interaction.response.send_message("🚫 Only admins can sync commands.", ephemeral=True)
+            return
+        if this_server and interaction.guild is None:
+            await interaction.response.send_message("⚠️ Use this in a server to sync its commands.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        guild = interaction.guild if this_server else None
+        try:
+            synced = await command_sync.sync(self.bot, guild=guild, force=True)
+        except discord.HTTPException as e:
+            await interaction.followup.send(f"⚠️ Sync failed: {e}", ephemeral=True)
+            return
+        scope = "this server" if guild else "global"
+        await interaction.followup.send(f"🔄 Synced {len(synced)} {scope} commands.", ephemeral=True)
+        logger.info(f"Forced {scope} command sync by {interaction.user}")
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(Admin(bot))
@@ -1,59 +1,59 @@
 import logging
 from discord.ext import commands, tasks
-from utils.storage import load_json, save_json
 from utils.api import redeem_code
-from datetime import datetime
+from utils.code_feed import feed
+from utils.registry import registry
+from utils.outbox import outbox
+from utils.cluster import cluster
+from utils.guild_settings import guild_settings
+from utils.redeem_pipeline import RedeemPipeline, SUCCEEDED, ALREADY_CLAIMED, FAILED
 
 logger = logging.getLogger("discord-bot.auto_redeem")
-USERS_FILE = "data/users.json"
-LAST_CODES_FILE = "data/last_codes.json"
-SETTINGS_FILE = "data/settings.json"
 
 class AutoRedeem(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.code_updates = feed.subscribe("auto_redeem")
+        self.pipeline = RedeemPipeline(redeem_code, on_summary=self.post_summary)
+
+    async def cog_load(self):
+        cluster.add_leadership_listener(self.on_leadership)
         self.check_codes.start()
 
-    def cog_unload(self):
+    async def cog_unload(self):
+        cluster.remove_leadership_listener(self.on_leadership)
         self.check_codes.cancel()
-
-    @tasks.loop(minutes=1)
+        feed.unsubscribe("auto_redeem")
+        await self.pipeline.stop()
+
+    async def on_leadership(self, leader: bool):
+        """Only the cluster leader works the redeem ledger."""
+        if leader:
+            await self.pipeline.load_async()
+            self.pipeline.start()
+        else:
+            await self.pipeline.stop()
+
+    @tasks.loop()
     async def check_codes(self):
+        diff = await self.code_updates.get()
+        for code in diff.added:
+            players = [(discord_id, u.get("game_id")) for discord_id, u in registry.items()]
+            self.pipeline.enqueue(code, players)
+
+    @check_codes.before_loop
+    async def before_check_codes(self):
+        await self.bot.wait_until_ready()
+
+    async def post_summary(self, code: str, counts: dict):
+        """One message per code once every registered player's job has finished."""
         await self.bot.wait_until_ready()
-        codes_cog = self.bot.get_cog("Codes")
-        if not codes_cog:
-            return
-        try:
-            codes = await codes_cog.scrape_active_codes()
-        except Exception:
-            return
-
-        active_codes = [c["code"] for c in codes if isinstance(c, dict) and not c.get("error")]
-        last = load_json(LAST_CODES_FILE, [])
-        new = [c for c in active_codes if c not in last]
-        if not new:
-            return
-
-        users = load_json(USERS_FILE, [])
-        settings = load_json(SETTINGS_FILE, {})
-        channel_id = settings.get("channel_id")
-        channel = self.bot.get_channel(channel_id) if channel_id else None
-
-        for code in new:
-            for u in users:
-                fid = u.get("game_id")
-                try:
-                    result = await redeem_code(fid, code)
-                except Exception as e:
-                    logger.exception(f"redeem_code exception for fid={fid}, code={code}")
-                    result = {"status":"error","message":str(e)}
-
-                status_msg = "✅ Success" if result.get("status") == "ok" else f"⚠️ {result.get('message')}"
-                if channel:
-                    await channel.send(f"🎁 Auto-redeem attempt for **{code}** → <@{u['discord_id']}> : {status_msg}")
-
-        save_json(LAST_CODES_FILE, active_codes)
-        logger.info(f"AutoRedeem processed new codes: {new}")
+        message = (
+            f"🎁 Auto-redeem for **{code}**: ✅ {counts[SUCCEEDED]} succeeded · "
+            f"♻️ {counts[ALREADY_CLAIMED]} already claimed · ⚠️ {counts[FAILED]} failed"
+        )
+        for channel_id in guild_settings.notification_channels():
+            outbox.send(self.bot.resolve_channel(channel_id), message)
 
 async def setup(bot):
     await bot.add_cog(AutoRedeem(bot))
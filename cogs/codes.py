@@ -1,23 +1,27 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
+import asyncio
 import logging
-from utils.scraper import scrape_active_codes
-from utils.storage import load_json, save_json
+import time
+from utils.code_feed import feed
+from utils.metrics import LatencyWindow
+from utils.outbox import outbox
+from utils.guild_settings import guild_settings
 
 logger = logging.getLogger("discord-bot.codes")
 
-SETTINGS_FILE = "data/settings.json"
+STALE_AFTER_SECONDS = 120   # /codes triggers a background refresh past this age
+COLD_START_WAIT = 2.0       # max wait for a first poll; Discord's deadline is 3 s
 
 class Codes(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.previous_codes = set()
-        self.alert_channel_id = None
-        self.check_codes.start()
+        self.code_updates = feed.subscribe("alerts")
+        self.codes_latency = LatencyWindow()
 
-        settings = load_json(SETTINGS_FILE, {})
-        self.alert_channel_id = settings.get("alert_channel_id")
+    async def cog_load(self):
+        self.announce_codes.start()
 
     def get_admin_cog(self):
         return self.bot.get_cog("Admin")
@@ -34,10 +38,7 @@ class Codes(commands.Cog):
             await interaction.response.send_message("🚫 You don’t have permission to set the alert channel.", ephemeral=True)
             return
 
-        self.alert_channel_id = interaction.channel.id
-        settings = load_json(SETTINGS_FILE, {})
-        settings["alert_channel_id"] = self.alert_channel_id
-        save_json(SETTINGS_FILE, settings)
+        await guild_settings.update(interaction.guild_id, alert_channel_id=interaction.channel.id)
 
         await interaction.response.send_message(
             f"✅ This channel is now set for gift code alerts: {interaction.channel.mention}",
@@ -47,37 +48,49 @@ class Codes(commands.Cog):
 
     @app_commands.command(name="codes", description="Show active gift codes")
     async def show_active_codes(self, interaction: discord.Interaction):
-        active_codes = await scrape_active_codes()
+        started = time.perf_counter()
+        age = feed.age()
+        if age is None:
+            # nothing checked since startup: give the first poll a moment, within the deadline
+            try:
+                await asyncio.wait_for(asyncio.shield(feed.refresh()), COLD_START_WAIT)
+            except Exception:
+                pass
+            age = feed.age()
+        elif age > STALE_AFTER_SECONDS:
+            feed.refresh()  # stale-while-revalidate: answer now, refresh in the background
+
+        active_codes = feed.active
+        checked = f"_Last checked {int(age)} seconds ago._" if age is not None else "_Not checked yet since restart._"
         if not active_codes:
-            await interaction.response.send_message("⚠️ No active gift codes found.", ephemeral=True)
-            return
-        message = "**🎁 Active WOS Gift Codes:**\n" + "\n".join(f"• `{c}`" for c in active_codes)
-        await interaction.response.send_message(message, ephemeral=True)
-
-    @tasks.loop(minutes=15)
-    async def check_codes(self):
-        try:
-            active_codes = await scrape_active_codes()
-        except Exception as e:
-            logger.error(f"Failed to scrape codes: {e}")
-            return
-
-        new_codes = [c for c in active_codes if c not in self.previous_codes]
-        if not new_codes or not self.alert_channel_id:
-            return
-
-        self.previous_codes.update(new_codes)
-        channel = self.bot.get_channel(self.alert_channel_id)
-        if not channel:
-            logger.warning(f"Alert channel {self.alert_channel_id} not found.")
+            await interaction.response.send_message(f"⚠️ No active gift codes found.\n{checked}", ephemeral=True)
+        else:
+            message = "**🎁 Active WOS Gift Codes:**\n" + "\n".join(f"• `{c}`" for c in active_codes)
+            await interaction.response.send_message(f"{message}\n{checked}", ephemeral=True)
+        self.codes_latency.observe(time.perf_counter() - started)
+
+    def cog_unload(self):
+        self.announce_codes.cancel()
+        feed.unsubscribe("alerts")
+
+    @tasks.loop()
+    async def announce_codes(self):
+        """Alert every server's alert channel about codes the shared feed reports as new."""
+        diff = await self.code_updates.get()
+        new_codes = diff.added
+        if not new_codes:
             return
 
-        for code in new_codes:
-            await channel.send(f"🎉 @everyone New WOS Gift Code: `{code}`")
-            logger.info(f"Notified new code: {code}")
+        # Only the cluster leader sees diffs, so channels may be on another process's shards.
+        # Queued through the outbox: codes landing together go out as one message per channel.
+        for channel_id in guild_settings.alert_channels():
+            channel = self.bot.resolve_channel(channel_id)
+            for code in new_codes:
+                outbox.send(channel, f"🎉 @everyone New WOS Gift Code: `{code}`")
+        logger.info(f"Notified new codes {new_codes} to {len(guild_settings.alert_channels())} channels")
 
-    @check_codes.before_loop
-    async def before_check_codes(self):
+    @announce_codes.before_loop
+    async def before_announce_codes(self):
         await self.bot.wait_until_ready()
 
 async def setup(bot: commands.Bot):
@@ -1,19 +1,175 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+import asyncio
+import io
+import threading
 import time
 import logging
+from utils.http_client import client as http_client
+from utils.api import player_cache, player_api_stats
+from utils.scraper import scrape_stats
+from utils.storage import writer as json_writer
+from utils.outbox import outbox
+from utils.cluster import cluster
+from utils.metrics import metrics, Histogram
+from utils.loop_monitor import lag_monitor
+from utils.profiler import SamplingProfiler, MAX_SECONDS as MAX_PROFILE_SECONDS
 
 logger = logging.getLogger("discord-bot.health")
 
+# histograms shown by /stats, in display order
+STATS_HISTOGRAMS = [
+    ("Player API", "wos_player_api_seconds"),
+    ("get_player_info", "wos_player_info_seconds"),
+    ("Code Scrape", "wos_scrape_seconds"),
+    ("Storage Writes", "wos_storage_write_seconds"),
+    ("Outbox Sends", "wos_outbox_send_seconds"),
+    ("Outbox Delivery", "wos_outbox_delivery_seconds"),
+    ("Loop Iterations", "wos_loop_iteration_seconds"),
+    ("Loop Lag", "wos_loop_lag_seconds"),
+    ("Reminder Lag", "wos_reminder_fire_lag_seconds"),
+    ("Event Loop Lag", "wos_event_loop_lag_seconds"),
+]
+
+
+def _ms(seconds) -> str:
+    return "n/a" if seconds is None else f"{seconds * 1000:.1f} ms"
+
 class Health(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.start_time = time.time()
 
-    # --- Classic command for latency/uptime ---
-    @commands.command(name="ping")
-    async def ping(self, ctx):
+    def http_pool_summary(self) -> str:
+        stats = http_client.stats()
+        return (
+            f"{stats['open_connections']} open, {stats['requests']} requests, "
+            f"{stats['reuse_ratio']:.0%} reused"
+        )
+
+    def player_cache_summary(self) -> str:
+        stats = player_cache.stats()
+        return (
+            f"{stats['size']} cached, {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['coalesced']} coalesced, {stats['negative_hits']} invalid-ID hits"
+        )
+
+    def player_api_summary(self) -> str:
+        stats = player_api_stats()
+        circuit = stats["circuit"]
+        summary = (
+            f"circuit {circuit['state'].replace('_', '-')}, window {stats['limit']}, {stats['in_flight']} in flight, "
+            f"{stats['queued']} queued, {stats['rejected']} turned away, {circuit['trips']} trips"
+        )
+        if circuit["state"] == "open":
+            summary += f" (probe in {circuit['retry_after']:.0f} s)"
+        return summary
+
+    def scraper_summary(self) -> str:
+        stats = scrape_stats()
+        return f"{stats['polls']} polls, {stats['short_circuited']} skipped parsing, {stats['parsed']} parsed"
+
+    def codes_latency_summary(self) -> str:
+        codes_cog = self.bot.get_cog("Codes")
+        return codes_cog.codes_latency.summary() if codes_cog else "n/a"
+
+    def storage_summary(self) -> str:
+        stats = json_writer.stats()
+        return (
+            f"{stats['queue_depth']} queued, {stats['writes']} writes ({stats['coalesced']} coalesced), "
+            f"{stats['bytes_written'] / 1024:.0f} KiB, flush {stats['flush_latency']}"
+        )
+
+    def outbox_summary(self) -> str:
+        stats = outbox.stats()
+        return (
+            f"{stats['queue_depth']} queued, {stats['sent_messages']} sent ({stats['merged']} merged), "
+            f"{stats['failed']} failed, delivery {stats['latency']}"
+        )
+
+    def nickname_sync_summary(self) -> str:
+        sync_cog = self.bot.get_cog("NicknameSync")
+        if not sync_cog:
+            return "n/a"
+        stats = sync_cog.stats()
+        return (
+            f"{stats['backlog']} pending, {stats['edits']} edits "
+            f"({stats['edits_per_second']:.2f}/s), {stats['skipped']} skipped, {stats['failed']} failed"
+        )
+
+    def verification_summary(self) -> str:
+        verify_cog = self.bot.get_cog("Verify")
+        if not verify_cog:
+            return "n/a"
+        stats = verify_cog.sessions.stats()
+        return (
+            f"{stats['sessions']} pending, {stats['join_queue']} joins queued, {stats['role_queue']} role updates queued, "
+            f"{stats['verified']} verified, {stats['expired']} expired"
+        )
+
+    def cluster_summary(self) -> str:
+        stats = cluster.stats()
+        if not stats["enabled"]:
+            return f"standalone, {self.bot.shard_count or 1} shard(s)"
+        return (
+            f"{stats['cluster_id']} ({stats['role']}), shards {stats['shard_ids'] or 'auto'}"
+            f"/{stats['shard_count'] or '?'}, {stats['elections']} elections"
+        )
+
+    def is_admin_or_owner(self, user: discord.User) -> bool:
+        admin_cog = self.bot.get_cog("Admin")
+        if not admin_cog:
+            return False
+        return admin_cog.is_admin_or_owner(user)
+
+    @staticmethod
+    def histogram_summary(histogram: Histogram) -> str:
+        lines = []
+        for values, child in sorted(histogram.children()):
+            if not child.count:
+                continue
+            label = "/".join(values) + ": " if values else ""
+            lines.append(
+                f"{label}{child.count} × p50 {_ms(child.quantile(0.5))}, "
+                f"p95 {_ms(child.quantile(0.95))}, avg {_ms(child.sum / child.count)}"
+            )
+        return "\n".join(lines)[:1024] or "no data"
+
+    def stats_embed(self) -> discord.Embed:
+        embed = discord.Embed(title="📊 Bot Stats", color=discord.Color.blurple())
+        for title, name in STATS_HISTOGRAMS:
+            histogram = metrics.get(name)
+            if histogram is not None:
+                embed.add_field(name=title, value=self.histogram_summary(histogram), inline=False)
+        errors = metrics.get("wos_loop_errors_total")
+        if errors is not None and errors.total():
+            failing = ", ".join(f"{values[0]} ({child.value:g})" for values, child in errors.children() if child.value)
+            embed.add_field(name="Loop Errors", value=failing[:1024], inline=False)
+        return embed
+
+    @app_commands.command(name="stats", description="Latency histograms for API calls, scrapes, writes, loops and sends (admin only)")
+    async def stats(self, interaction: discord.Interaction):
+        if not self.is_admin_or_owner(interaction.user):
+            await interaction.response.send_message("🚫 Only admins can view bot stats.", ephemeral=True)
+            return
+        await interaction.response.send_message(embed=self.stats_embed(), ephemeral=True)
+
+    def event_loop_summary(self) -> str:
+        stats = lag_monitor.stats()
+        if not stats["running"]:
+            return "n/a"
+        summary = (
+            f"lag p50 {_ms(stats['p50'])}, p99 {_ms(stats['p99'])}, max {_ms(stats['max'])}, "
+            f"{stats['stalls']} stalls"
+        )
+        if stats["last_stall"]:
+            _, seconds, task, culprit = stats["last_stall"]
+            summary += f"\nlast: {_ms(seconds)} in {task} at {culprit}"
+        return summary[:1024]
+
+    def _status_embed(self, diagnostics: bool = False) -> discord.Embed:
+        """Latency, uptime and servers; with diagnostics also the internal state (admins only)."""
         latency = round(self.bot.latency * 1000)  # ms
         uptime = time.time() - self.start_time
 
@@ -26,29 +182,55 @@ class Health(commands.Cog):
         embed.add_field(name="Latency", value=f"{latency} ms", inline=True)
         embed.add_field(name="Uptime", value=uptime_str, inline=True)
         embed.add_field(name="Servers", value=str(len(self.bot.guilds)), inline=True)
+        if diagnostics:
+            embed.add_field(name="HTTP Pool", value=self.http_pool_summary(), inline=False)
+            embed.add_field(name="Player Cache", value=self.player_cache_summary(), inline=False)
+            embed.add_field(name="Player API", value=self.player_api_summary(), inline=False)
+            embed.add_field(name="Code Scraper", value=self.scraper_summary(), inline=False)
+            embed.add_field(name="/codes Latency", value=self.codes_latency_summary(), inline=False)
+            embed.add_field(name="Storage Writes", value=self.storage_summary(), inline=False)
+            embed.add_field(name="Outbox", value=self.outbox_summary(), inline=False)
+            embed.add_field(name="Nickname Sync", value=self.nickname_sync_summary(), inline=False)
+            embed.add_field(name="Verification", value=self.verification_summary(), inline=False)
+            embed.add_field(name="Cluster", value=self.cluster_summary(), inline=False)
+            embed.add_field(name="Event Loop", value=self.event_loop_summary(), inline=False)
+        return embed
 
-        await ctx.send(embed=embed)
+    # --- Classic command for latency/uptime ---
+    @commands.command(name="ping")
+    async def ping(self, ctx):
+        # posted in the channel for everyone to see: no internal state
+        await ctx.send(embed=self._status_embed())
         logger.info("Ping command used.")
 
     # --- Slash command version of ping ---
     @app_commands.command(name="ping", description="Check bot latency, uptime, and server count")
     async def ping_slash(self, interaction: discord.Interaction):
-        latency = round(self.bot.latency * 1000)
-        uptime = time.time() - self.start_time
-
-        days, remainder = divmod(int(uptime), 86400)
-        hours, remainder = divmod(remainder, 3600)
-        minutes, seconds = divmod(remainder, 60)
-        uptime_str = f"{days}d {hours}h {minutes}m {seconds}s"
-
-        embed = discord.Embed(title="🤖 Bot Health Check", color=discord.Color.green())
-        embed.add_field(name="Latency", value=f"{latency} ms", inline=True)
-        embed.add_field(name="Uptime", value=uptime_str, inline=True)
-        embed.add_field(name="Servers", value=str(len(self.bot.guilds)), inline=True)
-
+        # ephemeral; admins also get the diagnostics
+        embed = self._status_embed(diagnostics=self.is_admin_or_owner(interaction.user))
         await interaction.response.send_message(embed=embed, ephemeral=True)
         logger.info("Ping slash command used.")
 
+    # --- Sampling profile of the running bot (owner only) ---
+    @app_commands.command(name="profile", description="Profile the bot for a few seconds and upload the hot spots (owner only)")
+    @app_commands.describe(seconds=f"How long to sample (1-{MAX_PROFILE_SECONDS})")
+    async def profile(self, interaction: discord.Interaction, seconds: app_commands.Range[int, 1, MAX_PROFILE_SECONDS] = 10):
+        app_owner = await self.bot.application_info()
+        if interaction.user.id != app_owner.owner.id:
+            await interaction.response.send_message("🚫 Only the bot owner can profile the bot.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        # sample this (the event loop's) thread from a worker thread
+        profiler = SamplingProfiler(threading.get_ident())
+        await asyncio.to_thread(profiler.run, seconds)
+        report = io.BytesIO(profiler.report().encode("utf-8"))
+        await interaction.followup.send(
+            f"⏱️ {profiler.samples} samples over {profiler.duration:.1f} s",
+            file=discord.File(report, filename=f"profile-{int(time.time())}.txt"),
+            ephemeral=True,
+        )
+        logger.info(f"Profile ({seconds}s) taken by {interaction.user}")
+
     # --- Shutdown (classic command) ---
     @commands.command(name="shutdown")
     @commands.is_owner()
@@ -0,0 +1,172 @@
+import discord
+from discord.ext import commands, tasks
+import asyncio
+import collections
+import logging
+import time
+from utils.registry import registry
+from utils.ratelimit import TokenBucket
+from utils.metrics import instrumented_loop
+
+logger = logging.getLogger("discord-bot.nickname_sync")
+
+WORKERS = 4
+EDIT_RATE = (5, 5.0, 2)         # per guild: rate, per seconds, burst
+RECONCILE_MINUTES = 10
+RECONCILE_SLICE = 500           # registered users checked per reconciliation pass
+MAX_NICK_LENGTH = 32
+RATE_WINDOW = 60                # seconds edits/sec is averaged over
+
+
+class NicknameSync(commands.Cog):
+    """
+    Keeps server nicknames equal to the registered in-game nickname.
+    Only users marked dirty (registry change, nickname edited in Discord,
+    rejoin) are looked at; members are resolved by ID in each guild and
+    edits go through a small worker pool with a per-guild token bucket.
+    A low-priority reconciliation pass checks a slice of the registry per run
+    to catch anything the events missed. In a cluster each process only
+    sees the guilds of its own shards, so the work partitions itself.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._dirty = set()
+        self._queue = asyncio.Queue()
+        self._buckets = {}          # guild_id -> TokenBucket
+        self._workers = []
+        self._cursor = 0
+        self._recent_edits = collections.deque()
+        self.edits = 0
+        self.skipped = 0
+        self.failed = 0
+
+    async def cog_load(self):
+        registry.add_listener(self.on_registry_change)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(WORKERS)]
+        self.reconcile.start()
+
+    async def cog_unload(self):
+        registry.remove_listener(self.on_registry_change)
+        self.reconcile.cancel()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # --- Dirty set ---
+    def mark_dirty(self, discord_id):
+        discord_id = str(discord_id)
+        if discord_id not in self._dirty:
+            self._dirty.add(discord_id)
+            self._queue.put_nowait(discord_id)
+
+    def on_registry_change(self, discord_id, before, after):
+        if after and (not before or before.get("nickname") != after.get("nickname")):
+            self.mark_dirty(discord_id)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.nick != after.nick and after.id in registry:
+            self.mark_dirty(after.id)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        if member.id in registry:
+            self.mark_dirty(member.id)
+
+    # --- Workers ---
+    @staticmethod
+    def target_nick(record) -> str:
+        nickname = (record or {}).get("nickname")
+        return nickname[:MAX_NICK_LENGTH] if nickname else None
+
+    def needs_edit(self, member: discord.Member, nick: str) -> bool:
+        return bool(nick) and member.nick != nick
+
+    def can_edit(self, member: discord.Member) -> bool:
+        guild = member.guild
+        return member.id != guild.owner_id and guild.me.top_role > member.top_role
+
+    async def _worker(self):
+        await self.bot.wait_until_ready()
+        while True:
+            discord_id = await self._queue.get()
+            self._dirty.discard(discord_id)
+            nick = self.target_nick(registry.get(discord_id))
+            if not nick:
+                continue
+            for guild in self.bot.guilds:
+                member = guild.get_member(int(discord_id))
+                if member and self.needs_edit(member, nick):
+                    await self._edit(member, nick)
+
+    async def _edit(self, member: discord.Member, nick: str):
+        if not self.can_edit(member):
+            self.skipped += 1
+            return
+        bucket = self._buckets.get(member.guild.id)
+        if bucket is None:
+            bucket = self._buckets[member.guild.id] = TokenBucket(*EDIT_RATE)
+        await bucket.acquire()
+        try:
+            await member.edit(nick=nick, reason="Nickname sync")
+            self.edits += 1
+            self._recent_edits.append(time.monotonic())
+            logger.info(f"Synced nickname for {member} to {nick}")
+        except discord.Forbidden:
+            self.skipped += 1
+            logger.warning(f"Missing permissions to sync nickname for {member}")
+        except discord.HTTPException as e:
+            self.failed += 1
+            logger.warning(f"Nickname sync for {member} failed: {e}")
+
+    # --- Reconciliation ---
+    @tasks.loop(minutes=RECONCILE_MINUTES)
+    @instrumented_loop("nickname_reconcile", RECONCILE_MINUTES * 60)
+    async def reconcile(self):
+        """Check the next slice of registered users; skipped while events keep the workers busy."""
+        if len(self._dirty) >= RECONCILE_SLICE:
+            return
+        users = registry.items()
+        if not users:
+            return
+        if self._cursor >= len(users):
+            self._cursor = 0
+        batch = users[self._cursor:self._cursor + RECONCILE_SLICE]
+        self._cursor += len(batch)
+        marked = 0
+        for discord_id, record in batch:
+            nick = self.target_nick(record)
+            for guild in self.bot.guilds:
+                member = guild.get_member(int(discord_id))
+                if member and self.needs_edit(member, nick) and self.can_edit(member):
+                    self.mark_dirty(discord_id)
+                    marked += 1
+                    break
+        if marked:
+            logger.info(f"Nickname reconciliation queued {marked} of {len(batch)} users")
+
+    @reconcile.before_loop
+    async def before_reconcile(self):
+        await self.bot.wait_until_ready()
+
+    # --- Stats ---
+    def edits_per_second(self) -> float:
+        cutoff = time.monotonic() - RATE_WINDOW
+        while self._recent_edits and self._recent_edits[0] < cutoff:
+            self._recent_edits.popleft()
+        return len(self._recent_edits) / RATE_WINDOW
+
+    def stats(self) -> dict:
+        return {
+            "backlog": len(self._dirty),
+            "edits": self.edits,
+            "edits_per_second": self.edits_per_second(),
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(NicknameSync(bot))
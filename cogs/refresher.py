@@ -0,0 +1,138 @@
+import discord
+from discord.ext import commands, tasks
+import heapq
+import logging
+import math
+from utils import api
+from utils.registry import registry
+from utils.outbox import outbox
+from utils.cluster import cluster
+from utils.guild_settings import guild_settings
+from utils.metrics import instrumented_loop
+
+logger = logging.getLogger("discord-bot.refresher")
+
+TICK_SECONDS = 60
+DEFAULT_SWEEP_HOURS = 6      # a full roster pass is spread over this period
+DEFAULT_REQUEST_BUDGET = 30  # max API lookups per tick
+REFRESH_CONCURRENCY = 4
+
+# field -> label; only these produce change events
+TRACKED_FIELDS = {
+    "nickname": "Nickname",
+    "furnace_level": "Furnace Level",
+    "state_id": "State",
+    "avatar": "Avatar",
+}
+def diff_records(before: dict, after: dict) -> dict:
+    """field -> (old, new) for tracked fields that really changed."""
+    changes = {}
+    for field in TRACKED_FIELDS:
+        old, new = before.get(field), after.get(field)
+        # a field we never stored isn't a change, just a backfill
+        if old is None or new is None or old == new:
+            continue
+        changes[field] = (old, new)
+    return changes
+
+
+class Refresher(commands.Cog):
+    """Keeps registered profiles fresh by re-fetching the stalest slice each tick."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.sweep_hours = guild_settings.global_value("refresh_sweep_hours", DEFAULT_SWEEP_HOURS)
+        self.request_budget = guild_settings.global_value("refresh_request_budget", DEFAULT_REQUEST_BUDGET)
+        # the leader refreshes; every process announces in the guilds of its own shards
+        cluster.handle("player.update", lambda update: self.bot.dispatch("player_update", *update))
+
+    async def cog_load(self):
+        self.refresh_players.start()
+
+    def cog_unload(self):
+        self.refresh_players.cancel()
+
+    def batch_size(self, total: int) -> int:
+        """Users per tick so that the whole roster is covered once per sweep period."""
+        if total == 0:
+            return 0
+        ticks_per_sweep = max(1, self.sweep_hours * 3600 / TICK_SECONDS)
+        return min(self.request_budget, max(1, math.ceil(total / ticks_per_sweep)))
+
+    @tasks.loop(seconds=TICK_SECONDS)
+    @instrumented_loop("refresh_players", TICK_SECONDS)
+    async def refresh_players(self):
+        if not cluster.is_leader:
+            return
+        if not api.player_api_available():
+            logger.info("Player API circuit open; refresh skipped this tick")
+            return
+        stalest = heapq.nsmallest(
+            self.batch_size(len(registry)),
+            ((uid, rec) for uid, rec in registry.items() if rec.get("game_id")),
+            key=lambda item: item[1].get("refreshed_at", 0),
+        )
+        if not stalest:
+            return
+        # several Discord accounts may have registered the same Game ID; one lookup serves them all
+        by_game_id = {}
+        for uid, rec in stalest:
+            by_game_id.setdefault(rec["game_id"], []).append(uid)
+
+        changed = 0
+        updated = {}
+        async for fid, data in api.get_players(by_game_id, concurrency=REFRESH_CONCURRENCY, force_refresh=True):
+            for uid in by_game_id[fid]:
+                before = registry.get(uid)
+                if before is None:  # unregistered meanwhile
+                    continue
+                if not data.get("data"):
+                    # not stamped: still the stalest, so it's retried next tick
+                    logger.warning(f"Refresh failed for {uid} (Game ID {fid}): {data.get('error') or data.get('msg')}")
+                    continue
+
+                after = {**before, **api.player_record(data["data"])}
+                updated[uid] = after
+                changes = diff_records(before, after)
+                if changes:
+                    changed += 1
+                    self.bot.dispatch("player_update", int(uid), before, after, changes)
+                    await cluster.post("player.update", [int(uid), before, after, changes])
+
+        registry.upsert_many(updated)
+        logger.info(f"Refreshed {len(stalest)}/{len(registry)} players, {changed} changed")
+
+    @refresh_players.before_loop
+    async def before_refresh_players(self):
+        await self.bot.wait_until_ready()
+
+    @commands.Cog.listener()
+    async def on_player_update(self, discord_id: int, before: dict, after: dict, changes: dict):
+        """Announce profile changes in the /setchannel channel of every server the player is in."""
+        lines = []
+        for field, (old, new) in changes.items():
+            if field == "avatar":
+                lines.append(f"• {TRACKED_FIELDS[field]} updated")
+            else:
+                lines.append(f"• {TRACKED_FIELDS[field]}: `{old}` → `{new}`")
+        logger.info(f"Player {discord_id} changed: {changes}")
+
+        channel_ids = {
+            guild_settings.get(guild.id, "channel_id")
+            for guild in self.bot.guilds if guild.get_member(discord_id)
+        } - {None}
+        if not channel_ids:
+            return
+        embed = discord.Embed(
+            title=f"🔔 Player update: {after.get('nickname')}",
+            description=f"<@{discord_id}> (Game ID: {after.get('game_id')})\n" + "\n".join(lines),
+            color=discord.Color.orange()
+        )
+        if "avatar" in changes:
+            embed.set_thumbnail(url=after.get("avatar"))
+        for channel_id in channel_ids:
+            outbox.send(self.bot.resolve_channel(channel_id), embed=embed)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Refresher(bot))
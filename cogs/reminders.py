@@ -1,20 +1,35 @@
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
-from datetime import datetime, timedelta, timezone, date
-import asyncio
+from discord.ext import commands
+from datetime import datetime, timedelta, timezone
 import logging
+from utils.scheduler import ReminderScheduler
+from utils.outbox import outbox
+from utils.cluster import cluster
 
 log = logging.getLogger("discord-bot.reminder")
 
 class Reminder(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.reminders = []
-        self.check_reminders.start()
+        self.scheduler = ReminderScheduler(self.send_reminder)
+        # reminders set on any cluster process are scheduled by the leader
+        cluster.handle("reminders.add", self.scheduler.add, leader_only=True)
 
-    def cog_unload(self):
-        self.check_reminders.cancel()
+    async def cog_load(self):
+        cluster.add_leadership_listener(self.on_leadership)
+
+    async def cog_unload(self):
+        cluster.remove_leadership_listener(self.on_leadership)
+        await self.scheduler.stop()
+
+    async def on_leadership(self, leader: bool):
+        """Reminders fire from the cluster leader only."""
+        if leader:
+            await self.scheduler.load_async()
+            self.scheduler.start()
+        else:
+            await self.scheduler.stop()
 
     def get_admin_cog(self):
         return self.bot.get_cog("Admin")
@@ -35,7 +50,10 @@ class Reminder(commands.Cog):
             try:
                 dt = datetime.strptime(input_str, fmt)
                 if fmt == "%H:%M":
-                    dt = datetime.combine(date.today(), dt.time())
+                    now = datetime.now(timezone.utc)
+                    dt = datetime.combine(now.date(), dt.time(), tzinfo=timezone.utc)
+                    if dt <= now:
+                        dt += timedelta(days=1)  # time already passed today → tomorrow
                 return dt.replace(tzinfo=timezone.utc)
             except ValueError:
                 continue
@@ -52,7 +70,10 @@ class Reminder(commands.Cog):
             await interaction.response.send_message(f"❌ {e}", ephemeral=True)
             return
 
-        self.reminders.append({"channel_id": interaction.channel.id, "message": message, "time": target_time, "once": True})
+        await cluster.post("reminders.add", {
+            "channel_id": interaction.channel.id, "message": message,
+            "fire_at": target_time.timestamp(), "once": True
+        })
         await interaction.response.send_message(
             f"✅ One-time reminder set for {target_time.strftime('%Y-%m-%d %H:%M UTC')}.", ephemeral=True
         )
@@ -68,30 +89,19 @@ class Reminder(commands.Cog):
             await interaction.response.send_message(f"❌ {e}", ephemeral=True)
             return
 
-        self.reminders.append({"channel_id": interaction.channel.id, "message": message, "time": target_time, "once": False, "interval_days": 2})
+        await cluster.post("reminders.add", {
+            "channel_id": interaction.channel.id, "message": message,
+            "fire_at": target_time.timestamp(), "once": False, "interval_days": 2
+        })
         await interaction.response.send_message(
             f"✅ Bear Trap reminder set for {target_time.strftime('%H:%M UTC')} (every 2 days).", ephemeral=True
         )
 
-    @tasks.loop(seconds=30)
-    async def check_reminders(self):
-        now = datetime.now(timezone.utc)
-        for reminder in list(self.reminders):
-            delta = (reminder["time"] - now).total_seconds()
-            if 0 <= delta <= 30:
-                await asyncio.sleep(delta)
-                channel = self.bot.get_channel(reminder["channel_id"])
-                if channel:
-                    await channel.send(f"@everyone ⏰ Reminder: {reminder['message']}")
-                if reminder.get("once"):
-                    self.reminders.remove(reminder)
-                else:
-                    interval = reminder.get("interval_days", 1)
-                    reminder["time"] += timedelta(days=interval)
-
-    @check_reminders.before_loop
-    async def before_check_reminders(self):
+    async def send_reminder(self, reminder: dict):
         await self.bot.wait_until_ready()
+        channel = self.bot.resolve_channel(reminder["channel_id"])
+        outbox.send(channel, f"@everyone ⏰ Reminder: {reminder['message']}")
+        log.info(f"Queued reminder #{reminder['id']} to channel {reminder['channel_id']}")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Reminder(bot))
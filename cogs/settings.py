@@ -1,23 +1,44 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from utils.storage import load_json, save_json
-
-SETTINGS_FILE = "data/settings.json"
+from utils.guild_settings import guild_settings
 
 class Settings(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    def get_admin_cog(self):
+        return self.bot.get_cog("Admin")
+
+    def is_admin_or_owner(self, user: discord.User) -> bool:
+        admin_cog = self.get_admin_cog()
+        if not admin_cog:
+            return False
+        return admin_cog.is_admin_or_owner(user)
+
     @app_commands.command(name="setchannel", description="Set the default channel for notifications")
     @app_commands.describe(channel="Select a channel")
     async def setchannel(self, interaction: discord.Interaction, channel: discord.TextChannel):
-        settings = load_json(SETTINGS_FILE, {})
-        settings["channel_id"] = channel.id
-        save_json(SETTINGS_FILE, settings)
+        await guild_settings.update(interaction.guild_id, channel_id=channel.id)
         await interaction.response.send_message(
             f"✅ Notifications will now go to {channel.mention}", ephemeral=True
         )
 
+    @app_commands.guild_only()
+    @app_commands.command(name="setroles", description="Set the verification role names for this server (admins only)")
+    @app_commands.describe(verified="Role given after verification", unverified="Role given on join until verified")
+    async def setroles(self, interaction: discord.Interaction, verified: str = None, unverified: str = None):
+        if not self.is_admin_or_owner(interaction.user):
+            await interaction.response.send_message("🚫 Only admins can change role settings.", ephemeral=True)
+            return
+        changes = {key: value for key, value in (("verified_role", verified), ("unverified_role", unverified)) if value}
+        if changes:
+            await guild_settings.update(interaction.guild_id, **changes)
+        await interaction.response.send_message(
+            f"✅ Verified role: **{guild_settings.get(interaction.guild_id, 'verified_role')}**, "
+            f"unverified role: **{guild_settings.get(interaction.guild_id, 'unverified_role')}**",
+            ephemeral=True
+        )
+
 async def setup(bot):
     await bot.add_cog(Settings(bot))
@@ -1,92 +1,108 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from utils import api, storage
-import json, os, logging
+from utils import api
+from utils.registry import registry
+import logging
+import re
 
 logger = logging.getLogger("discord-bot.users")
-DATA_FILE = "data/users.json"
 
-def load_users():
-    if not os.path.exists(DATA_FILE):
-        return {}
-    try:
-        with open(DATA_FILE, "r") as f:
-            data = json.load(f)
-            return data if isinstance(data, dict) else {}
-    except json.JSONDecodeError:
-        logger.error("users.json corrupt, resetting")
-        return {}
+MENTION_RE = re.compile(r"<@!?(\d+)>")
+MAX_CHOICE_NAME = 100
 
-def save_users(users):
-    os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-    with open(DATA_FILE, "w") as f:
-        json.dump(users, f, indent=2)
+
+def parse_mention(text: str):
+    """User ID from a <@id> / <@!id> mention, or None."""
+    match = MENTION_RE.fullmatch(text.strip())
+    return int(match.group(1)) if match else None
+
+
+async def player_autocomplete(interaction: discord.Interaction, current: str):
+    """Registered players whose nickname or Game ID starts with what was typed; the value is the Game ID."""
+    return [
+        app_commands.Choice(
+            name=f"{record.get('nickname')} ({record['game_id']})"[:MAX_CHOICE_NAME],
+            value=str(record["game_id"])
+        )
+        for _, record in registry.search(current)
+        if record.get("game_id")
+    ]
 
 class Users(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.users = load_users()
+
+    def get_admin_cog(self):
+        return self.bot.get_cog("Admin")
+
+    def is_admin_or_owner(self, user: discord.User) -> bool:
+        admin_cog = self.get_admin_cog()
+        if not admin_cog:
+            return False
+        return admin_cog.is_admin_or_owner(user)
 
     @app_commands.command(name="register", description="Register your WOS Game ID")
     @app_commands.describe(game_id="Your Whiteout Survival Game ID")
     async def register(self, interaction: discord.Interaction, game_id: str):
         discord_id = str(interaction.user.id)
-        data = await api.get_player_info(game_id)
-        if not data or "data" not in data:
-            await interaction.response.send_message(
-                f"⚠️ Failed to fetch data for Game ID `{game_id}`.", ephemeral=True
+        # deferred: the lookup may queue behind a burst for longer than Discord's 3 s
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        data = await api.get_player_info(game_id, max_wait=api.INTERACTIVE_MAX_WAIT)
+        if not data or not data.get("data"):
+            await interaction.followup.send(
+                api.unavailable_message(data) or f"⚠️ Failed to fetch data for Game ID `{game_id}`.", ephemeral=True
             )
             return
         player = data["data"]
         # Save user info
-        self.users[discord_id] = {
-            "game_id": str(player.get("fid")),
-            "nickname": player.get("nickname"),
-            "state_id": player.get("kid"),
-            "furnace_level": player.get("stove_lv"),
-            "furnace_image": player.get("stove_lv_content"),
-            "avatar": player.get("avatar_image"),
-        }
-        save_users(self.users)
+        registry.upsert(discord_id, api.player_record(player))
         try:
             await interaction.user.edit(nick=player.get("nickname"))
         except discord.Forbidden:
             logger.warning(f"Missing permission to update nickname for {interaction.user}")
-        await interaction.response.send_message(
+        await interaction.followup.send(
             f"✅ Registered **{player.get('nickname')}** (Game ID: {player.get('fid')})",
             ephemeral=True
         )
 
     @app_commands.command(name="userinfo", description="Get player info")
-    @app_commands.describe(target="Mention user or enter Game ID (optional)")
-    async def userinfo(self, interaction: discord.Interaction, target: str = None):
+    @app_commands.describe(
+        target="Mention a user, enter a Game ID or start typing a nickname (optional)",
+        refresh="Bypass the cache and fetch fresh data (admins only)"
+    )
+    @app_commands.autocomplete(target=player_autocomplete)
+    async def userinfo(self, interaction: discord.Interaction, target: str = None, refresh: bool = False):
         game_id = None
         member = None
+        mentioned_id = parse_mention(target) if target else None
         if target is None:
             discord_id = str(interaction.user.id)
-            if discord_id not in self.users:
+            if discord_id not in registry:
                 await interaction.response.send_message(
                     "❌ You are not registered.", ephemeral=True
                 )
                 return
-            game_id = self.users[discord_id]["game_id"]
+            game_id = registry.get(discord_id)["game_id"]
             member = interaction.user
-        elif interaction.guild and target in [m.mention for m in interaction.guild.members]:
-            member = interaction.guild.get_member(int(target.strip("<@!>")))
-            if not member or str(member.id) not in self.users:
+        elif mentioned_id is not None:
+            record = registry.get(mentioned_id)
+            if not record:
                 await interaction.response.send_message(
                     f"❌ {target} is not registered.", ephemeral=True
                 )
                 return
-            game_id = self.users[str(member.id)]["game_id"]
+            member = interaction.guild.get_member(mentioned_id) if interaction.guild else None
+            game_id = record["game_id"]
         else:
             game_id = target
 
-        data = await api.get_player_info(game_id)
-        if not data or "data" not in data:
-            await interaction.response.send_message(
-                f"⚠️ Failed to fetch info for Game ID `{game_id}`.", ephemeral=True
+        force_refresh = refresh and self.is_admin_or_owner(interaction.user)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        data = await api.get_player_info(game_id, force_refresh=force_refresh, max_wait=api.INTERACTIVE_MAX_WAIT)
+        if not data or not data.get("data"):
+            await interaction.followup.send(
+                api.unavailable_message(data) or f"⚠️ Failed to fetch info for Game ID `{game_id}`.", ephemeral=True
             )
             return
         player = data["data"]
@@ -101,7 +117,7 @@ class Users(commands.Cog):
         embed.set_image(url=player.get("stove_lv_content"))
         if member:
             embed.set_footer(text=f"Requested by {interaction.user}", icon_url=interaction.user.display_avatar.url)
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Users(bot))
@@ -1,139 +1,148 @@
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
+from discord.ext import commands
 import logging
 import asyncio
 from utils import api, storage
+from utils.registry import registry
+from utils.guild_settings import guild_settings
+from utils.metrics import metrics
+from utils.outbox import outbox
+from utils.verification import VerificationSessions
 
 log = logging.getLogger("discord-bot.verify")
 
-USERS_FILE = "data/users.json"
-UNVERIFIED_ROLE_NAME = "Unverified"
-VERIFIED_ROLE_NAME = "Verified"
+PANEL_BUTTON_ID = "wos:verify:start"     # stable across restarts; the panel message keeps working
 
 class Verify(commands.Cog):
+    """
+    Onboarding through one persistent panel per server. New members get the
+    unverified role and a mention next to the panel, through a rate-controlled
+    join queue; the panel's button opens the Game ID modal. Pending members are
+    tracked as sessions in utils/verification.py.
+    """
+
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        storage.ensure_data_dir()
-        self.users = storage.load_json(USERS_FILE, {})
-        self.sync_nicknames.start()
+        self.sessions = VerificationSessions(on_admit=self.admit, on_expire=self.session_expired)
+        metrics.gauge("wos_verify_sessions", "Members who joined and haven't verified yet", lambda: len(self.sessions.sessions))
+        metrics.gauge("wos_verify_join_queue_depth", "Joins waiting to be admitted", self.sessions.join_queue_depth)
+
+    async def cog_load(self):
+        await asyncio.to_thread(storage.ensure_data_dir)
+        await self.sessions.load_async()
+        self.sessions.start()
+        # custom_id routing: panels posted before a restart keep working
+        self.bot.add_view(self.VerifyPanel(self))
+
+    async def cog_unload(self):
+        await self.sessions.stop()
+
+    def is_admin_or_owner(self, user: discord.User) -> bool:
+        admin_cog = self.bot.get_cog("Admin")
+        if not admin_cog:
+            return False
+        return admin_cog.is_admin_or_owner(user)
+
+    @staticmethod
+    def role(guild, key: str):
+        return discord.utils.get(guild.roles, name=guild_settings.get(guild.id, key))
+
+    # --- Persistent panel ---
+    class VerifyPanel(discord.ui.View):
+        def __init__(self, cog):
+            super().__init__(timeout=None)
+            self.cog = cog
 
-    def cog_unload(self):
-        self.sync_nicknames.cancel()
+        @discord.ui.button(label="Verify", style=discord.ButtonStyle.green, custom_id=PANEL_BUTTON_ID)
+        async def verify(self, interaction: discord.Interaction, button: discord.ui.Button):
+            if interaction.user.id in registry:
+                await interaction.response.send_message("✅ You're already verified.", ephemeral=True)
+                return
+            await interaction.response.send_modal(self.cog.VerifyModal(self.cog))
 
     # --- Verification modal ---
     class VerifyModal(discord.ui.Modal):
-        def __init__(self, cog, user):
+        def __init__(self, cog):
+            # default random custom_id: discord.py routes submits by it, and
+            # many members have this modal open at once during a join raid
             super().__init__(title="Verify your Game ID")
             self.cog = cog
-            self.user = user
             self.add_item(discord.ui.TextInput(label="Enter your Game ID"))
 
         async def on_submit(self, interaction: discord.Interaction):
             game_id = self.children[0].value.strip()
-            data = await api.get_player_info(game_id)
-            if not data or "data" not in data:
-                await interaction.response.send_message("❌ Invalid Game ID, try again.", ephemeral=True)
+            # deferred: during a raid the lookup may queue for longer than Discord's 3 s
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            data = await api.get_player_info(game_id, max_wait=api.INTERACTIVE_MAX_WAIT)
+            if not data or not data.get("data"):
+                await interaction.followup.send(
+                    api.unavailable_message(data) or "❌ Invalid Game ID, try again.", ephemeral=True
+                )
                 return
             player = data["data"]
 
-            # Update users.json
-            self.cog.users[str(self.user.id)] = {
-                "game_id": str(player.get("fid")),
-                "nickname": player.get("nickname"),
-                "state_id": player.get("kid"),
-                "furnace_level": player.get("stove_lv"),
-                "furnace_image": player.get("stove_lv_content"),
-                "avatar": player.get("avatar_image"),
-            }
-            storage.save_json(USERS_FILE, self.cog.users)
-
-            # Roles
-            guild = self.user.guild
-            verified_role = discord.utils.get(guild.roles, name=VERIFIED_ROLE_NAME)
-            unverified_role = discord.utils.get(guild.roles, name=UNVERIFIED_ROLE_NAME)
-            if unverified_role:
-                await self.user.remove_roles(unverified_role)
-            if verified_role:
-                await self.user.add_roles(verified_role)
-
-            # Update nickname
-            try:
-                await self.user.edit(nick=player.get("nickname"))
-                log.info(f"Updated nickname for {self.user} to {player.get('nickname')}")
-            except discord.Forbidden:
-                log.warning(f"Missing permissions to update nickname for {self.user}")
-
-            # Delete temporary channel
-            try:
-                await interaction.channel.delete()
-            except Exception:
-                pass
-
-            await interaction.response.send_message(f"✅ Verified as {player.get('nickname')}!", ephemeral=True)
+            # Update the registry (persists to the store); nickname sync renames the member
+            member = interaction.user
+            registry.upsert(member.id, api.player_record(player))
+
+            # Roles are applied in the next batch
+            guild = member.guild
+            verified_role = self.cog.role(guild, "verified_role")
+            unverified_role = self.cog.role(guild, "unverified_role")
+            self.cog.sessions.change_roles(
+                member,
+                add=[verified_role] if verified_role else [],
+                remove=[unverified_role] if unverified_role else [],
+            )
+            self.cog.sessions.close(guild.id, member.id, verified=True)
+
+            await interaction.followup.send(f"✅ Verified as {player.get('nickname')}!", ephemeral=True)
+
+    @app_commands.command(name="verifypanel", description="Post the verification panel in this channel (admins only)")
+    async def verify_panel(self, interaction: discord.Interaction):
+        if not self.is_admin_or_owner(interaction.user):
+            await interaction.response.send_message("🚫 You don’t have permission to post the verification panel.", ephemeral=True)
+            return
+        embed = discord.Embed(
+            title="🔐 Verification",
+            description="Press **Verify** and enter your Whiteout Survival Game ID to get access to the server.",
+            color=discord.Color.green(),
+        )
+        await interaction.channel.send(embed=embed, view=self.VerifyPanel(self))
+        await guild_settings.update(interaction.guild_id, verify_channel_id=interaction.channel.id)
+        await interaction.response.send_message("✅ Verification panel posted; new members will be pointed here.", ephemeral=True)
 
     # --- Event: new member joins ---
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
-        if str(member.id) not in self.users:
-            await self.assign_unverified(member)
-            await self.send_verification_channel(member)
-
-    async def assign_unverified(self, member):
-        role = discord.utils.get(member.guild.roles, name=UNVERIFIED_ROLE_NAME)
+        if member.id not in registry:
+            self.sessions.enqueue(member)
+
+    async def admit(self, member) -> bool:
+        """A queued join's turn: unverified role (batched) and a mention next to the panel."""
+        if member.id in registry or member.guild.get_member(member.id) is None:
+            return False    # verified or left while queued
+        role = self.role(member.guild, "unverified_role")
         if role:
-            await member.add_roles(role)
-
-    async def send_verification_channel(self, member):
-        overwrites = {
-            member.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-            member: discord.PermissionOverwrite(read_messages=True, send_messages=True)
-        }
-        temp_channel = await member.guild.create_text_channel(
-            name=f"verify-{member.name}", overwrites=overwrites, reason="Verification channel"
-        )
-        modal = self.VerifyModal(self, member)
-        view = discord.ui.View()
-        button = discord.ui.Button(label="Verify", style=discord.ButtonStyle.green)
-        async def button_callback(interaction: discord.Interaction):
-            await interaction.response.send_modal(modal)
-        button.callback = button_callback
-        view.add_item(button)
-        msg = await temp_channel.send(
-            f"Hello {member.mention}, click the button below to verify your Game ID.", view=view
-        )
-        await asyncio.sleep(3600)  # auto-delete channel after 1 hour if still exists
-        try:
-            await temp_channel.delete()
-        except Exception:
-            pass
+            self.sessions.change_roles(member, add=[role])
+        channel_id = guild_settings.get(member.guild.id, "verify_channel_id")
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if channel:
+            # the outbox merges a burst of these into a few messages
+            outbox.send(channel, f"👋 Welcome {member.mention}! Press **Verify** on the panel to link your Game ID.")
+        return True
+
+    async def session_expired(self, session: dict):
+        log.info(f"Verification window for member {session['member_id']} in guild {session['guild_id']} expired")
 
     # --- Event: member leaves ---
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
-        if str(member.id) in self.users:
-            del self.users[str(member.id)]
-            storage.save_json(USERS_FILE, self.users)
-            log.info(f"Deleted {member} from users.json due to leaving the server.")
-
-    # --- Hourly nickname sync ---
-    @tasks.loop(hours=1)
-    async def sync_nicknames(self):
-        for guild in self.bot.guilds:
-            for member in guild.members:
-                uid = str(member.id)
-                if uid in self.users:
-                    target_nick = self.users[uid].get("nickname")
-                    if target_nick and member.nick != target_nick:
-                        try:
-                            await member.edit(nick=target_nick)
-                            log.info(f"Synced nickname for {member} to {target_nick}")
-                        except discord.Forbidden:
-                            log.warning(f"Missing permissions to sync nickname for {member}")
-
-    @sync_nicknames.before_loop
-    async def before_sync(self):
-        await self.bot.wait_until_ready()
+        self.sessions.drop_role_changes(member.guild.id, member.id)
+        self.sessions.close(member.guild.id, member.id)
+        if registry.remove(member.id):
+            log.info(f"Deleted {member} from registered users due to leaving the server.")
 
 
 async def setup(bot: commands.Bot):
@@ -1,7 +1,12 @@
+import asyncio
+import contextvars
 import hashlib
 import time
-import aiohttp
 import logging
+from utils.http_client import client as http_client
+from utils.cache import SingleFlightCache
+from utils.metrics import metrics, timed
+from utils.ratelimit import AdaptiveLimiter, CircuitBreaker
 
 logger = logging.getLogger("discord-bot.api")
 
@@ -10,31 +15,214 @@ PLAYER_API_URL = "https://wos-giftcode-api.centurygame.com/api/player"
 # Redeem endpoint unknown or protected; left as placeholder
 REDEEM_API_URL = "https://wos-giftcode.centurygame.com/redeem"  # placeholder
 
+PLAYER_CACHE_SIZE = 5000
+PLAYER_CACHE_TTL = 300       # seconds a fetched profile is reused
+PLAYER_NEGATIVE_TTL = 120    # seconds an unknown Game ID is remembered
+PLAYER_BATCH_CONCURRENCY = 8 # parallel lookups for get_players()
+
+# Client-side protection for the player API; override in settings.json under "player_api".
+# Trade-off: a higher rate absorbs bigger bursts but risks 429s from CenturyGame (the
+# concurrency window then backs off); a longer wait turns fewer users away with "try
+# again" but leaves them on "thinking…" for longer. Interactive lookups defer their
+# interaction first, so they may wait well past Discord's 3 s deadline and get the
+# long budget; background batches get the short one and give way to users.
+PLAYER_API_RATE = 20            # requests per second
+PLAYER_API_BURST = 50           # 50 + 20/s × 25 s covers ~550 lookups arriving at once
+PLAYER_API_MAX_CONCURRENCY = 16 # keep below the HTTP pool's per-host limit
+PLAYER_API_LATENCY_TARGET = 2.0 # seconds; slower answers shrink the concurrency window
+PLAYER_API_MAX_WAIT = 2.0       # seconds a background lookup may queue
+INTERACTIVE_MAX_WAIT = 25.0     # seconds a lookup for a deferred interaction may queue
+PLAYER_API_FAILURE_THRESHOLD = 5  # consecutive 429/5xx/timeouts that open the circuit
+PLAYER_API_RESET_TIMEOUT = 30   # seconds the circuit stays open before a probe
+
+PLAYER_INFO_SECONDS = metrics.histogram("wos_player_info_seconds", "get_player_info calls, cache hits included")
+PLAYER_API_SECONDS = metrics.histogram("wos_player_api_seconds", "Player API requests", ["outcome"])
+PLAYER_API_REJECTED = metrics.counter(
+    "wos_player_api_rejected_total", "Lookups failed fast without calling the player API", ["reason"]
+)
+
+UNAVAILABLE_MESSAGE = "⏳ The game's player service isn't responding right now. Please try again in about {seconds} s."
+BUSY_MESSAGE = "⏳ Too many lookups at once right now. Please try again in a few seconds."
+
+# queue budget of the lookup being fetched; None means the limiter's default
+_max_wait = contextvars.ContextVar("player_api_max_wait", default=None)
+
+def player_record(player: dict) -> dict:
+    """users.json record for a player payload from the API."""
+    return {
+        "game_id": str(player.get("fid")),
+        "nickname": player.get("nickname"),
+        "state_id": player.get("kid"),
+        "furnace_level": player.get("stove_lv"),
+        "furnace_image": player.get("stove_lv_content"),
+        "avatar": player.get("avatar_image"),
+        "refreshed_at": time.time(),
+    }
+
 def _make_signature(fid: str):
     ts = str(int(time.time() * 1000))  # milliseconds
     form = f"fid={fid}&time={ts}"
     sign = hashlib.md5((form + API_SECRET).encode("utf-8")).hexdigest()
     return sign, ts
 
-async def get_player_info(fid: str):
-    """Async fetch of player info from CenturyGame API."""
+def _is_unknown_player(data) -> bool:
+    """API answered but has no player for this ID (e.g. "role not exist.")."""
+    return isinstance(data, dict) and "error" not in data and not data.get("data")
+
+def _is_cacheable(data) -> bool:
+    # transport/HTTP errors are transient; never cache them
+    return isinstance(data, dict) and "error" not in data
+
+@timed(PLAYER_INFO_SECONDS)
+async def get_player_info(fid: str, force_refresh: bool = False, max_wait: float = None):
+    """
+    Player info from CenturyGame, served from a short-lived cache.
+    Concurrent lookups for the same fid share one request.
+    Pass force_refresh=True to bypass the cache (admin commands), and
+    max_wait=INTERACTIVE_MAX_WAIT from commands that deferred their response.
+    """
+    token = _max_wait.set(max_wait)     # read by the fetch task, which copies this context
+    try:
+        return await player_cache.get(str(fid).strip(), force_refresh=force_refresh)
+    finally:
+        _max_wait.reset(token)
+
+def _unavailable(reason: str, retry_after: float = 0.0) -> dict:
+    PLAYER_API_REJECTED.labels(reason).inc()
+    return {"error": f"Player API {reason.replace('_', ' ')}", "unavailable": reason, "retry_after": retry_after}
+
+def unavailable_message(data):
+    """User-facing text if a lookup was failed fast by the limiter or circuit breaker, else None."""
+    if not isinstance(data, dict) or not data.get("unavailable"):
+        return None
+    if data["unavailable"] == "busy":
+        return BUSY_MESSAGE
+    return UNAVAILABLE_MESSAGE.format(seconds=max(1, round(data.get("retry_after", 0))))
+
+def player_api_available() -> bool:
+    """False while the circuit breaker is open (background jobs skip their turn)."""
+    return player_breaker.retry_after() == 0
+
+def _is_overload(status: int) -> bool:
+    return status == 429 or status >= 500
+
+async def _fetch_player_info(fid: str):
+    """Async fetch of player info from CenturyGame API, behind the limiter and circuit breaker."""
+    if not player_breaker.allow():
+        return _unavailable("circuit_open", player_breaker.retry_after())
+    if not await player_limiter.acquire(_max_wait.get()):
+        player_breaker.release_probe()
+        return _unavailable("busy")
+
     sign, ts = _make_signature(fid)
     payload = f"sign={sign}&fid={fid}&time={ts}"
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-    async with aiohttp.ClientSession() as session:
+    started = time.perf_counter()
+    outcome = "error"
+    healthy = None  # None: no answer either way (cancelled)
+    try:
+        session = await http_client.session()
+        async with session.post(PLAYER_API_URL, headers=headers, data=payload) as resp:
+            text = await resp.text()
+            if resp.status != 200:
+                outcome = f"http_{resp.status}"
+                healthy = not _is_overload(resp.status)
+                logger.error(f"Player API HTTP {resp.status}: {text}")
+                return {"error": f"HTTP {resp.status}", "raw": text}
+            healthy = True
+            data = await resp.json()
+            outcome = "ok"
+            logger.info(f"API: fetched player {fid}: {data}")
+            return data
+    except Exception as e:
+        # timeouts and connection errors count as overload, as does a bad body after a 200
+        healthy = False
+        logger.exception(f"Exception fetching player info for {fid}: {e}")
+        return {"error": str(e)}
+    finally:
+        elapsed = time.perf_counter() - started
+        PLAYER_API_SECONDS.labels(outcome).observe(elapsed)
+        player_limiter.release(elapsed, overloaded=healthy is False)
+        if healthy is None:
+            player_breaker.release_probe()
+        elif healthy:
+            if player_breaker.record_success():
+                logger.info("Player API recovered; circuit closed")
+        elif player_breaker.record_failure():
+            logger.warning(f"Player API failing; circuit open, lookups fail fast for {player_breaker.reset_timeout} s")
+
+player_limiter = AdaptiveLimiter(
+    PLAYER_API_RATE,
+    burst=PLAYER_API_BURST,
+    max_concurrency=PLAYER_API_MAX_CONCURRENCY,
+    latency_target=PLAYER_API_LATENCY_TARGET,
+    max_wait=PLAYER_API_MAX_WAIT,
+)
+player_breaker = CircuitBreaker(PLAYER_API_FAILURE_THRESHOLD, PLAYER_API_RESET_TIMEOUT)
+
+_BREAKER_OPTIONS = {"failure_threshold", "reset_timeout"}
+
+def configure_player_api(**options):
+    """Apply limiter/breaker overrides, e.g. settings.json "player_api": {"rate": 5, "max_concurrency": 8}."""
+    player_breaker.configure(**{k: v for k, v in options.items() if k in _BREAKER_OPTIONS})
+    player_limiter.configure(**{k: v for k, v in options.items() if k not in _BREAKER_OPTIONS})
+
+def player_api_stats() -> dict:
+    return {**player_limiter.stats(), "circuit": player_breaker.stats()}
+
+_CIRCUIT_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+metrics.gauge("wos_player_api_concurrency_limit", "Current AIMD concurrency window", lambda: int(player_limiter.limit))
+metrics.gauge("wos_player_api_in_flight", "Player API requests in flight", lambda: player_limiter.in_flight)
+metrics.gauge(
+    "wos_player_api_circuit_state", "Player API circuit (0 closed, 1 half-open, 2 open)",
+    lambda: _CIRCUIT_STATES[player_breaker.state],
+)
+
+player_cache = SingleFlightCache(
+    _fetch_player_info,
+    maxsize=PLAYER_CACHE_SIZE,
+    ttl=PLAYER_CACHE_TTL,
+    negative_ttl=PLAYER_NEGATIVE_TTL,
+    is_negative=_is_unknown_player,
+    is_cacheable=_is_cacheable,
+)
+
+async def get_players(fids, concurrency: int = PLAYER_BATCH_CONCURRENCY, force_refresh: bool = False):
+    """
+    Look up many players over a bounded worker pool.
+    Async iterator of (fid, data) in completion order; a failed lookup
+    yields its error dict ({"error": ...}) and the batch carries on.
+    """
+    pending = iter(dict.fromkeys(str(fid).strip() for fid in fids))
+    results = asyncio.Queue()
+    done = object()
+
+    async def worker():
         try:
-            async with session.post(PLAYER_API_URL, headers=headers, data=payload, timeout=15) as resp:
-                text = await resp.text()
-                if resp.status != 200:
-                    logger.error(f"Player API HTTP {resp.status}: {text}")
-                    return {"error": f"HTTP {resp.status}", "raw": text}
-                data = await resp.json()
-                logger.info(f"API: fetched player {fid}: {data}")
-                return data
-        except Exception as e:
-            logger.exception(f"Exception fetching player info for {fid}: {e}")
-            return {"error": str(e)}
+            for fid in pending:
+                try:
+                    data = await get_player_info(fid, force_refresh=force_refresh)
+                except Exception as e:
+                    logger.exception(f"Batch lookup failed for {fid}: {e}")
+                    data = {"error": str(e)}
+                await results.put((fid, data))
+        finally:
+            await results.put(done)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        remaining = len(workers)
+        while remaining:
+            item = await results.get()
+            if item is done:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
 
 async def redeem_code(fid: str, code: str):
     """
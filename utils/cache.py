@@ -0,0 +1,113 @@
+import asyncio
+import time
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger("discord-bot.cache")
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU mapping where every entry expires after its own TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        self._data.clear()
+
+
+class SingleFlightCache:
+    """
+    TTLCache front for an async loader. Concurrent misses for the same key
+    share one in-flight call; results the loader flags as negative are kept
+    for a shorter TTL so bad keys don't reach the backend on every retry.
+    """
+
+    def __init__(self, loader, maxsize: int, ttl: float, negative_ttl: float,
+                 is_negative=None, is_cacheable=None):
+        self.loader = loader
+        self.negative_ttl = negative_ttl
+        self.is_negative = is_negative or (lambda value: False)
+        self.is_cacheable = is_cacheable or (lambda value: True)
+        self._cache = TTLCache(maxsize, ttl)
+        self._inflight = {}
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, key, force_refresh: bool = False):
+        if not force_refresh:
+            value = self._cache.get(key, _MISSING)
+            if value is not _MISSING:
+                if self.is_negative(value):
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key))
+            self._inflight[key] = task
+        # shield so one cancelled caller doesn't cancel the fetch for everyone
+        return await asyncio.shield(task)
+
+    async def _load(self, key):
+        try:
+            value = await self.loader(key)
+            if self.is_negative(value):
+                self._cache.set(key, value, ttl=self.negative_ttl)
+            elif self.is_cacheable(value):
+                self._cache.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key):
+        self._cache.pop(key)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self._cache.evictions,
+            "inflight": len(self._inflight),
+        }
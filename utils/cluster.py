@@ -0,0 +1,331 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger("discord-bot.cluster")
+
+CLUSTER_FILE = "data/cluster.db"
+LEASE_NAME = "background"
+LEASE_TTL = 15.0            # a leader that hasn't renewed for this long is replaced
+TICK_SECONDS = 2.0          # lease renewal and message polling interval
+MESSAGE_RETENTION = 600     # seconds bus messages are kept
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name       TEXT PRIMARY KEY,
+    holder     TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    sender     TEXT NOT NULL,
+    topic      TEXT NOT NULL,
+    payload    TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    name TEXT PRIMARY KEY,
+    seq  INTEGER NOT NULL
+);
+"""
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """Discord's routing: the shard that receives a guild's events."""
+    return (int(guild_id) >> 22) % shard_count
+
+
+class ClusterConfig:
+    """
+    Read from the environment:
+      WOS_CLUSTER=1         enable cluster mode (implied by WOS_SHARD_IDS)
+      WOS_SHARD_COUNT       total shards across all processes
+      WOS_SHARD_IDS         comma-separated shards this process runs, e.g. "0,1"
+      WOS_CLUSTER_ID        name of this process (default host-pid)
+      WOS_CLUSTER_FILE      lease/message database shared by the processes
+    """
+
+    def __init__(self, enabled=False, shard_count=None, shard_ids=None, cluster_id=None, path=CLUSTER_FILE):
+        self.enabled = enabled
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+        self.cluster_id = cluster_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.path = path
+
+    @classmethod
+    def from_env(cls):
+        shard_ids = os.getenv("WOS_SHARD_IDS")
+        shard_count = os.getenv("WOS_SHARD_COUNT")
+        return cls(
+            enabled=os.getenv("WOS_CLUSTER") == "1" or bool(shard_ids),
+            shard_count=int(shard_count) if shard_count else None,
+            shard_ids=[int(s) for s in shard_ids.split(",")] if shard_ids else None,
+            cluster_id=os.getenv("WOS_CLUSTER_ID"),
+            path=os.getenv("WOS_CLUSTER_FILE", CLUSTER_FILE),
+        )
+
+
+class ClusterDB:
+    """The SQLite file processes share: the leader lease and a small message bus."""
+
+    def __init__(self, path: str = CLUSTER_FILE):
+        dirpath = os.path.dirname(path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def acquire_lease(self, name: str, holder: str, ttl: float) -> bool:
+        """Take or renew the lease; False while another holder's lease is still valid."""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+                if row and row[0] != holder and row[1] > now:
+                    self.conn.execute("COMMIT")
+                    return False
+                self.conn.execute(
+                    "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at",
+                    (name, holder, now + ttl),
+                )
+                self.conn.execute("COMMIT")
+                return True
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def release_lease(self, name: str, holder: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+    def lease_holder(self, name: str):
+        with self._lock:
+            row = self.conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+        return row[0] if row and row[1] > time.time() else None
+
+    def publish(self, sender: str, topic: str, payload) -> int:
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO messages (sender, topic, payload, created_at) VALUES (?, ?, ?, ?)",
+                (sender, topic, json.dumps(payload), time.time()),
+            )
+            return cursor.lastrowid
+
+    def fetch(self, after: int, limit: int = 500) -> list:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT seq, sender, topic, payload FROM messages WHERE seq > ? ORDER BY seq LIMIT ?", (after, limit)
+            ).fetchall()
+        return [(seq, sender, topic, json.loads(payload)) for seq, sender, topic, payload in rows]
+
+    def max_seq(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM messages").fetchone()[0]
+
+    def get_cursor(self, name: str, default: int = 0) -> int:
+        with self._lock:
+            row = self.conn.execute("SELECT seq FROM cursors WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def set_cursor(self, name: str, seq: int):
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO cursors (name, seq) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET seq = excluded.seq",
+                (name, seq),
+            )
+
+    def prune(self, before: float):
+        with self._lock:
+            self.conn.execute("DELETE FROM messages WHERE created_at < ?", (before,))
+
+
+class Cluster:
+    """
+    Coordinates several bot processes (each running some of the shards).
+
+    One process holds the "background" lease and is the leader: it owns the
+    global loops (code polling, auto-redeem, profile refresh, reminders).
+    The lease is renewed every tick; if the leader dies another process
+    takes over once the lease TTL has passed. Per-guild work needs no
+    coordination because Discord delivers a guild's events only to the
+    shard that owns it.
+
+    Processes talk through a message bus in the same database:
+    leader-only topics are consumed by whoever is leader (with a shared
+    cursor, so nothing is lost across failover); other topics are broadcast
+    to every process except the sender.
+
+    Without cluster mode this process is always the leader and post()
+    dispatches in-process.
+    """
+
+    def __init__(self, config: ClusterConfig = None, lease_ttl: float = LEASE_TTL, tick_seconds: float = TICK_SECONDS):
+        self.config = config or ClusterConfig.from_env()
+        self.lease_ttl = lease_ttl
+        self.tick_seconds = tick_seconds
+        self.db = None
+        self.is_leader = not self.config.enabled    # standalone: always the leader
+        self._listeners = []
+        self._handlers = {}         # topic -> (handler, leader_only)
+        self._cursor = 0
+        self._task = None
+        self.elections = 0
+        self.messages_handled = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    @property
+    def cluster_id(self) -> str:
+        return self.config.cluster_id
+
+    # --- Registration ---
+    def add_leadership_listener(self, callback):
+        """async callback(is_leader), called on every change. Called right away if already leader."""
+        self._listeners.append(callback)
+        if self.is_leader:
+            asyncio.create_task(self._call_listener(callback, True))
+
+    def remove_leadership_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def handle(self, topic: str, handler, leader_only: bool = False):
+        """handler(payload), sync or async."""
+        self._handlers[topic] = (handler, leader_only)
+
+    # --- Lifecycle ---
+    async def start(self):
+        if self._task or not self.enabled:
+            return
+        self.db = ClusterDB(self.config.path)
+        self._cursor = await asyncio.to_thread(self.db.max_seq)
+        await self._tick()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Cluster member {self.cluster_id} started (shards {self.config.shard_ids or 'auto'})")
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.db:
+            if self.is_leader:
+                # hand over right away instead of waiting for the lease to expire
+                await asyncio.to_thread(self.db.release_lease, LEASE_NAME, self.cluster_id)
+            self.db.close()
+            self.db = None
+            await self._set_leader(False)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                await self._tick()
+            except Exception as e:
+                logger.exception(f"Cluster tick failed: {e}")
+                # can't prove we still hold the lease: stop acting as leader
+                await self._set_leader(False)
+
+    async def _tick(self):
+        leader = await asyncio.to_thread(self.db.acquire_lease, LEASE_NAME, self.cluster_id, self.lease_ttl)
+        await self._set_leader(leader)
+        await self._drain()
+
+    async def _set_leader(self, leader: bool):
+        if leader == self.is_leader:
+            return
+        self.is_leader = leader
+        if leader:
+            self.elections += 1
+        logger.info(f"{self.cluster_id} is now {'leader' if leader else 'follower'}")
+        for callback in list(self._listeners):
+            await self._call_listener(callback, leader)
+
+    @staticmethod
+    async def _call_listener(callback, leader: bool):
+        try:
+            await callback(leader)
+        except Exception as e:
+            logger.exception(f"Leadership listener {callback} failed: {e}")
+
+    # --- Messages ---
+    async def post(self, topic: str, payload):
+        """
+        Leader-only topic: handled here if this process leads, otherwise queued
+        for the leader (returns None). Broadcast topic: sent to every other process.
+        """
+        _, leader_only = self._handlers.get(topic, (None, False))
+        if not self.enabled:
+            return await self._dispatch(topic, payload) if leader_only else None
+        if leader_only and self.is_leader:
+            return await self._dispatch(topic, payload)
+        await asyncio.to_thread(self.db.publish, self.cluster_id, topic, payload)
+        return None
+
+    async def _dispatch(self, topic: str, payload):
+        handler, _ = self._handlers.get(topic, (None, False))
+        if handler is None:
+            logger.warning(f"No handler for cluster topic {topic}")
+            return None
+        self.messages_handled += 1
+        result = handler(payload)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def _drain(self):
+        for seq, sender, topic, payload in await asyncio.to_thread(self.db.fetch, self._cursor):
+            self._cursor = seq
+            _, leader_only = self._handlers.get(topic, (None, False))
+            if not leader_only and sender != self.cluster_id:
+                await self._safe_dispatch(topic, payload)
+        if not self.is_leader:
+            return
+        leader_cursor = await asyncio.to_thread(self.db.get_cursor, "leader")
+        rows = await asyncio.to_thread(self.db.fetch, leader_cursor)
+        for seq, sender, topic, payload in rows:
+            _, leader_only = self._handlers.get(topic, (None, False))
+            if leader_only:
+                await self._safe_dispatch(topic, payload)
+            # per message, so a leader dying mid-batch re-delivers at most one
+            await asyncio.to_thread(self.db.set_cursor, "leader", seq)
+        await asyncio.to_thread(self.db.prune, time.time() - MESSAGE_RETENTION)
+
+    async def _safe_dispatch(self, topic, payload):
+        try:
+            await self._dispatch(topic, payload)
+        except Exception as e:
+            logger.exception(f"Cluster message {topic} failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "cluster_id": self.cluster_id,
+            "enabled": self.enabled,
+            "role": "leader" if self.is_leader else "follower",
+            "shard_ids": self.config.shard_ids,
+            "shard_count": self.config.shard_count,
+            "elections": self.elections,
+            "messages_handled": self.messages_handled,
+        }
+
+
+cluster = Cluster()
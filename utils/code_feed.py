@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from collections import namedtuple
+from utils import scraper
+from utils.cluster import cluster
+from utils.storage import get_store
+
+logger = logging.getLogger("discord-bot.code_feed")
+
+POLL_SECONDS = 60
+
+# One published change: codes that appeared / disappeared and the full active set
+CodeDiff = namedtuple("CodeDiff", ["added", "removed", "active", "checked_at"])
+
+
+class CodeFeed:
+    """
+    Sole poller of the gift-code site. Keeps the active set in memory and in
+    the store (so restarts don't re-announce), diffs it once per poll and
+    publishes each CodeDiff to every subscriber queue, so new consumers add
+    no upstream traffic. In a cluster only the leader polls and broadcasts
+    each successful check ("codes.checked"); followers mirror the active set
+    and the leader's check time, and publish nothing.
+    """
+
+    def __init__(self, poll_seconds: float = POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.active = []            # current codes, in site order
+        self.last_checked = None    # unix time of the last successful poll
+        self._subscribers = {}
+        self._task = None
+        self._refresh_task = None
+        self._loaded = False
+        cluster.handle("codes.checked", self._on_checked)
+
+    def subscribe(self, name: str) -> asyncio.Queue:
+        """Queue that receives a CodeDiff whenever codes are added or removed."""
+        queue = self._subscribers.get(name)
+        if queue is None:
+            queue = self._subscribers[name] = asyncio.Queue()
+            logger.info(f"Code feed subscriber added: {name}")
+        return queue
+
+    def unsubscribe(self, name: str):
+        self._subscribers.pop(name, None)
+
+    def _load(self):
+        if not self._loaded:
+            self.active = list(get_store().load_active_codes())
+            self._loaded = True
+
+    def _mirror(self):
+        """Follower in a cluster: take the leader's active set from the shared store."""
+        self.active = list(get_store().load_active_codes())
+        self._loaded = True
+
+    def _on_checked(self, checked: dict):
+        """Follower: the leader polled successfully; its time is when the codes were last checked."""
+        if cluster.is_leader:
+            return
+        self.active = list(checked["active"])
+        self._loaded = True
+        self.last_checked = checked["checked_at"]
+
+    async def start(self):
+        if self._task and not self._task.done():
+            return
+        self._load()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Code feed started (every {self.poll_seconds}s, {len(self.active)} known codes)")
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                pass  # already logged by _log_refresh_error
+            await asyncio.sleep(self.poll_seconds)
+
+    def age(self):
+        """Seconds since the last successful poll, or None if there hasn't been one."""
+        if self.last_checked is None:
+            return None
+        return time.time() - self.last_checked
+
+    def refresh(self) -> asyncio.Future:
+        """
+        Start a poll unless one is already running; every caller gets the same
+        in-flight task. Await it for the result or ignore it to revalidate in the background.
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self.poll())
+            self._refresh_task.add_done_callback(self._log_refresh_error)
+        return self._refresh_task
+
+    @staticmethod
+    def _log_refresh_error(task):
+        if not task.cancelled() and task.exception():
+            logger.error(f"Code feed refresh failed: {task.exception()}")
+
+    async def poll(self):
+        """Scrape once, update the active set and publish the diff (if any)."""
+        if not cluster.is_leader:
+            self._mirror()
+            return None
+        self._load()
+        codes = await scraper.scrape_active_codes()
+        if not scraper.last_poll_ok():
+            # keep the old set; a failed fetch must not look like "all codes removed"
+            return None
+        self.last_checked = time.time()
+        try:
+            await cluster.post("codes.checked", {"checked_at": self.last_checked, "active": list(codes)})
+        except Exception as e:
+            # followers just show an older check time; announcing new codes matters more
+            logger.warning(f"Couldn't broadcast the code check: {e}")
+
+        previous = set(self.active)
+        current = set(codes)
+        added = [c for c in codes if c not in previous]
+        removed = [c for c in self.active if c not in current]
+        if not added and not removed:
+            return None
+
+        self.active = list(codes)
+        get_store().record_codes(self.active)
+        diff = CodeDiff(added, removed, list(codes), self.last_checked)
+        logger.info(f"Codes changed: +{added} -{removed}")
+        for queue in self._subscribers.values():
+            queue.put_nowait(diff)
+        return diff
+
+
+feed = CodeFeed()
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import logging
+import time
+from utils.storage import load_json, save_json
+
+logger = logging.getLogger("discord-bot.command_sync")
+
+SYNC_FILE = "data/command_sync.json"
+
+
+def tree_payload(tree, guild=None) -> list:
+    """What tree.sync(guild=guild) would upload, in a stable order."""
+    commands = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    return sorted(commands, key=lambda c: (c.get("type", 1), c["name"]))
+
+
+def tree_fingerprint(tree, guild=None) -> str:
+    payload = json.dumps(tree_payload(tree, guild), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CommandSync:
+    """
+    Syncs the slash-command tree only when it changed. The fingerprint of
+    the last successful sync per scope (global or one guild, per application)
+    is kept in SYNC_FILE, so on_ready after a reconnect or a restart with the
+    same commands costs a hash instead of a rate-limited bulk overwrite.
+    """
+
+    def __init__(self, path: str = SYNC_FILE):
+        self.path = path
+        self._synced = None         # scope -> {"fingerprint", "commands", "synced_at"}
+        self.syncs = 0
+        self.skipped = 0
+
+    def _load(self):
+        if self._synced is None:
+            synced = load_json(self.path, {})
+            self._synced = synced if isinstance(synced, dict) else {}
+
+    @staticmethod
+    def scope(application_id, guild=None) -> str:
+        return f"{application_id}:{guild.id if guild else 'global'}"
+
+    def is_current(self, bot, guild=None) -> bool:
+        self._load()
+        stored = self._synced.get(self.scope(bot.application_id, guild), {})
+        return stored.get("fingerprint") == tree_fingerprint(bot.tree, guild)
+
+    async def sync(self, bot, guild=None, force: bool = False):
+        """Sync one scope if its commands changed (or force). Synced commands, or None if skipped."""
+        self._load()
+        key = self.scope(bot.application_id, guild)
+        fingerprint = tree_fingerprint(bot.tree, guild)
+        if not force and self._synced.get(key, {}).get("fingerprint") == fingerprint:
+            self.skipped += 1
+            logger.info(f"Slash commands unchanged for {key}; sync skipped")
+            return None
+        synced = await bot.tree.sync(guild=guild)
+        self._synced[key] = {"fingerprint": fingerprint, "commands": len(synced), "synced_at": time.time()}
+        save_json(self.path, self._synced)
+        self.syncs += 1
+        return synced
+
+
+command_sync = CommandSync()
@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from utils.storage import STORAGE_WRITE_SECONDS
+
+logger = logging.getLogger("discord-bot.db")
+
+DB_FILE = "data/bot.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    discord_id TEXT PRIMARY KEY,
+    game_id    TEXT,
+    state_id   INTEGER,
+    data       TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_game_id ON users(game_id);
+CREATE INDEX IF NOT EXISTS idx_users_state_id ON users(state_id);
+
+CREATE TABLE IF NOT EXISTS settings (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reminders (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel_id INTEGER,
+    fire_at    REAL NOT NULL,
+    data       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_fire_at ON reminders(fire_at);
+
+CREATE TABLE IF NOT EXISTS code_history (
+    code       TEXT PRIMARY KEY,
+    first_seen REAL NOT NULL,
+    last_seen  REAL NOT NULL,
+    active     INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_code_history_active ON code_history(active);
+"""
+
+
+def _state_id(record: dict):
+    # older records carry the raw API key
+    value = record.get("state_id", record.get("kid"))
+    return int(value) if isinstance(value, (int, str)) and str(value).isdigit() else None
+
+
+class SqliteStore:
+    """
+    Storage backend on SQLite in WAL mode: each mutation is one small
+    transaction instead of a whole-file rewrite, and a crash can't
+    truncate the roster.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        dirpath = os.path.dirname(path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        # one connection shared with worker threads; the lock serializes access
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._write_seconds = STORAGE_WRITE_SECONDS.labels(self.name)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Exclusive access to the connection inside one BEGIN/COMMIT."""
+        with self._lock:
+            started = time.perf_counter()
+            self.conn.execute("BEGIN")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            # observed under the lock: writes come from worker threads
+            self._write_seconds.observe(time.perf_counter() - started)
+
+    def _write(self, sql, params=()):
+        with self.transaction() as conn:
+            conn.execute(sql, params)
+
+    def _read(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    # --- Users ---
+    def load_users(self) -> dict:
+        return {discord_id: json.loads(data) for discord_id, data in self._read("SELECT discord_id, data FROM users")}
+
+    def save_user(self, discord_id, record: dict):
+        self._write(
+            "INSERT INTO users (discord_id, game_id, state_id, data, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(discord_id) DO UPDATE SET game_id=excluded.game_id, state_id=excluded.state_id, "
+            "data=excluded.data, updated_at=excluded.updated_at",
+            (str(discord_id), record.get("game_id"), _state_id(record), json.dumps(record), time.time()),
+        )
+
+    def save_users(self, users: dict):
+        """Bulk upsert in a single transaction (migration, batch refresh)."""
+        now = time.time()
+        rows = [
+            (str(discord_id), rec.get("game_id"), _state_id(rec), json.dumps(rec), now)
+            for discord_id, rec in users.items()
+        ]
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO users (discord_id, game_id, state_id, data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+
+    def delete_user(self, discord_id):
+        self._write("DELETE FROM users WHERE discord_id = ?", (str(discord_id),))
+
+    def get_user(self, discord_id):
+        rows = self._read("SELECT data FROM users WHERE discord_id = ?", (str(discord_id),))
+        return json.loads(rows[0][0]) if rows else None
+
+    def find_by_game_id(self, game_id):
+        rows = self._read("SELECT discord_id, data FROM users WHERE game_id = ?", (str(game_id),))
+        return (rows[0][0], json.loads(rows[0][1])) if rows else None
+
+    def users_in_state(self, state_id) -> dict:
+        rows = self._read("SELECT discord_id, data FROM users WHERE state_id = ?", (int(state_id),))
+        return {discord_id: json.loads(data) for discord_id, data in rows}
+
+    # --- Settings ---
+    def load_settings(self) -> dict:
+        return {key: json.loads(value) for key, value in self._read("SELECT key, value FROM settings")}
+
+    def save_settings(self, settings: dict):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM settings")
+            conn.executemany(
+                "INSERT INTO settings (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in settings.items()])
+
+    # --- Reminders ---
+    def load_reminders(self) -> list:
+        # the row id is the reminder id, so update_reminders() can address rows
+        rows = self._read("SELECT id, data FROM reminders ORDER BY fire_at")
+        return [{**json.loads(data), "id": reminder_id} for reminder_id, data in rows]
+
+    @staticmethod
+    def _reminder_rows(reminders: list) -> list:
+        return [(r.get("id"), r.get("channel_id"), float(r.get("fire_at", 0)), json.dumps(r, default=str))
+                for r in reminders]
+
+    def save_reminders(self, reminders: list):
+        """Replace every reminder (migration)."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM reminders")
+            conn.executemany("INSERT INTO reminders (id, channel_id, fire_at, data) VALUES (?, ?, ?, ?)",
+                             self._reminder_rows(reminders))
+
+    def update_reminders(self, changed: list, removed: list):
+        """Upsert changed reminders and delete removed ids; untouched rows are left alone."""
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO reminders (id, channel_id, fire_at, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET channel_id=excluded.channel_id, fire_at=excluded.fire_at, "
+                "data=excluded.data", self._reminder_rows(changed))
+            conn.executemany("DELETE FROM reminders WHERE id = ?", [(reminder_id,) for reminder_id in removed])
+
+    # --- Code history ---
+    def record_codes(self, active: list):
+        """Upsert the currently active codes and mark every other code inactive."""
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute("UPDATE code_history SET active = 0 WHERE active = 1")
+            conn.executemany(
+                "INSERT INTO code_history (code, first_seen, last_seen, active) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(code) DO UPDATE SET last_seen=excluded.last_seen, active=1",
+                [(code, now, now) for code in active])
+
+    def load_active_codes(self) -> list:
+        return [code for (code,) in self._read("SELECT code FROM code_history WHERE active = 1 ORDER BY first_seen")]
+
+    def code_history(self) -> list:
+        rows = self._read("SELECT code, first_seen, last_seen, active FROM code_history ORDER BY first_seen")
+        return [{"code": c, "first_seen": f, "last_seen": l, "active": bool(a)} for c, f, l, a in rows]
+
+
+def migrate_from_json(target: SqliteStore, users_file="data/users.json", settings_file="data/settings.json",
+                      reminders_file="data/reminders.json", codes_file="data/last_codes.json") -> dict:
+    """One-shot copy of the JSON data files into SQLite. Safe to re-run (upserts)."""
+    from utils.storage import load_json
+
+    users = load_json(users_file, {})
+    if isinstance(users, list):  # very old format: list of records with discord_id
+        users = {str(u["discord_id"]): u for u in users if isinstance(u, dict) and u.get("discord_id")}
+    target.save_users(users)
+
+    settings = load_json(settings_file, {})
+    target.save_settings(settings)
+
+    reminders = [r for r in load_json(reminders_file, []) if isinstance(r, dict)]
+    target.save_reminders(reminders)
+
+    codes = load_json(codes_file, [])
+    target.record_codes(codes)
+
+    counts = {"users": len(users), "settings": len(settings), "reminders": len(reminders), "codes": len(codes)}
+    logger.info(f"Migrated JSON data into {target.path}: {counts}")
+    return counts
+
+
+if __name__ == "__main__":
+    # python -m utils.db  → migrate data/*.json into data/bot.db
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    store = SqliteStore()
+    migrate_from_json(store)
+    store.close()
@@ -0,0 +1,159 @@
+import logging
+from utils.storage import get_store
+from utils.cluster import cluster
+
+logger = logging.getLogger("discord-bot.guild_settings")
+
+# top-level keys from before per-guild settings; see migrate_legacy()
+LEGACY_CHANNEL_KEYS = ("alert_channel_id", "channel_id")
+
+# per-guild keys and their defaults
+DEFAULTS = {
+    "alert_channel_id": None,       # gift-code alerts
+    "channel_id": None,             # notifications (/setchannel)
+    "admins": [],
+    "verified_role": "Verified",
+    "unverified_role": "Unverified",
+    "verify_channel_id": None,      # channel with the verification panel (/verifypanel)
+}
+
+
+class GuildSettings:
+    """
+    Per-guild settings, loaded from the store once and kept in memory.
+    Stored as settings["guilds"][guild_id]. The old top-level channel_id /
+    alert_channel_id belong to one guild; they keep receiving broadcasts
+    until migrate_legacy() moves them into that guild's entry on the first
+    READY, and are never used as another guild's value. The top-level
+    admins are bot-wide admins. Reads are dict lookups; update()
+    writes through the store, rebuilds the derived caches and tells other
+    cluster processes to reload.
+    """
+
+    def __init__(self, store=None):
+        self._store = store
+        self._settings = {}
+        self._guilds = {}           # guild_id -> dict
+        self._admins = {}           # guild_id -> frozenset of user ids (incl. bot-wide admins)
+        self._global_admins = frozenset()
+        self._channels = {}         # key -> list of channel ids across guilds
+        self._legacy = {}           # top-level channel keys not migrated yet
+        self.loaded = False
+        cluster.handle("settings.changed", lambda _: self.load())
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = get_store()
+        return self._store
+
+    def load(self):
+        settings = self.store.load_settings()
+        self._settings = settings if isinstance(settings, dict) else {}
+        self._guilds = {int(gid): dict(cfg) for gid, cfg in self._settings.get("guilds", {}).items()}
+        self._rebuild()
+        self.loaded = True
+        logger.info(f"Loaded settings for {len(self._guilds)} guilds")
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def _rebuild(self):
+        self._global_admins = frozenset(int(a) for a in self._settings.get("admins", []))
+        self._admins = {
+            gid: self._global_admins | frozenset(int(a) for a in cfg.get("admins", []))
+            for gid, cfg in self._guilds.items()
+        }
+        self._channels = {}
+        self._legacy = {}
+        for key in LEGACY_CHANNEL_KEYS:
+            channels = [cfg[key] for cfg in self._guilds.values() if cfg.get(key)]
+            legacy = self._settings.get(key)
+            if legacy:
+                self._legacy[key] = legacy
+                if legacy not in channels:
+                    channels.append(legacy)
+            self._channels[key] = channels
+
+    # --- Reads ---
+    def get(self, guild_id, key: str):
+        self._ensure_loaded()
+        value = self._guilds.get(guild_id, {}).get(key) if guild_id else None
+        return value if value is not None else DEFAULTS.get(key)
+
+    def is_admin(self, guild_id, user_id: int) -> bool:
+        self._ensure_loaded()
+        return user_id in self._admins.get(guild_id, self._global_admins)
+
+    def admins(self, guild_id) -> frozenset:
+        self._ensure_loaded()
+        return self._admins.get(guild_id, self._global_admins)
+
+    def alert_channels(self) -> list:
+        """Every guild's gift-code alert channel."""
+        self._ensure_loaded()
+        return self._channels["alert_channel_id"]
+
+    def notification_channels(self) -> list:
+        self._ensure_loaded()
+        return self._channels["channel_id"]
+
+    def global_value(self, key: str, default=None):
+        """Bot-wide option (e.g. refresh_sweep_hours)."""
+        self._ensure_loaded()
+        return self._settings.get(key, default)
+
+    # --- Writes ---
+    async def update(self, guild_id, **changes):
+        """Set per-guild keys; guild_id None changes the bot-wide value instead."""
+        self._ensure_loaded()
+        if guild_id is None:
+            self._settings.update(changes)
+        else:
+            self._guilds[guild_id] = {**self._guilds.get(guild_id, {}), **changes}
+            self._settings["guilds"] = {str(gid): cfg for gid, cfg in self._guilds.items()}
+        self._rebuild()
+        self.store.save_settings(dict(self._settings))
+        await cluster.post("settings.changed", guild_id)
+
+    async def migrate_legacy(self, resolve_channel):
+        """
+        Move the top-level channel keys into the entry of the guild owning the
+        channel (resolve_channel(id) -> channel or None, e.g. bot.get_channel).
+        Keys whose channel isn't visible here (another shard, deleted) stay.
+        """
+        self._ensure_loaded()
+        for key, channel_id in list(self._legacy.items()):
+            channel = resolve_channel(int(channel_id))
+            guild = getattr(channel, "guild", None)
+            if guild is None:
+                continue
+            if not self._guilds.get(guild.id, {}).get(key):
+                self._guilds[guild.id] = {**self._guilds.get(guild.id, {}), key: channel_id}
+                self._settings["guilds"] = {str(gid): cfg for gid, cfg in self._guilds.items()}
+            del self._settings[key]
+            logger.info(f"Moved top-level {key} {channel_id} into the settings of guild {guild.id}")
+            await self.update(guild.id)
+
+    async def add_admin(self, guild_id, user_id: int):
+        self._ensure_loaded()
+        admins = set(self._guilds.get(guild_id, {}).get("admins", [])) if guild_id else set(self._settings.get("admins", []))
+        admins.add(user_id)
+        await self.update(guild_id, admins=sorted(admins))
+
+    async def remove_admin(self, guild_id, user_id: int) -> bool:
+        """Remove from this guild and from the bot-wide admins; False if neither had them."""
+        self._ensure_loaded()
+        removed = False
+        if guild_id and user_id in self._guilds.get(guild_id, {}).get("admins", []):
+            admins = [a for a in self._guilds[guild_id]["admins"] if a != user_id]
+            await self.update(guild_id, admins=admins)
+            removed = True
+        if user_id in self._global_admins:
+            await self.update(None, admins=[a for a in self._settings.get("admins", []) if int(a) != user_id])
+            removed = True
+        return removed
+
+
+guild_settings = GuildSettings()
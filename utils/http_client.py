@@ -0,0 +1,117 @@
+import aiohttp
+import logging
+
+logger = logging.getLogger("discord-bot.http")
+
+# Defaults for the shared client; override via HttpClient(...) or configure()
+POOL_LIMIT = 100            # total open connections
+POOL_LIMIT_PER_HOST = 20    # per remote host (CenturyGame, wosgiftcodes, ...)
+DNS_CACHE_TTL = 300         # seconds
+KEEPALIVE_TIMEOUT = 30      # seconds an idle connection stays in the pool
+TOTAL_TIMEOUT = 15          # seconds for a whole request
+CONNECT_TIMEOUT = 5         # seconds to establish a connection
+
+
+class HttpClient:
+    """
+    Long-lived aiohttp session shared by utils.api and utils.scraper.
+    Opened by the bot at startup and closed on bot.close().
+    """
+
+    def __init__(self, limit=POOL_LIMIT, limit_per_host=POOL_LIMIT_PER_HOST,
+                 dns_cache_ttl=DNS_CACHE_TTL, keepalive_timeout=KEEPALIVE_TIMEOUT,
+                 total_timeout=TOTAL_TIMEOUT, connect_timeout=CONNECT_TIMEOUT):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.total_timeout = total_timeout
+        self.connect_timeout = connect_timeout
+        self._session = None
+        self._connector = None
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    def configure(self, **options):
+        """Change pool/timeouts settings. Takes effect on the next start()."""
+        for key, value in options.items():
+            if not hasattr(self, key) or key.startswith("_"):
+                raise ValueError(f"Unknown HTTP client option: {key}")
+            setattr(self, key, value)
+
+    @property
+    def closed(self):
+        return self._session is None or self._session.closed
+
+    async def start(self):
+        if not self.closed:
+            return
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_connection_create_end.append(self._on_connection_create)
+        trace.on_connection_reuseconn.append(self._on_connection_reuse)
+
+        self._connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=self._connector,
+            timeout=aiohttp.ClientTimeout(total=self.total_timeout, connect=self.connect_timeout),
+            trace_configs=[trace],
+        )
+        logger.info(
+            f"HTTP client started (limit={self.limit}, per_host={self.limit_per_host}, "
+            f"dns_ttl={self.dns_cache_ttl}s, timeout={self.total_timeout}s)"
+        )
+
+    async def close(self):
+        if self.closed:
+            return
+        logger.info(f"HTTP client closing: {self.stats()}")
+        await self._session.close()
+        self._session = None
+        self._connector = None
+
+    async def session(self) -> aiohttp.ClientSession:
+        """Return the shared session, opening it lazily if the bot hasn't yet."""
+        if self.closed:
+            await self.start()
+        return self._session
+
+    # --- Trace hooks ---
+    async def _on_request_start(self, session, ctx, params):
+        self.requests += 1
+
+    async def _on_connection_create(self, session, ctx, params):
+        self.connections_created += 1
+
+    async def _on_connection_reuse(self, session, ctx, params):
+        self.connections_reused += 1
+
+    # --- Stats ---
+    def open_connections(self) -> int:
+        """Connections currently held by the pool (in use + idle keep-alive)."""
+        if self.closed or self._connector is None:
+            return 0
+        in_use = len(getattr(self._connector, "_acquired", ()))
+        idle = sum(len(conns) for conns in getattr(self._connector, "_conns", {}).values())
+        return in_use + idle
+
+    def stats(self) -> dict:
+        acquired = self.connections_created + self.connections_reused
+        reuse_ratio = self.connections_reused / acquired if acquired else 0.0
+        return {
+            "open_connections": self.open_connections(),
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_ratio": round(reuse_ratio, 3),
+        }
+
+
+client = HttpClient()
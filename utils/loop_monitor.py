@@ -0,0 +1,170 @@
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from utils.metrics import metrics
+
+logger = logging.getLogger("discord-bot.loop_monitor")
+
+TICK_SECONDS = 0.1          # how often the probe coroutine wakes
+STALL_THRESHOLD = 0.25      # a step blocking the loop this long is logged with its stack
+STACK_LIMIT = 25            # frames kept per captured stack
+RECENT_STALLS = 20
+
+LOOP_LAG_SECONDS = metrics.histogram(
+    "wos_event_loop_lag_seconds", "Scheduling delay of the event loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+LOOP_STALLS = metrics.counter("wos_event_loop_stalls_total", "Event loop steps that blocked longer than the threshold")
+
+
+def loop_task_name(loop) -> str:
+    """
+    Name of the task the loop is running right now (read from another thread).
+    asyncio.current_task() only works on the loop's own thread, so this peeks
+    at CPython's private task table; where that is missing (newer versions
+    keep it in the thread state) the stall is reported without a task.
+    """
+    current_tasks = getattr(asyncio.tasks, "_current_tasks", None)
+    if not isinstance(current_tasks, dict):
+        return "unknown"
+    try:
+        task = current_tasks.get(loop)
+        if task is None:
+            return "callback"
+        return f"{task.get_name()} ({task.get_coro().__qualname__})"
+    except Exception:
+        return "unknown"
+
+
+class LagMonitor:
+    """
+    Measures event-loop scheduling delay and names whatever blocks it.
+
+    A probe coroutine sleeps TICK_SECONDS at a time; how late it wakes is the
+    loop lag (exported as a histogram). A watchdog thread watches the probe's
+    heartbeat: once the loop has been stuck for `threshold`, it grabs the loop
+    thread's stack — the synchronous code still running — and the current
+    task. The stall is logged with that stack once the loop recovers, so the
+    log says what blocked it and for how long.
+    """
+
+    def __init__(self, threshold: float = STALL_THRESHOLD, tick: float = TICK_SECONDS):
+        self.threshold = threshold
+        self.tick = tick
+        self.recent = collections.deque(maxlen=RECENT_STALLS)  # (unix time, seconds, task, culprit line)
+        self.max_lag = 0.0
+        self._loop = None
+        self._loop_thread = None
+        self._heartbeat = time.monotonic()
+        self._capture = None    # (heartbeat, task, stack) taken by the watchdog during a stall
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._task:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._probe(), name="loop-lag-probe")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread:
+            await asyncio.to_thread(self._thread.join, 1.0)
+            self._thread = None
+
+    async def _probe(self):
+        while True:
+            beat = self._heartbeat
+            expected = time.monotonic() + self.tick
+            await asyncio.sleep(self.tick)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            LOOP_LAG_SECONDS.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            capture, self._capture = self._capture, None
+            if lag >= self.threshold:
+                # a capture from an earlier stall (written after the last reset) is stale
+                self._report(lag, capture[1:] if capture and capture[0] == beat else None)
+
+    def _watch(self):
+        while not self._stop.wait(self.tick / 2):
+            beat = self._heartbeat
+            if time.monotonic() - beat - self.tick < self.threshold or self._capture is not None:
+                continue
+            try:
+                capture = self._take_capture(beat)
+            except Exception as e:
+                # the watchdog must outlive any interpreter-internals surprise
+                logger.debug(f"Loop stall capture failed: {e}")
+                capture = (beat, "unknown", [])
+            self._capture = capture
+
+    def _take_capture(self, beat: float):
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame, limit=STACK_LIMIT)
+        # drop the runner/asyncio frames above the callback being run
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i].name == "_run" and stack[i].filename.endswith(os.path.join("asyncio", "events.py")):
+                stack = stack[i + 1:] or stack
+                break
+        return (beat, loop_task_name(self._loop), stack)
+
+    def _report(self, lag: float, capture):
+        LOOP_STALLS.inc()
+        if capture is None:
+            # recovered before the watchdog looked; no stack
+            self.recent.append((time.time(), lag, "unknown", "unknown"))
+            logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms")
+            return
+        task, stack = capture
+        culprit = self._culprit(stack) if stack else "unknown"
+        self.recent.append((time.time(), lag, task, culprit))
+        logger.warning(
+            f"Event loop blocked for {lag * 1000:.0f} ms in {task} at {culprit}\n"
+            + "".join(traceback.format_list(stack))
+        )
+
+    @staticmethod
+    def _culprit(stack) -> str:
+        """Innermost frame of our own code, else the innermost frame."""
+        for frame in reversed(stack):
+            if "site-packages" not in frame.filename and "/lib/python" not in frame.filename:
+                return f"{frame.filename}:{frame.lineno} in {frame.name}"
+        frame = stack[-1]
+        return f"{frame.filename}:{frame.lineno} in {frame.name}"
+
+    def stats(self) -> dict:
+        lag = LOOP_LAG_SECONDS.labels()
+        return {
+            "running": self._task is not None,
+            # bucket estimates can overshoot the largest value seen
+            "p50": lag.quantile(0.5) and min(lag.quantile(0.5), self.max_lag),
+            "p99": lag.quantile(0.99) and min(lag.quantile(0.99), self.max_lag),
+            "max": self.max_lag,
+            "stalls": int(LOOP_STALLS.total()),
+            "last_stall": self.recent[-1] if self.recent else None,
+        }
+
+
+lag_monitor = LagMonitor()
@@ -0,0 +1,315 @@
+import bisect
+import functools
+import logging
+import math
+import time
+from collections import deque
+
+logger = logging.getLogger("discord-bot.metrics")
+
+
+class LatencyWindow:
+    """Latencies of the last `size` calls, for p50/p95 reporting."""
+
+    def __init__(self, size: int = 500):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, pct: float):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+        return ordered[index]
+
+    def summary(self) -> str:
+        if not self.samples:
+            return "no samples"
+        return (
+            f"p50 {self.percentile(50) * 1000:.0f} ms, p95 {self.percentile(95) * 1000:.0f} ms "
+            f"({self.count} calls)"
+        )
+
+
+# --- Counters and histograms, exported in Prometheus text format ---
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def quantile(self, q: float):
+        """Estimate from the buckets (linear within a bucket), like Prometheus' histogram_quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._default = None if self.labelnames else self.labels()
+
+    def labels(self, *values):
+        """Child for one combination of label values; cache it for hot paths."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def children(self):
+        return list(self._children.items())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def total(self) -> float:
+        return sum(child.value for child in self._children.values())
+
+    def render(self):
+        for values, child in self.children():
+            yield f"{self.name}{_label_text(self.labelnames, values)} {child.value:g}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def render(self):
+        for values, child in self.children():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == math.inf else f'le="{bound:g}"'
+                yield f"{self.name}_bucket{_label_text(self.labelnames, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labelnames, values)} {child.sum:g}"
+            yield f"{self.name}_count{_label_text(self.labelnames, values)} {child.count}"
+
+
+class Gauge:
+    """Value read from a callback at scrape time (queue depths, cache sizes)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self):
+        try:
+            value = self.read()
+        except Exception:
+            return
+        if value is not None:
+            yield f"{self.name} {float(value):g}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing  # module reloads (cog reload) reuse the series
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, read) -> Gauge:
+        metric = Gauge(name, documentation, read)
+        self._metrics[name] = metric  # re-bind: the callback may belong to a reloaded cog
+        return metric
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def timed(histogram: Histogram, *label_values):
+    """Decorator: observe the duration of every call of an async function."""
+    child = histogram.labels(*label_values)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+LOOP_SECONDS = metrics.histogram("wos_loop_iteration_seconds", "Duration of background loop iterations", ["loop"])
+LOOP_LAG = metrics.histogram("wos_loop_lag_seconds", "How late a background loop iteration started", ["loop"])
+LOOP_ERRORS = metrics.counter("wos_loop_errors_total", "Background loop iterations that raised", ["loop"])
+
+
+def instrumented_loop(name: str, interval: float = None):
+    """
+    Decorator for a tasks.loop body (put it under @tasks.loop): records
+    iteration time, errors and, given the loop interval, the start lag.
+    """
+    duration, lag, errors = LOOP_SECONDS.labels(name), LOOP_LAG.labels(name), LOOP_ERRORS.labels(name)
+
+    def decorator(func):
+        last_start = None
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            nonlocal last_start
+            start = time.perf_counter()
+            if interval and last_start is not None:
+                lag.observe(max(0.0, start - last_start - interval))
+            last_start = start
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                duration.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class MetricsServer:
+    """GET /metrics on 127.0.0.1:port, for a local Prometheus scraper."""
+
+    def __init__(self, registry: MetricsRegistry = metrics, host: str = "127.0.0.1"):
+        self.registry = registry
+        self.host = host
+        self.port = None
+        self._runner = None
+
+    async def start(self, port: int):
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8",
+                                headers={"X-Content-Type-Options": "nosniff"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"Metrics endpoint on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+server = MetricsServer()
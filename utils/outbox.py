@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import time
+import discord
+from utils.metrics import LatencyWindow, metrics
+from utils.ratelimit import TokenBucket
+
+logger = logging.getLogger("discord-bot.outbox")
+
+MAX_CONTENT = 2000
+MAX_EMBED_DESCRIPTION = 4096
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_TOTAL = 6000
+COALESCE_WINDOW = 1.0            # seconds messages for one channel are gathered
+# (rate, per seconds, burst). A bucket allows at most burst + rate * window
+# messages in any window, so these stay under Discord's 5 per 5 s per channel
+# and 50 per second globally.
+CHANNEL_RATE = (4, 5.0, 1)
+GLOBAL_RATE = (40, 1.0, 10)
+IDLE_WORKER_TIMEOUT = 30.0       # idle channel workers exit after this
+
+SEND_SECONDS = metrics.histogram("wos_outbox_send_seconds", "channel.send calls made by the outbox", ["outcome"])
+DELIVERY_SECONDS = metrics.histogram("wos_outbox_delivery_seconds", "Time from Outbox.send() to delivery")
+DROPPED = metrics.counter("wos_outbox_dropped_total", "Outbox messages Discord rejected; they are not retried")
+
+
+def chunk_content(text: str, limit: int = MAX_CONTENT) -> list:
+    """Split on line boundaries into pieces of at most `limit` characters."""
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_embed(embed: discord.Embed) -> list:
+    """Break an embed whose description is too long into several embeds."""
+    description = embed.description or ""
+    if len(description) <= MAX_EMBED_DESCRIPTION and len(embed) <= MAX_EMBED_TOTAL:
+        return [embed]
+    parts = chunk_content(description, MAX_EMBED_DESCRIPTION) or [""]
+    embeds = []
+    for i, part in enumerate(parts):
+        piece = embed.copy() if i == 0 else discord.Embed(color=embed.color)
+        piece.description = part
+        embeds.append(piece)
+    return embeds
+
+
+def group_embeds(embeds: list) -> list:
+    """Pack embeds into messages of at most 10 embeds / 6000 characters."""
+    groups, current, size = [], [], 0
+    for embed in embeds:
+        length = len(embed)
+        if current and (len(current) >= MAX_EMBEDS_PER_MESSAGE or size + length > MAX_EMBED_TOTAL):
+            groups.append(current)
+            current, size = [], 0
+        current.append(embed)
+        size += length
+    if current:
+        groups.append(current)
+    return groups
+
+
+class _Item:
+    __slots__ = ("content", "embed", "queued_at", "future")
+
+    def __init__(self, content, embed):
+        self.content = content
+        self.embed = embed
+        self.queued_at = time.perf_counter()
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class Outbox:
+    """
+    Central queue for outbound channel messages. Messages for the same
+    channel within COALESCE_WINDOW are merged (contents joined, embeds packed),
+    re-split to Discord's limits and sent under a per-channel and a global
+    token bucket. Every channel has its own worker, so fanout to many guilds
+    runs concurrently.
+    """
+
+    def __init__(self, coalesce_window: float = COALESCE_WINDOW,
+                 channel_rate=CHANNEL_RATE, global_rate=GLOBAL_RATE):
+        self.coalesce_window = coalesce_window
+        self.channel_rate = channel_rate
+        self.global_bucket = TokenBucket(*global_rate)
+        self._pending = {}      # channel_id -> list of _Item
+        self._channels = {}     # channel_id -> channel
+        self._buckets = {}      # channel_id -> TokenBucket
+        self._workers = {}      # channel_id -> Task
+        self._wakeups = {}      # channel_id -> Event
+        self._delivering = 0    # batches popped from _pending but not sent yet
+        self.queued = 0
+        self.sent_messages = 0
+        self.merged = 0
+        self.failed = 0
+        self.latency = LatencyWindow()
+
+    def send(self, channel, content: str = None, embed: discord.Embed = None) -> asyncio.Future:
+        """Queue a message; the returned future resolves once it was delivered."""
+        item = _Item(content, embed)
+        channel_id = channel.id
+        self._channels[channel_id] = channel
+        self._pending.setdefault(channel_id, []).append(item)
+        self.queued += 1
+        wakeup = self._wakeups.get(channel_id)
+        if wakeup:
+            wakeup.set()
+        worker = self._workers.get(channel_id)
+        if worker is None or worker.done():
+            self._wakeups[channel_id] = asyncio.Event()
+            self._workers[channel_id] = asyncio.create_task(self._channel_worker(channel_id))
+        return item.future
+
+    def queue_depth(self) -> int:
+        return sum(len(items) for items in self._pending.values())
+
+    async def _channel_worker(self, channel_id):
+        bucket = self._buckets.setdefault(channel_id, TokenBucket(*self.channel_rate))
+        wakeup = self._wakeups[channel_id]
+        try:
+            while True:
+                if not self._pending.get(channel_id):
+                    wakeup.clear()
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), IDLE_WORKER_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        # a send() may have queued while the timeout was unwinding;
+                        # nothing awaits between this check and deregistering below
+                        if not self._pending.get(channel_id):
+                            return
+                    continue
+                await asyncio.sleep(self.coalesce_window)
+                items = self._pending.pop(channel_id, [])
+                await self._deliver(self._channels[channel_id], items, bucket)
+        finally:
+            self._workers.pop(channel_id, None)
+            self._wakeups.pop(channel_id, None)
+            if not self._pending.get(channel_id):
+                self._channels.pop(channel_id, None)
+
+    @staticmethod
+    def build_messages(items) -> list:
+        """(content, embeds) payloads for a batch of queued items."""
+        content = "\n".join(item.content for item in items if item.content)
+        embeds = []
+        for item in items:
+            if item.embed is not None:
+                embeds.extend(split_embed(item.embed))
+        messages = [(chunk, []) for chunk in chunk_content(content)] if content else []
+        groups = group_embeds(embeds)
+        if messages and groups:
+            messages[-1] = (messages[-1][0], groups.pop(0))
+        messages.extend((None, group) for group in groups)
+        return messages
+
+    async def _deliver(self, channel, items, bucket):
+        error = None
+        messages = self.build_messages(items)
+        self.merged += max(0, len(items) - len(messages))
+        self._delivering += 1
+        try:
+            for content, embeds in messages:
+                await bucket.acquire()
+                await self.global_bucket.acquire()
+                started = time.perf_counter()
+                try:
+                    await channel.send(content=content, embeds=embeds)
+                    self.sent_messages += 1
+                    SEND_SECONDS.labels("ok").observe(time.perf_counter() - started)
+                except discord.HTTPException as e:
+                    self.failed += 1
+                    error = e
+                    SEND_SECONDS.labels("error").observe(time.perf_counter() - started)
+                    DROPPED.inc()
+                    logger.warning(f"Outbox dropped a message to {channel.id} ({len(items)} queued sends merged): {e}")
+        finally:
+            self._delivering -= 1
+        now = time.perf_counter()
+        for item in items:
+            self.latency.observe(now - item.queued_at)
+            DELIVERY_SECONDS.observe(now - item.queued_at)
+            if item.future.done():
+                continue
+            if error:
+                item.future.set_exception(error)
+                item.future.exception()  # mark retrieved; callers rarely await
+            else:
+                item.future.set_result(None)
+
+    async def flush(self, timeout: float = 10.0):
+        """Wait (bounded) for queued messages to go out; used on shutdown."""
+        deadline = time.monotonic() + timeout
+        while (self.queue_depth() or self._delivering) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth(),
+            "queued": self.queued,
+            "sent_messages": self.sent_messages,
+            "merged": self.merged,
+            "failed": self.failed,
+            "channels_active": len(self._workers),
+            "global_waits": self.global_bucket.waits,
+            "latency": self.latency.summary(),
+        }
+
+
+outbox = Outbox()
+metrics.gauge("wos_outbox_queue_depth", "Messages waiting in the outbox", outbox.queue_depth)
@@ -0,0 +1,88 @@
+import collections
+import os
+import sys
+import time
+
+SAMPLE_INTERVAL = 0.005     # seconds between stack samples
+MAX_SECONDS = 120
+TOP_N = 40
+
+# leaf frames that mean the loop was waiting for I/O, not working
+IDLE_FRAMES = {("selectors.py", "select"), ("selectors.py", "poll"), ("threading.py", "wait")}
+
+
+def _is_handle_run(code) -> bool:
+    """asyncio's Handle._run: everything above it is loop plumbing, the same in every sample."""
+    return code.co_name == "_run" and code.co_filename.endswith(os.path.join("asyncio", "events.py"))
+
+
+def _frame_key(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread (the event loop's) from a background
+    thread every SAMPLE_INTERVAL. Cheap enough to run against the live bot:
+    nothing is hooked into the profiled code, so the only cost is the
+    sampler's share of the GIL.
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.idle = 0
+        self.self_counts = collections.Counter()
+        self.total_counts = collections.Counter()
+        self.stacks = collections.Counter()
+        self.duration = 0.0
+
+    def run(self, seconds: float):
+        """Sample for `seconds`; blocks the calling thread (use asyncio.to_thread)."""
+        started = time.perf_counter()
+        deadline = started + min(seconds, MAX_SECONDS)
+        while time.perf_counter() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._sample(frame)
+            time.sleep(self.interval)
+        self.duration = time.perf_counter() - started
+        return self
+
+    def _sample(self, frame):
+        self.samples += 1
+        leaf = frame.f_code
+        if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+            self.idle += 1
+            return
+        keys = []
+        while frame is not None and not _is_handle_run(frame.f_code):
+            keys.append(_frame_key(frame.f_code))
+            frame = frame.f_back
+        keys.reverse()
+        if frame is None or not keys:
+            keys = ["(event loop)"] + keys
+        self.self_counts[keys[-1]] += 1
+        for key in set(keys):
+            self.total_counts[key] += 1
+        self.stacks[";".join(keys)] += 1
+
+    def report(self, top: int = TOP_N) -> str:
+        """Plain-text hot spots plus folded stacks (flamegraph.pl / speedscope input)."""
+        busy = self.samples - self.idle
+        lines = [
+            f"Sampled {self.samples} stacks over {self.duration:.1f} s "
+            f"(every {self.interval * 1000:.0f} ms); loop busy in {busy} ({busy / max(1, self.samples):.0%})",
+            "",
+            f"Top {top} by own time (% of busy samples):",
+        ]
+        for key, count in self.self_counts.most_common(top):
+            lines.append(f"  {count / max(1, busy):6.1%}  {count:6d}  {key}")
+        lines += ["", f"Top {top} by total time, callees included:"]
+        for key, count in self.total_counts.most_common(top):
+            lines.append(f"  {count / max(1, busy):6.1%}  {count:6d}  {key}")
+        lines += ["", "Folded stacks:"]
+        lines += [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
@@ -0,0 +1,249 @@
+import asyncio
+import collections
+import time
+
+
+class TokenBucket:
+    """`rate` tokens per `per` seconds, bursting up to `capacity` (default: rate)."""
+
+    def __init__(self, rate: float, per: float = 1.0, capacity: float = None):
+        self.rate = rate
+        self.per = per
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self.waits = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate / self.per)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def reserve(self, tokens: float = 1, max_wait: float = None):
+        """Take tokens, going into debt if needed. Seconds until they're paid off,
+        or None (nothing taken) if that would be longer than `max_wait`."""
+        self._refill()
+        wait = max(0.0, (tokens - self.tokens) * self.per / self.rate)
+        if max_wait is not None and wait > max_wait:
+            return None
+        self.tokens -= tokens
+        return wait
+
+    async def acquire(self, tokens: float = 1):
+        """Reserve tokens, going into debt if needed, and sleep until they're paid off.
+
+        Reserving up front keeps waiters in arrival order and avoids waking
+        every waiter to re-check the bucket.
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            self.waits += 1
+            await asyncio.sleep(wait)
+
+
+class AdaptiveLimiter:
+    """
+    Token bucket for the request rate plus an AIMD concurrency window.
+
+    The window grows by one slot per window's worth of healthy responses and
+    is cut by `backoff` when the upstream signals overload (429, 5xx,
+    timeouts) or answers slower than `latency_target`; at most one cut per
+    `latency_target`, so one burst of failures counts once. Callers that
+    would wait longer than `max_wait` are turned away instead of queueing
+    behind a struggling API.
+    """
+
+    def __init__(self, rate: float, per: float = 1.0, burst: float = None, min_concurrency: int = 1,
+                 max_concurrency: int = 16, latency_target: float = 2.0, backoff: float = 0.5,
+                 max_wait: float = None):
+        self.bucket = TokenBucket(rate, per, burst)
+        self.max_wait = max_wait
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self._waiters = collections.deque()
+        self._last_decrease = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        self.decreases = 0
+
+    def configure(self, rate: float = None, per: float = None, burst: float = None, **options):
+        """Change limits on the fly (settings.json "player_api")."""
+        if rate is not None or per is not None or burst is not None:
+            self.bucket = TokenBucket(
+                rate if rate is not None else self.bucket.rate,
+                per if per is not None else self.bucket.per,
+                burst if burst is not None else self.bucket.capacity,   # a rate override keeps the burst
+            )
+        for key, value in options.items():
+            if key not in ("min_concurrency", "max_concurrency", "latency_target", "backoff", "max_wait"):
+                raise ValueError(f"Unknown limiter option: {key}")
+            setattr(self, key, value)
+        self.limit = min(max(self.limit, self.min_concurrency), self.max_concurrency)
+        self._wake()
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < max(self.min_concurrency, int(self.limit))
+
+    def _wake(self):
+        while self._waiters and self._has_slot():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1     # handed over; the waiter owns the slot
+                waiter.set_result(None)
+
+    async def acquire(self, max_wait: float = None) -> bool:
+        """Wait for a concurrency slot and a rate token. False if not granted within max_wait."""
+        if max_wait is None:
+            max_wait = self.max_wait
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        if self._has_slot() and not self._waiters:
+            self.in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), max_wait)
+            except asyncio.TimeoutError:
+                self._abandon(waiter)
+                self.rejected += 1
+                return False
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        wait = self.bucket.reserve(max_wait=remaining)
+        if wait is None:
+            self._release_slot()
+            self.rejected += 1
+            return False
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._release_slot()
+                raise
+        self.admitted += 1
+        return True
+
+    def _abandon(self, waiter):
+        if waiter.done():       # handed a slot just as we gave up
+            self._release_slot()
+        else:
+            self._waiters.remove(waiter)
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def release(self, latency: float, overloaded: bool = False):
+        """Return the slot and feed the outcome of the request into the window."""
+        if overloaded or latency > self.latency_target:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.latency_target:
+                self._last_decrease = now
+                self.limit = max(self.min_concurrency, self.limit * self.backoff)
+                self.decreases += 1
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        self._release_slot()
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "rate": self.bucket.rate / self.bucket.per,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "decreases": self.decreases,
+        }
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through; `failure_threshold` consecutive failures open it.
+    Open: calls fail fast until `reset_timeout` has passed, then half-open.
+    Half-open: one probe call at a time; a success closes the breaker, a
+    failure opens it again for another `reset_timeout`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.trips = 0
+
+    def configure(self, **options):
+        for key, value in options.items():
+            if key not in ("failure_threshold", "reset_timeout"):
+                raise ValueError(f"Unknown circuit breaker option: {key}")
+            setattr(self, key, value)
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe is allowed (0 unless open)."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """May a call go through now? In half-open state only the single probe may."""
+        if self.state == self.OPEN:
+            if self.retry_after() > 0:
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def release_probe(self):
+        """An allowed call ended without an answer either way (e.g. never sent)."""
+        self._probing = False
+
+    def record_success(self) -> bool:
+        """True if this closed the breaker (the half-open probe succeeded)."""
+        self.failures = 0
+        if self.state == self.HALF_OPEN:
+            self.state = self.CLOSED
+            self._probing = False
+            return True
+        return False
+
+    def record_failure(self) -> bool:
+        """True if this opened the breaker."""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+            self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probing = False
+            return True
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "retry_after": self.retry_after(),
+        }
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import random
+import time
+from utils.storage import load_json, load_json_async, save_json
+
+logger = logging.getLogger("discord-bot.redeem_pipeline")
+
+JOBS_FILE = "data/redeem_jobs.json"
+WORKERS = 8
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 2.0          # seconds; doubles per attempt, with jitter
+BACKOFF_MAX = 300.0
+LEDGER_RETENTION_DAYS = 30  # finished jobs are kept this long so pairs aren't re-run
+
+SUCCEEDED = "succeeded"
+ALREADY_CLAIMED = "already_claimed"
+FAILED = "failed"
+
+_SUCCESS_STATUSES = {"ok", "success"}
+_CLAIMED_STATUSES = {"already_claimed", "received", "claimed"}
+_TRANSIENT_STATUSES = {"error", "timeout", "rate_limited", "unavailable"}
+
+
+def classify(result: dict):
+    """(outcome, retry) for a redeem_code() result dict."""
+    status = str(result.get("status", "")).lower()
+    if status in _SUCCESS_STATUSES:
+        return SUCCEEDED, False
+    if status in _CLAIMED_STATUSES:
+        return ALREADY_CLAIMED, False
+    if status in _TRANSIENT_STATUSES or result.get("http_status", 0) in (429, 500, 502, 503, 504):
+        return FAILED, True
+    return FAILED, False
+
+
+def job_key(fid, code) -> str:
+    return f"{fid}:{code}"
+
+
+class RedeemPipeline:
+    """
+    Persisted (fid, code) redeem jobs executed by a bounded worker pool.
+    Transient failures retry with exponential backoff; the ledger in
+    JOBS_FILE remembers every pair so nothing is attempted again after it
+    finished, including across restarts. Jobs that were in flight when the
+    bot stopped are resumed (redeem is idempotent server-side: "already claimed").
+    When the last job for a code finishes, on_summary(code, counts) is called once.
+    """
+
+    def __init__(self, redeem, on_summary=None, workers: int = WORKERS, jobs_file: str = JOBS_FILE,
+                 max_attempts: int = MAX_ATTEMPTS, backoff_base: float = BACKOFF_BASE):
+        self.redeem = redeem
+        self.on_summary = on_summary
+        self.workers = workers
+        self.jobs_file = jobs_file
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.jobs = {}          # key -> job (replaced on every change, never mutated)
+        self._pending = {}      # code -> jobs not finished yet
+        self._queue = asyncio.Queue()
+        self._tasks = []
+        self._timers = {}       # key -> TimerHandle for backoff retries
+        self.attempts = 0
+        self.retries = 0
+
+    # --- Ledger ---
+    def load(self, jobs: dict = None):
+        cutoff = time.time() - LEDGER_RETENTION_DAYS * 86400
+        if jobs is None:
+            jobs = load_json(self.jobs_file, {})
+        self.jobs = {
+            key: job for key, job in jobs.items()
+            if job.get("state") != "done" or job.get("finished_at", 0) >= cutoff
+        }
+        pending = [job for job in self.jobs.values() if job.get("state") != "done"]
+        for job in pending:
+            job = self.jobs[job["key"]] = {**job, "state": "queued"}
+            self._pending[job["code"]] = self._pending.get(job["code"], 0) + 1
+            self._schedule(job)
+        if pending:
+            self._save()
+        logger.info(f"Redeem ledger loaded: {len(self.jobs)} jobs, {len(pending)} resumed")
+
+    def _save(self):
+        save_json(self.jobs_file, self.jobs)
+
+    # --- Producer ---
+    def enqueue(self, code: str, players) -> int:
+        """players: iterable of (discord_id, fid). Returns the number of new jobs."""
+        now = time.time()
+        added = 0
+        for discord_id, fid in players:
+            if not fid:
+                continue
+            key = job_key(fid, code)
+            if key in self.jobs:
+                continue  # ledger dedup: each pair runs at most once
+            self.jobs[key] = {
+                "key": key, "fid": str(fid), "code": code, "discord_id": str(discord_id),
+                "state": "queued", "attempts": 0, "next_attempt_at": now, "created_at": now,
+            }
+            self._queue.put_nowait(key)
+            added += 1
+        if added:
+            self._pending[code] = self._pending.get(code, 0) + added
+            self._save()
+        logger.info(f"Queued {added} redeem jobs for {code}")
+        return added
+
+    async def load_async(self):
+        """load() with the ledger read in a worker thread."""
+        self.load(await load_json_async(self.jobs_file, {}))
+
+    def _schedule(self, job: dict):
+        delay = job.get("next_attempt_at", 0) - time.time()
+        if delay <= 0:
+            self._queue.put_nowait(job["key"])
+            return
+        self._timers[job["key"]] = asyncio.get_running_loop().call_later(delay, self._requeue, job["key"])
+
+    def _requeue(self, key):
+        self._timers.pop(key, None)
+        self._queue.put_nowait(key)
+
+    # --- Workers ---
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for handle in self._timers.values():
+            handle.cancel()
+        self._timers.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # load() rebuilds both from the ledger; keeping them would queue every open job twice
+        self._pending = {}
+        self._queue = asyncio.Queue()
+        self._save()
+
+    def pending(self) -> int:
+        return sum(self._pending.values())
+
+    async def join(self):
+        """Wait until no job is queued, running or waiting for a retry."""
+        while self._pending:
+            await asyncio.sleep(0.05)
+
+    async def _worker(self, index: int):
+        while True:
+            key = await self._queue.get()
+            job = self.jobs.get(key)
+            if not job or job["state"] != "queued":
+                continue  # finished, or another worker already has it
+            await self._attempt(job)
+
+    def _update(self, job: dict, **changes) -> dict:
+        job = self.jobs[job["key"]] = {**job, **changes}
+        return job
+
+    async def _attempt(self, job: dict):
+        # marked before the first await so a duplicate queue entry is skipped
+        job = self._update(job, state="running", attempts=job["attempts"] + 1)
+        self.attempts += 1
+        try:
+            result = await self.redeem(job["fid"], job["code"])
+        except Exception as e:
+            logger.warning(f"redeem exception for fid={job['fid']} code={job['code']}: {e}")
+            result = {"status": "error", "message": str(e)}
+
+        outcome, retry = classify(result)
+        if retry and job["attempts"] < self.max_attempts:
+            self.retries += 1
+            delay = min(BACKOFF_MAX, self.backoff_base * 2 ** (job["attempts"] - 1))
+            job = self._update(job, state="queued", message=result.get("message"),
+                               next_attempt_at=time.time() + delay * random.uniform(0.5, 1.0))
+            self._schedule(job)
+        else:
+            job = self._update(job, state="done", outcome=outcome, message=result.get("message"),
+                               finished_at=time.time())
+            self._pending[job["code"]] -= 1
+            if self._pending[job["code"]] == 0:
+                del self._pending[job["code"]]
+                self._summarize(job["code"])
+        self._save()
+
+    # --- Summaries ---
+    def counts(self, code: str) -> dict:
+        counts = {SUCCEEDED: 0, ALREADY_CLAIMED: 0, FAILED: 0, "pending": 0}
+        for job in self.jobs.values():
+            if job["code"] != code:
+                continue
+            if job["state"] == "done":
+                counts[job["outcome"]] += 1
+            else:
+                counts["pending"] += 1
+        return counts
+
+    def _summarize(self, code: str):
+        counts = self.counts(code)
+        del counts["pending"]
+        logger.info(f"Redeem jobs for {code} finished: {counts}")
+        if self.on_summary:
+            asyncio.create_task(self.on_summary(code, counts)).add_done_callback(self._log_summary_error)
+
+    @staticmethod
+    def _log_summary_error(task):
+        if not task.cancelled() and task.exception():
+            logger.error(f"Redeem summary callback failed: {task.exception()}")
+
+    def stats(self) -> dict:
+        states = {}
+        for job in self.jobs.values():
+            states[job["state"]] = states.get(job["state"], 0) + 1
+        return {"jobs": len(self.jobs), "queued": self._queue.qsize(), "attempts": self.attempts,
+                "retries": self.retries, **states}
@@ -0,0 +1,223 @@
+import bisect
+import logging
+from utils.storage import get_store
+
+logger = logging.getLogger("discord-bot.registry")
+
+# older users.json records store the raw API keys
+LEGACY_KEYS = {
+    "kid": "state_id",
+    "stove_lv": "furnace_level",
+    "stove_lv_content": "furnace_image",
+    "avatar_image": "avatar",
+}
+
+
+def normalize_record(record: dict) -> dict:
+    """Rename legacy API keys to the names player_record() uses."""
+    if not any(key in record for key in LEGACY_KEYS):
+        return record
+    normalized = {}
+    for key, value in record.items():
+        new_key = LEGACY_KEYS.get(key, key)
+        if new_key not in normalized or key == new_key:
+            normalized[new_key] = value
+    if normalized.get("game_id") is not None:
+        normalized["game_id"] = str(normalized["game_id"])
+    return normalized
+
+
+class UserRegistry:
+    """
+    The one in-memory copy of registered users, shared by every cog.
+    Loaded once at startup; all mutations go through upsert()/remove(), which
+    persist via the store, keep the indexes current and notify listeners.
+    """
+
+    def __init__(self, store=None):
+        self._store = store
+        self._users = {}        # discord_id -> record
+        self._by_game = {}      # game_id -> set of discord_id (alts may share one)
+        self._by_state = {}     # state_id -> set of discord_id
+        self._prefix = []       # sorted (casefolded nickname or game_id, discord_id)
+        self._listeners = []
+        self.loaded = False
+        self.reloading = False  # True while applying a change another process made
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = get_store()
+        return self._store
+
+    def load(self):
+        self._users.clear()
+        self._by_game.clear()
+        self._by_state.clear()
+        self._prefix.clear()
+        for discord_id, record in self.store.load_users().items():
+            self._index(str(discord_id), normalize_record(record), sort=False)
+        self._prefix.sort()
+        self.loaded = True
+        logger.info(f"Loaded {len(self._users)} registered users")
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    # --- Indexes ---
+    @staticmethod
+    def _search_keys(record: dict):
+        keys = set()
+        if record.get("nickname"):
+            keys.add(str(record["nickname"]).casefold())
+        if record.get("game_id"):
+            keys.add(str(record["game_id"]))
+        return keys
+
+    def _index(self, discord_id: str, record: dict, sort: bool = True):
+        self._users[discord_id] = record
+        if record.get("game_id"):
+            self._by_game.setdefault(str(record["game_id"]), set()).add(discord_id)
+        state_id = record.get("state_id")
+        if state_id is not None:
+            self._by_state.setdefault(state_id, set()).add(discord_id)
+        for key in self._search_keys(record):
+            if sort:
+                bisect.insort(self._prefix, (key, discord_id))
+            else:
+                self._prefix.append((key, discord_id))
+
+    def _unindex(self, discord_id: str):
+        record = self._users.pop(discord_id, None)
+        if record is None:
+            return None
+        game_id = str(record.get("game_id") or "")
+        sharing = self._by_game.get(game_id)
+        if sharing:
+            sharing.discard(discord_id)
+            if not sharing:
+                del self._by_game[game_id]
+        members = self._by_state.get(record.get("state_id"))
+        if members:
+            members.discard(discord_id)
+            if not members:
+                del self._by_state[record.get("state_id")]
+        for key in self._search_keys(record):
+            i = bisect.bisect_left(self._prefix, (key, discord_id))
+            if i < len(self._prefix) and self._prefix[i] == (key, discord_id):
+                del self._prefix[i]
+        return record
+
+    # --- Reads ---
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._users)
+
+    def __contains__(self, discord_id):
+        self._ensure_loaded()
+        return str(discord_id) in self._users
+
+    def get(self, discord_id):
+        self._ensure_loaded()
+        return self._users.get(str(discord_id))
+
+    def items(self):
+        self._ensure_loaded()
+        return list(self._users.items())
+
+    def by_game_id(self, game_id) -> dict:
+        """discord_id -> record for everyone registered with this Game ID."""
+        self._ensure_loaded()
+        return {discord_id: self._users[discord_id] for discord_id in self._by_game.get(str(game_id), ())}
+
+    def in_state(self, state_id) -> dict:
+        self._ensure_loaded()
+        try:
+            state_id = int(state_id)
+        except (TypeError, ValueError):
+            return {}
+        return {discord_id: self._users[discord_id] for discord_id in self._by_state.get(state_id, ())}
+
+    def search(self, prefix: str, limit: int = 25) -> list:
+        """(discord_id, record) whose nickname (case-insensitive) or Game ID starts with prefix."""
+        self._ensure_loaded()
+        prefix = prefix.strip().casefold()
+        results, seen = [], set()
+        i = bisect.bisect_left(self._prefix, (prefix,))
+        while i < len(self._prefix) and len(results) < limit:
+            key, discord_id = self._prefix[i]
+            if not key.startswith(prefix):
+                break
+            if discord_id not in seen:
+                seen.add(discord_id)
+                results.append((discord_id, self._users[discord_id]))
+            i += 1
+        return results
+
+    # --- Mutations ---
+    def add_listener(self, callback):
+        """callback(discord_id, before, after); after is None on removal. Must not block."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, discord_id, before, after):
+        for callback in list(self._listeners):
+            try:
+                callback(discord_id, before, after)
+            except Exception as e:
+                logger.exception(f"Registry listener {callback} failed: {e}")
+
+    def upsert(self, discord_id, record: dict):
+        self._ensure_loaded()
+        discord_id = str(discord_id)
+        before = self._unindex(discord_id)
+        self._index(discord_id, record)
+        self.store.save_user(discord_id, record)
+        self._notify(discord_id, before, record)
+
+    def upsert_many(self, records: dict):
+        """Batch upsert with a single store write (roster refresh)."""
+        self._ensure_loaded()
+        changes = []
+        for discord_id, record in records.items():
+            discord_id = str(discord_id)
+            changes.append((discord_id, self._unindex(discord_id), record))
+            self._index(discord_id, record)
+        if records:
+            self.store.save_users({discord_id: record for discord_id, _, record in changes})
+        for discord_id, before, record in changes:
+            self._notify(discord_id, before, record)
+
+    def reload(self, discord_id):
+        """Re-read one user from the store (changed by another process); nothing is written."""
+        self._ensure_loaded()
+        discord_id = str(discord_id)
+        record = self.store.get_user(discord_id)
+        before = self._unindex(discord_id)
+        if record is not None:
+            record = normalize_record(record)
+            self._index(discord_id, record)
+        if before is None and record is None:
+            return
+        self.reloading = True
+        try:
+            self._notify(discord_id, before, record)
+        finally:
+            self.reloading = False
+
+    def remove(self, discord_id):
+        self._ensure_loaded()
+        discord_id = str(discord_id)
+        before = self._unindex(discord_id)
+        if before is None:
+            return None
+        self.store.delete_user(discord_id)
+        self._notify(discord_id, before, None)
+        return before
+
+
+registry = UserRegistry()
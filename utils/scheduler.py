@@ -0,0 +1,211 @@
+import asyncio
+import heapq
+import logging
+import time
+from utils.storage import get_store
+from utils.metrics import metrics
+
+logger = logging.getLogger("discord-bot.scheduler")
+
+PERSIST_DEBOUNCE = 1.0      # seconds; bursts of adds/fires become one save
+MISSED_GRACE = 600          # one-time reminders overdue by more than this at load are dropped
+
+FIRE_LAG_SECONDS = metrics.histogram("wos_reminder_fire_lag_seconds", "How late reminders fired")
+
+
+class ReminderScheduler:
+    """
+    Persistent reminder schedule on a min-heap keyed by fire time.
+    The runner sleeps exactly until the earliest reminder and is woken early
+    when an earlier one is added. Insert and fire are O(log n); cancelled or
+    rescheduled entries are skipped lazily when they reach the top.
+
+    Reminder dicts: id, channel_id, message, fire_at (unix time), once,
+    interval_days (recurring only).
+    """
+
+    def __init__(self, on_fire, store=None):
+        self.on_fire = on_fire
+        self._store = store
+        self.reminders = {}     # id -> reminder
+        self._heap = []         # (fire_at, id)
+        self._next_id = 1
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._persist_task = None
+        self._dirty = set()     # ids added, changed or removed since the last persist
+        self.fired = 0
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = get_store()
+        return self._store
+
+    def __len__(self):
+        return len(self.reminders)
+
+    # --- Persistence ---
+    def load(self, reminders: list = None):
+        """Replace the in-memory schedule with the stored one (or `reminders`, already read from it)."""
+        if reminders is None:
+            reminders = self.store.load_reminders()
+        now = time.time()
+        dropped = 0
+        self.reminders.clear()
+        self._heap.clear()
+        self._dirty.clear()
+        for reminder in reminders:
+            if not isinstance(reminder, dict) or "fire_at" not in reminder:
+                continue
+            fire_at = float(reminder["fire_at"])
+            changed = "id" not in reminder
+            if fire_at < now:
+                if reminder.get("once"):
+                    if now - fire_at > MISSED_GRACE:
+                        dropped += 1
+                        if not changed:
+                            self._dirty.add(reminder["id"])
+                        continue
+                else:
+                    # skip occurrences missed while offline
+                    interval = reminder.get("interval_days", 1) * 86400
+                    missed = int((now - fire_at) // interval) + 1
+                    reminder = {**reminder, "fire_at": fire_at + missed * interval}
+                    changed = True
+            self._push(reminder)
+            if changed:
+                self._dirty.add(reminder["id"])
+        if self._dirty:
+            self._persist_soon()
+        logger.info(f"Loaded {len(self.reminders)} reminders ({dropped} expired one-time reminders dropped)")
+
+    async def load_async(self):
+        """load() with the store read in a worker thread."""
+        self.load(await asyncio.to_thread(self.store.load_reminders))
+
+    def _persist_soon(self):
+        if self._persist_task is None or self._persist_task.done():
+            self._persist_task = asyncio.create_task(self._persist_later())
+
+    async def _persist_later(self):
+        await asyncio.sleep(PERSIST_DEBOUNCE)
+        self.persist()
+
+    def persist(self):
+        """Write only what changed since the last persist, not the whole schedule."""
+        changed = [self.reminders[i] for i in self._dirty if i in self.reminders]
+        removed = [i for i in self._dirty if i not in self.reminders]
+        self._dirty = set()
+        if changed or removed:
+            self.store.update_reminders(changed, removed)
+
+    # --- Schedule ---
+    def _push(self, reminder: dict):
+        if "id" not in reminder:
+            reminder["id"] = self._next_id
+        self._next_id = max(self._next_id, reminder["id"] + 1)
+        self.reminders[reminder["id"]] = reminder
+        heapq.heappush(self._heap, (reminder["fire_at"], reminder["id"]))
+
+    def add(self, reminder: dict) -> int:
+        """Schedule a reminder (fire_at as unix time) and return its id."""
+        earliest = self._heap[0][0] if self._heap else None
+        self._push(reminder)
+        self._dirty.add(reminder["id"])
+        if earliest is None or reminder["fire_at"] < earliest:
+            self._wakeup.set()
+        self._persist_soon()
+        return reminder["id"]
+
+    def add_many(self, reminders) -> list:
+        ids = []
+        for reminder in reminders:
+            self._push(reminder)
+            self._dirty.add(reminder["id"])
+            ids.append(reminder["id"])
+        self._wakeup.set()
+        self._persist_soon()
+        return ids
+
+    def cancel(self, reminder_id: int):
+        reminder = self.reminders.pop(reminder_id, None)
+        if reminder is not None:
+            self._dirty.add(reminder_id)
+            self._persist_soon()
+        return reminder
+
+    def next_fire_at(self):
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self):
+        while self._heap:
+            fire_at, reminder_id = self._heap[0]
+            reminder = self.reminders.get(reminder_id)
+            if reminder is not None and reminder["fire_at"] == fire_at:
+                return
+            heapq.heappop(self._heap)
+
+    # --- Runner ---
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._persist_task and not self._persist_task.done():
+            self._persist_task.cancel()
+            self.persist()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            next_at = self.next_fire_at()
+            if next_at is None:
+                await self._wakeup.wait()
+                continue
+            delay = next_at - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._fire_due(time.time())
+
+    def _fire_due(self, now: float):
+        fired = False
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, reminder_id = heapq.heappop(self._heap)
+            reminder = self.reminders[reminder_id]
+            self._dirty.add(reminder_id)
+            FIRE_LAG_SECONDS.observe(max(0.0, now - reminder["fire_at"]))
+            if reminder.get("once"):
+                del self.reminders[reminder_id]
+            else:
+                # replace, don't mutate: the store may be serializing the old dict
+                next_at = reminder["fire_at"] + reminder.get("interval_days", 1) * 86400
+                self.reminders[reminder_id] = {**reminder, "fire_at": next_at}
+                heapq.heappush(self._heap, (next_at, reminder_id))
+            self.fired += 1
+            fired = True
+            # delivery runs on its own so a slow send never delays the next reminder
+            asyncio.create_task(self._deliver(reminder))
+        if fired:
+            self._persist_soon()
+
+    async def _deliver(self, reminder: dict):
+        try:
+            await self.on_fire(reminder)
+        except Exception as e:
+            logger.exception(f"Reminder {reminder.get('id')} delivery failed: {e}")
@@ -1,44 +1,205 @@
-import aiohttp
 from bs4 import BeautifulSoup
+from html.parser import HTMLParser
+import asyncio
+import hashlib
 import logging
+import re
+from utils.http_client import client as http_client
+from utils.metrics import metrics, timed
 
 logger = logging.getLogger("discord-bot.scraper")
 
+CODES_URL = "https://www.wosgiftcodes.com/"
+
+SCRAPE_SECONDS = metrics.histogram("wos_scrape_seconds", "scrape_active_codes calls, 304s included")
+
+
+class _PollState:
+    """Validators and parsed result of the last successful fetch."""
+
+    def __init__(self):
+        self.etag = None
+        self.last_modified = None
+        self.body_hash = None
+        self.codes = None
+        self.polls = 0
+        self.not_modified = 0   # server answered 304
+        self.unchanged = 0      # 200, but same body as last time
+        self.parsed = 0
+        self.last_ok = False    # False if the last poll failed (HTTP error/exception)
+
+    def stats(self) -> dict:
+        return {
+            "polls": self.polls,
+            "not_modified": self.not_modified,
+            "unchanged": self.unchanged,
+            "short_circuited": self.not_modified + self.unchanged,
+            "parsed": self.parsed,
+        }
+
+
+_state = _PollState()
+
+
+def scrape_stats() -> dict:
+    return _state.stats()
+
+
+def last_poll_ok() -> bool:
+    """Whether the last scrape reached the site; an empty list alone can't tell."""
+    return _state.last_ok
+
+
+_TABLE_START = re.compile(r"<table[\s>]", re.IGNORECASE)
+_TBODY_END = re.compile(r"</tbody\s*>", re.IGNORECASE)
+
+
+class _CodeTableParser(HTMLParser):
+    """Collects the first cell of every row inside the first <tbody> it sees."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.codes = []
+        self.done = False
+        self.found_tbody = False
+        self._in_tbody = False
+        self._cell = 0
+        self._text = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == "tbody":
+            self._in_tbody = self.found_tbody = True
+        elif self._in_tbody and tag == "tr":
+            self._cell = 0
+        elif self._in_tbody and tag == "td":
+            self._cell += 1
+            if self._cell == 1:
+                self._text = []
+
+    def handle_endtag(self, tag):
+        if tag == "td" and self._text is not None:
+            # same result as bs4's get_text(strip=True)
+            code_text = "".join(part.strip() for part in self._text)
+            if code_text:
+                self.codes.append(code_text)
+            self._text = None
+        elif tag == "tbody" and self._in_tbody:
+            self._in_tbody = False
+            self.done = True
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+
+def parse_codes_fast(html: str):
+    """
+    Parse only the slice from the first <table> to its </tbody>.
+    Returns None when the page doesn't look as expected so the caller can fall back.
+    """
+    start = _TABLE_START.search(html)
+    if not start:
+        return None
+    end = _TBODY_END.search(html, start.start())
+    if not end:
+        return None
+    parser = _CodeTableParser()
+    parser.feed(html[start.start():end.end()])
+    parser.close()
+    if not parser.found_tbody:
+        return None
+    return parser.codes
+
+
+def parse_codes(html: str) -> list:
+    """Code strings from the first column of the active codes table."""
+    try:
+        codes = parse_codes_fast(html)
+    except Exception as e:
+        logger.warning(f"Fast code parser failed, using full parse: {e}")
+        codes = None
+    if codes is None:
+        return parse_codes_soup(html)
+    return codes
+
+
+def parse_codes_soup(html: str) -> list:
+    """Full-document BeautifulSoup parse; fallback for parse_codes()."""
+    codes = []
+    soup = BeautifulSoup(html, "html.parser")
+
+    # parse the active codes table
+    table = soup.find("table")
+    if not table:
+        logger.warning("No table found on page for codes")
+        return codes
+
+    tbody = table.find("tbody")
+    if not tbody:
+        logger.warning("No table body found on page")
+        return codes
+
+    for row in tbody.find_all("tr"):
+        code_cell = row.find("td")
+        if code_cell:
+            code_text = code_cell.get_text(strip=True)
+            if code_text:
+                codes.append(code_text)
+    return codes
+
+
+@timed(SCRAPE_SECONDS)
 async def scrape_active_codes():
     """
     Scrapes active WOS gift codes from https://www.wosgiftcodes.com/
     Returns a list of code strings.
+    Uses ETag/Last-Modified and a body hash so an unchanged page is not re-parsed.
     """
-    url = "https://www.wosgiftcodes.com/"
     codes = []
+    headers = {}
+    if _state.codes is not None:
+        if _state.etag:
+            headers["If-None-Match"] = _state.etag
+        if _state.last_modified:
+            headers["If-Modified-Since"] = _state.last_modified
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    logger.warning(f"Failed to fetch codes page, status: {resp.status}")
-                    return codes
-
-                html = await resp.text()
-                soup = BeautifulSoup(html, "html.parser")
-
-                # parse the active codes table
-                table = soup.find("table")
-                if not table:
-                    logger.warning("No table found on page for codes")
-                    return codes
-
-                tbody = table.find("tbody")
-                if not tbody:
-                    logger.warning("No table body found on page")
-                    return codes
-
-                for row in tbody.find_all("tr"):
-                    code_cell = row.find("td")
-                    if code_cell:
-                        code_text = code_cell.get_text(strip=True)
-                        if code_text:
-                            codes.append(code_text)
+        _state.polls += 1
+        _state.last_ok = False
+        session = await http_client.session()
+        async with session.get(CODES_URL, headers=headers) as resp:
+            if resp.status == 304 and _state.codes is not None:
+                _state.last_ok = True
+                _state.not_modified += 1
+                return list(_state.codes)
+            if resp.status != 200:
+                logger.warning(f"Failed to fetch codes page, status: {resp.status}")
+                return codes
+
+            body = await resp.read()
+            # validators are only kept with a parsed result: after a failed
+            # parse the next poll must get the body again, not a 304
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+
+            body_hash = hashlib.sha256(body).hexdigest()
+            if body_hash == _state.body_hash and _state.codes is not None:
+                _state.etag, _state.last_modified = etag, last_modified
+                _state.last_ok = True
+                _state.unchanged += 1
+                return list(_state.codes)
+
+            html = body.decode(resp.get_encoding(), errors="replace")
+            # parsing is CPU-bound; keep it off the event loop
+            codes = await asyncio.get_running_loop().run_in_executor(None, parse_codes, html)
+            _state.parsed += 1
+            _state.body_hash = body_hash
+            _state.codes = codes
+            _state.etag, _state.last_modified = etag, last_modified
+            _state.last_ok = True
+            codes = list(codes)
 
     except Exception as e:
         logger.error(f"Error scraping codes: {e}")
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("discord-bot.startup")
+
+# taken when bot.py imports this module, i.e. right after interpreter start-up
+PROCESS_START = time.perf_counter()
+
+
+class StartupReport:
+    """
+    Wall-clock timeline of a cold start: each phase (state preload, every
+    extension, login, first READY, first interaction) with its offset from
+    process start and its duration. Phases may overlap; extensions load
+    concurrently. Logged once the first interaction has been served.
+    """
+
+    def __init__(self, started: float = PROCESS_START):
+        self.started = started
+        self.phases = []            # (name, offset s, duration s, error or None)
+        self.milestones = {}        # name -> offset s
+        self.reported = False
+
+    def offset(self) -> float:
+        return time.perf_counter() - self.started
+
+    async def timed(self, name: str, coro):
+        """Await `coro`, recording how long it took. Errors are recorded and re-raised."""
+        began = self.offset()
+        error = None
+        try:
+            return await coro
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.phases.append((name, began, self.offset() - began, error))
+
+    def mark(self, name: str):
+        """First time `name` happened (later calls are ignored)."""
+        self.milestones.setdefault(name, self.offset())
+
+    def render(self) -> str:
+        lines = ["Startup timeline (seconds since process start):"]
+        for name, began, duration, error in sorted(self.phases, key=lambda p: p[1]):
+            status = f"  ❌ {error}" if error else ""
+            lines.append(f"  {began:7.3f}  +{duration:6.3f}  {name}{status}")
+        for name, at in sorted(self.milestones.items(), key=lambda m: m[1]):
+            lines.append(f"  {at:7.3f}           {name}")
+        return "\n".join(lines)
+
+    def log(self):
+        self.reported = True
+        logger.info(self.render())
+
+
+async def load_extensions_concurrently(bot, extensions, report: StartupReport) -> list:
+    """
+    Load independent extensions together, so their async cog_load work
+    (thread-offloaded reads, awaits) overlaps. A failing extension is logged
+    and skipped; the names of the loaded ones are returned in list order.
+    """
+    async def load(ext):
+        try:
+            await report.timed(f"extension {ext}", bot.load_extension(ext))
+        except Exception as e:
+            logger.error(f"❌ Failed to load extension {ext}: {e}")
+            return False
+        logger.info(f"✅ Loaded extension: {ext}")
+        return True
+
+    loaded = await asyncio.gather(*(load(ext) for ext in extensions))
+    return [ext for ext, ok in zip(extensions, loaded) if ok]
+
+
+startup = StartupReport()
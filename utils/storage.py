@@ -1,6 +1,11 @@
+import asyncio
+import copy
 import json
 import os
 import logging
+import tempfile
+import time
+from utils.metrics import LatencyWindow, metrics
 
 logger = logging.getLogger("discord-bot.storage")
 
@@ -11,7 +16,7 @@ def ensure_data_dir():
     # ensure files exist with defaults
     defaults = {
         "data/settings.json": {},
-        "data/users.json": [],
+        "data/users.json": {},
         "data/reminders.json": [],
         "data/last_codes.json": []
     }
@@ -24,19 +29,256 @@ def ensure_data_dir():
             except Exception as e:
                 logger.error(f"Failed creating {path}: {e}")
 
+STORAGE_WRITE_SECONDS = metrics.histogram("wos_storage_write_seconds", "Durable writes (file replace or SQLite commit)", ["backend"])
+
+DEBOUNCE_SECONDS = 1.0
+
+
+def _write_atomic(path, data) -> int:
+    """Serialize and replace `path` via temp file + fsync + rename. Returns bytes written."""
+    started = time.perf_counter()
+    payload = json.dumps(data, indent=2).encode("utf-8")
+    dirpath = os.path.dirname(path) or "."
+    os.makedirs(dirpath, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=dirpath)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    STORAGE_WRITE_SECONDS.labels("json").observe(time.perf_counter() - started)
+    return len(payload)
+
+
+class JsonWriter:
+    """
+    Write-behind saver for the JSON data files. save() only marks a document
+    dirty; writes within the debounce window coalesce into one atomic write
+    that is serialized in a worker thread. flush() runs on shutdown.
+    Callers must replace records rather than mutate them in place: only the
+    top-level container is snapshotted before the thread serializes it.
+    """
+
+    def __init__(self, debounce: float = DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self._pending = {}      # path -> latest data
+        self._flush_task = None
+        self._lock = None
+        self.saves = 0          # save() calls
+        self.writes = 0         # files actually written
+        self.bytes_written = 0
+        self.errors = 0
+        self.flush_latency = LatencyWindow()
+
+    def pending(self, path):
+        return self._pending.get(path)
+
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def save(self, path, data):
+        self.saves += 1
+        self._pending[path] = data
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # no event loop (scripts, migration): write through
+            self.flush_sync()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.debounce)
+        await self.flush()
+
+    async def flush(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while self._pending:
+                batch, self._pending = self._pending, {}
+                started = time.perf_counter()
+                for path, data in batch.items():
+                    snapshot = dict(data) if isinstance(data, dict) else list(data)
+                    try:
+                        self.bytes_written += await asyncio.to_thread(_write_atomic, path, snapshot)
+                        self.writes += 1
+                    except Exception as e:
+                        self.errors += 1
+                        logger.exception(f"Failed to save {path}: {e}")
+                self.flush_latency.observe(time.perf_counter() - started)
+
+    def flush_sync(self):
+        batch, self._pending = self._pending, {}
+        for path, data in batch.items():
+            try:
+                self.bytes_written += _write_atomic(path, data)
+                self.writes += 1
+            except Exception as e:
+                self.errors += 1
+                logger.exception(f"Failed to save {path}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth(),
+            "saves": self.saves,
+            "writes": self.writes,
+            "coalesced": max(0, self.saves - self.writes - self.errors - self.queue_depth()),
+            "bytes_written": self.bytes_written,
+            "errors": self.errors,
+            "flush_latency": self.flush_latency.summary(),
+        }
+
+
+writer = JsonWriter()
+metrics.gauge("wos_storage_write_queue_depth", "Files waiting for a debounced write", writer.queue_depth)
+
+
 def load_json(path, default):
+    pending = writer.pending(path)
+    if pending is not None:
+        # a write is queued; don't hand out the stale file
+        return copy.deepcopy(pending)
     try:
         with open(path, "r") as f:
             return json.load(f)
     except Exception:
         return default
 
+async def load_json_async(path, default):
+    """load_json with the file read in a worker thread."""
+    pending = writer.pending(path)
+    if pending is not None:
+        return copy.deepcopy(pending)
+    return await asyncio.to_thread(load_json, path, default)
+
 def save_json(path, data):
-    try:
-        dirpath = os.path.dirname(path)
-        if dirpath and not os.path.exists(dirpath):
-            os.makedirs(dirpath, exist_ok=True)
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        logger.exception(f"Failed to save {path}: {e}")
+    """Queue `data` for a debounced atomic write of `path` (see JsonWriter)."""
+    writer.save(path, data)
+
+
+USERS_FILE = "data/users.json"
+SETTINGS_FILE = "data/settings.json"
+REMINDERS_FILE = "data/reminders.json"
+LAST_CODES_FILE = "data/last_codes.json"
+
+
+class JsonStore:
+    """Storage backend on the data/*.json files, persisted through the write-behind writer."""
+
+    name = "json"
+
+    def __init__(self, users_file=USERS_FILE, settings_file=SETTINGS_FILE,
+                 reminders_file=REMINDERS_FILE, codes_file=LAST_CODES_FILE):
+        self.users_file = users_file
+        self.settings_file = settings_file
+        self.reminders_file = reminders_file
+        self.codes_file = codes_file
+        self._users = None
+        self._reminders = None  # id -> reminder, as last loaded/saved
+
+    def close(self):
+        pass
+
+    # --- Users ---
+    def load_users(self) -> dict:
+        data = load_json(self.users_file, {})
+        self._users = data if isinstance(data, dict) else {}
+        return dict(self._users)
+
+    def _loaded_users(self) -> dict:
+        if self._users is None:
+            self.load_users()
+        return self._users
+
+    def save_user(self, discord_id, record: dict):
+        users = self._loaded_users()
+        users[str(discord_id)] = record
+        save_json(self.users_file, users)
+
+    def save_users(self, users: dict):
+        self._loaded_users().update({str(k): v for k, v in users.items()})
+        save_json(self.users_file, self._users)
+
+    def delete_user(self, discord_id):
+        users = self._loaded_users()
+        if users.pop(str(discord_id), None) is not None:
+            save_json(self.users_file, users)
+
+    def get_user(self, discord_id):
+        return self._loaded_users().get(str(discord_id))
+
+    def find_by_game_id(self, game_id):
+        for discord_id, record in self._loaded_users().items():
+            if str(record.get("game_id")) == str(game_id):
+                return discord_id, record
+        return None
+
+    def users_in_state(self, state_id) -> dict:
+        return {
+            discord_id: record for discord_id, record in self._loaded_users().items()
+            if str(record.get("state_id", record.get("kid"))) == str(state_id)
+        }
+
+    # --- Settings ---
+    def load_settings(self) -> dict:
+        return load_json(self.settings_file, {})
+
+    def save_settings(self, settings: dict):
+        save_json(self.settings_file, settings)
+
+    # --- Reminders ---
+    def load_reminders(self) -> list:
+        data = load_json(self.reminders_file, [])
+        reminders = [r for r in data if isinstance(r, dict)] if isinstance(data, list) else []
+        self._reminders = {r["id"]: r for r in reminders if "id" in r}
+        return reminders
+
+    def save_reminders(self, reminders: list):
+        self._reminders = {r["id"]: r for r in reminders if "id" in r}
+        save_json(self.reminders_file, reminders)
+
+    def update_reminders(self, changed: list, removed: list):
+        """Apply added/changed reminders and removed ids (the file is still written whole)."""
+        if self._reminders is None:
+            self.load_reminders()
+        for reminder in changed:
+            self._reminders[reminder["id"]] = reminder
+        for reminder_id in removed:
+            self._reminders.pop(reminder_id, None)
+        save_json(self.reminders_file, list(self._reminders.values()))
+
+    # --- Code history ---
+    def load_active_codes(self) -> list:
+        return load_json(self.codes_file, [])
+
+    def record_codes(self, active: list):
+        save_json(self.codes_file, active)
+
+
+_store = None
+
+
+def get_store():
+    """
+    Process-wide storage backend. WOS_STORAGE=sqlite selects the SQLite
+    backend (run `python -m utils.db` once to migrate); default is JSON.
+    """
+    global _store
+    if _store is None:
+        backend = os.environ.get("WOS_STORAGE", "json").lower()
+        if backend == "sqlite":
+            from utils.db import SqliteStore
+            _store = SqliteStore()
+        else:
+            _store = JsonStore()
+        logger.info(f"Using {_store.name} storage backend")
+    return _store
@@ -0,0 +1,254 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import discord
+from utils.cluster import cluster
+from utils.ratelimit import TokenBucket
+from utils.storage import load_json_async, save_json
+
+logger = logging.getLogger("discord-bot.verification")
+
+SESSIONS_FILE = "data/verify_sessions.json"
+SESSION_TTL = 3600              # seconds a joined member has to verify
+JOIN_RATE = (20, 1.0)           # joins admitted per second; bursts wait in the queue
+ROLE_EDIT_RATE = (10, 1.0, 10)  # per guild: role calls, per seconds, burst
+BATCH_INTERVAL = 1.0            # seconds role changes are collected before a flush
+BATCH_SIZE = 100                # members updated per flush
+
+
+def sessions_file() -> str:
+    # each cluster process onboards the guilds of its own (fixed) shards
+    shard_ids = cluster.config.shard_ids if cluster.enabled else None
+    if shard_ids:
+        return SESSIONS_FILE.replace(".json", "-" + "-".join(map(str, shard_ids)) + ".json")
+    return SESSIONS_FILE
+
+
+class VerificationSessions:
+    """
+    Onboarding state for members who joined but haven't verified yet.
+
+    Joins go into a queue drained at JOIN_RATE, so a raid is absorbed instead
+    of fanning out into thousands of concurrent handlers. Each admitted join
+    opens a session with an expiry; sessions are kept in SESSIONS_FILE and
+    expired by one timer sleeping until the earliest deadline, not by a
+    sleeping task per member. Role changes are collected per member for
+    BATCH_INTERVAL and merged, so a join followed by a quick verification
+    only adds the verified role; they are applied with add_roles /
+    remove_roles under a per-guild token bucket. Queued role changes live in
+    memory only: ones not applied yet are lost on restart (the member keeps
+    their roles as they were and can still verify from the panel).
+    """
+
+    def __init__(self, on_admit=None, on_expire=None, path: str = None, ttl: float = SESSION_TTL):
+        self.on_admit = on_admit        # async on_admit(member) -> open a session for them?
+        self.on_expire = on_expire      # async on_expire(session)
+        self.path = path or sessions_file()
+        self.ttl = ttl
+        self.sessions = {}              # "guild_id:member_id" -> {"guild_id", "member_id", "joined_at", "expires_at"}
+        self._heap = []                 # (expires_at, key); stale entries skipped on pop
+        self._joins = asyncio.Queue()
+        self._join_bucket = TokenBucket(*JOIN_RATE)
+        self._role_changes = {}         # (guild_id, member_id) -> pending change, in arrival order
+        self._role_buckets = {}         # guild_id -> TokenBucket
+        self._wakeup = asyncio.Event()
+        self._roles_pending = asyncio.Event()
+        self._tasks = []
+        self.admitted = 0
+        self.verified = 0
+        self.expired = 0
+        self.role_edits = 0
+        self.role_failures = 0
+
+    @staticmethod
+    def key(guild_id, member_id) -> str:
+        return f"{guild_id}:{member_id}"
+
+    # --- Persistence ---
+    def load(self, sessions: dict):
+        self.sessions = {key: s for key, s in sessions.items() if isinstance(s, dict) and "expires_at" in s}
+        self._heap = [(s["expires_at"], key) for key, s in self.sessions.items()]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+        logger.info(f"Loaded {len(self.sessions)} open verification sessions")
+
+    async def load_async(self):
+        sessions = await load_json_async(self.path, {})
+        self.load(sessions if isinstance(sessions, dict) else {})
+
+    def _save(self):
+        save_json(self.path, self.sessions)     # debounced by the JSON writer
+
+    # --- Workers ---
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._admit_joins(), name="verify-joins"),
+                asyncio.create_task(self._expire_sessions(), name="verify-expiry"),
+                asyncio.create_task(self._apply_role_changes(), name="verify-roles"),
+            ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._save()
+
+    # --- Sessions ---
+    def enqueue(self, member):
+        """Queue a join; at JOIN_RATE on_admit is called and, if it agrees, a session opened."""
+        self._joins.put_nowait(member)
+
+    def has_session(self, guild_id, member_id) -> bool:
+        return self.key(guild_id, member_id) in self.sessions
+
+    def close(self, guild_id, member_id, verified: bool = False):
+        if self.sessions.pop(self.key(guild_id, member_id), None) is None:
+            return
+        if verified:
+            self.verified += 1
+        self._save()
+
+    async def _admit_joins(self):
+        while True:
+            member = await self._joins.get()
+            await self._join_bucket.acquire()
+            if self.on_admit:
+                try:
+                    if not await self.on_admit(member):
+                        continue
+                except Exception as e:
+                    logger.exception(f"Admitting {member} failed: {e}")
+                    continue
+            now = time.time()
+            key = self.key(member.guild.id, member.id)
+            self.sessions[key] = {
+                "guild_id": member.guild.id,
+                "member_id": member.id,
+                "joined_at": now,
+                "expires_at": now + self.ttl,
+            }
+            if not self._heap or now + self.ttl < self._heap[0][0]:
+                self._wakeup.set()
+            heapq.heappush(self._heap, (now + self.ttl, key))
+            self._save()
+            self.admitted += 1
+
+    async def _expire_sessions(self):
+        while True:
+            self._wakeup.clear()
+            while self._heap:
+                expires_at, key = self._heap[0]
+                session = self.sessions.get(key)
+                if session is None or session["expires_at"] != expires_at:
+                    heapq.heappop(self._heap)   # closed or re-opened since
+                    continue
+                break
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, key = heapq.heappop(self._heap)
+            session = self.sessions.pop(key)
+            self.expired += 1
+            self._save()
+            if self.on_expire:
+                try:
+                    await self.on_expire(session)
+                except Exception as e:
+                    logger.exception(f"Expiring verification session {key} failed: {e}")
+
+    # --- Batched role changes ---
+    def change_roles(self, member, add=(), remove=()) -> asyncio.Future:
+        """
+        Queue role changes for a member; merged with any change still pending
+        for them. The future resolves to True once applied (False on failure).
+        """
+        key = (member.guild.id, member.id)
+        change = self._role_changes.get(key)
+        if change is None:
+            change = self._role_changes[key] = {
+                "member": member, "add": {}, "remove": {},
+                "future": asyncio.get_running_loop().create_future(),
+            }
+        change["member"] = member
+        for role in add:
+            change["remove"].pop(role.id, None)
+            change["add"][role.id] = role
+        for role in remove:
+            change["add"].pop(role.id, None)
+            change["remove"][role.id] = role
+        self._roles_pending.set()
+        return change["future"]
+
+    def drop_role_changes(self, guild_id, member_id):
+        change = self._role_changes.pop((guild_id, member_id), None)
+        if change and not change["future"].done():
+            change["future"].set_result(False)
+
+    async def _apply_role_changes(self):
+        while True:
+            await self._roles_pending.wait()
+            await asyncio.sleep(BATCH_INTERVAL)    # let a burst pile up and a member's changes merge
+            self._roles_pending.clear()
+            keys = list(itertools.islice(self._role_changes, BATCH_SIZE))
+            batch = [self._role_changes.pop(key) for key in keys]
+            if self._role_changes:
+                self._roles_pending.set()
+            await asyncio.gather(*(self._apply(change) for change in batch))
+
+    def _bucket(self, guild_id) -> TokenBucket:
+        bucket = self._role_buckets.get(guild_id)
+        if bucket is None:
+            bucket = self._role_buckets[guild_id] = TokenBucket(*ROLE_EDIT_RATE)
+        return bucket
+
+    async def _apply(self, change: dict):
+        # re-resolve: the member captured at join/submit may be stale by now,
+        # and add_roles/remove_roles only touch the named roles
+        guild = change["member"].guild
+        member = guild.get_member(change["member"].id)
+        applied = member is not None
+        if member is not None:
+            held = {role.id for role in member.roles}
+            add = [role for role in change["add"].values() if role.id not in held]
+            remove = [role for role in change["remove"].values() if role.id in held]
+            try:
+                if add:
+                    await self._bucket(guild.id).acquire()
+                    await member.add_roles(*add, reason="Verification")
+                    self.role_edits += 1
+                if remove:
+                    await self._bucket(guild.id).acquire()
+                    await member.remove_roles(*remove, reason="Verification")
+                    self.role_edits += 1
+            except discord.HTTPException as e:
+                self.role_failures += 1
+                applied = False
+                logger.warning(f"Role update for {member} in {guild} failed: {e}")
+        if not change["future"].done():
+            change["future"].set_result(applied)
+
+    def join_queue_depth(self) -> int:
+        return self._joins.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "join_queue": self.join_queue_depth(),
+            "role_queue": len(self._role_changes),
+            "admitted": self.admitted,
+            "verified": self.verified,
+            "expired": self.expired,
+            "role_edits": self.role_edits,
+            "role_failures": self.role_failures,
+        }